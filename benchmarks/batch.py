@@ -0,0 +1,126 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from covid19_data_with_population.batch_runner import BatchRunner
+from covid19_data_with_population.dataset import DataSet
+from covid19_data_with_population.pipeline import run_pipeline
+from covid19_data_with_population.population_estimate_data_2019 import \
+    PopulationEstimateData2019
+
+from .synthetic_data import REAL_NUMBER_OF_COUNTIES, REAL_NUMBER_OF_DAYS, \
+    generate_covid19_csv, generate_fips_codes, generate_population_csv
+
+
+def run_separately(entries: list, population_csv_path: str):
+    """
+    Function to process the entries one after the other as separate runs
+    of the pipeline, the population data is read and preprocessed for every
+    entry
+    """
+    dataset = DataSet()
+    for entry in entries:
+        df = run_pipeline(entry["covid19_csv_path"], population_csv_path)
+        dataset.save_dataframe(df, entry["output_file_path"])
+
+
+def run_batch(entries: list, population_csv_path: str, workers: int):
+    """
+    Function to process the entries with BatchRunner class, the population
+    data is read and preprocessed once
+    """
+    population_estimate_data_2019 = PopulationEstimateData2019(
+        population_csv_path)
+    population_lookup = \
+        population_estimate_data_2019.generate_population_lookup(
+            population_estimate_data_2019.preprocess(
+                population_estimate_data_2019.df))
+    BatchRunner(population_lookup, workers).run(entries)
+
+
+def run_benchmark(entries: list, population_csv_path: str,
+                  workers: int) -> list:
+    """
+    Function to time the processing of the entries of a batch manifest as
+    separate runs and with BatchRunner class
+
+    Parameters:
+    ----------
+    entries: list of dict, entries of the batch manifest
+    population_csv_path: str, path of Population Estimate Data 2019
+    workers: int, number of worker processes of BatchRunner class
+
+    Returns:
+    -------
+    results: list of dict with "name" and "seconds"
+    """
+    results = []
+    runs = [("separate_runs", run_separately, (entries, population_csv_path)),
+            ("BatchRunner[workers=1]", run_batch,
+             (entries, population_csv_path, 1)),
+            (f"BatchRunner[workers={workers}]", run_batch,
+             (entries, population_csv_path, workers))]
+    for name, function, args in runs:
+        start = time.perf_counter()
+        function(*args)
+        seconds = time.perf_counter() - start
+        results.append({"name": name, "seconds": seconds})
+        print(f"{name}: {seconds:.3f}s")
+    return results
+
+
+def main():
+    """
+    Function to benchmark the batch manifest mode on synthetic files, one
+    file of the full period and several files of a short period, like the
+    us-counties.csv and yearly/recent files of the real dataset
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark the batch manifest mode on synthetic files")
+
+    parser.add_argument('--scale',
+                        type=float,
+                        default=1.0,
+                        help="Scale of number of counties of synthetic files "
+                             "compared to real dataset, up to 10")
+
+    parser.add_argument('--number_of_small_files',
+                        type=int,
+                        default=3,
+                        help="Number of files of --small_file_days days in "
+                             "addition to the file of the full period")
+
+    parser.add_argument('--small_file_days',
+                        type=int,
+                        default=30,
+                        help="Number of days of the small files")
+
+    parser.add_argument('--workers',
+                        type=int,
+                        default=2,
+                        help="Number of worker processes of BatchRunner")
+
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as data_dir:
+        fips = generate_fips_codes(int(REAL_NUMBER_OF_COUNTIES * args.scale))
+        population_csv_path = os.path.join(data_dir, "co-est2019-alldata.csv")
+        generate_population_csv(population_csv_path, fips)
+        entries = []
+        for i in range(args.number_of_small_files + 1):
+            covid19_csv_path = os.path.join(data_dir, f"us-counties-{i}.csv")
+            generate_covid19_csv(
+                covid19_csv_path, fips,
+                REAL_NUMBER_OF_DAYS if i == 0 else args.small_file_days,
+                seed=i)
+            entries.append({"covid19_csv_path": covid19_csv_path,
+                            "output_file_path": os.path.join(
+                                data_dir, f"output-{i}.csv")})
+        results = run_benchmark(entries, population_csv_path, args.workers)
+    print(json.dumps({"cpu_count": os.cpu_count(), "results": results},
+                     indent=2))
+
+
+if __name__ == '__main__':
+    main()
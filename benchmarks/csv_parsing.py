@@ -0,0 +1,111 @@
+import argparse
+import json
+import os
+import tempfile
+
+import pandas as pd
+
+from covid19_data_with_population.dataset import CSV_PARSER_ENGINES
+from covid19_data_with_population.newyork_times_covid19_data import \
+    NewYorkTimesCovid19Data
+from covid19_data_with_population.population_estimate_data_2019 import \
+    PopulationEstimateData2019
+
+from .pipeline import measure
+from .synthetic_data import REAL_NUMBER_OF_COUNTIES, REAL_NUMBER_OF_DAYS, \
+    generate_covid19_csv, generate_fips_codes, generate_population_csv
+
+
+def run_benchmark(covid19_csv_path: str, population_csv_path: str,
+                  repeat: int) -> list:
+    """
+    Function to compare parsing every column as string, as done before the
+    schema driven reader, with the schema driven reader of both classes
+    for every parser engine
+
+    Parameters:
+    ----------
+    covid19_csv_path: str, path of New York Times COVID-19 Data
+    population_csv_path: str, path of Population Estimate Data 2019
+    repeat: int, number of runs of every step, best time is reported
+
+    Returns:
+    -------
+    results: list of dict with "name", "seconds" and "repeat"
+    """
+    results = []
+    measure(results, "read_csv[covid19, all columns as string]",
+            lambda: pd.read_csv(covid19_csv_path, dtype=object),
+            repeat=repeat)
+    measure(results, "read_csv[population, all columns as string]",
+            lambda: pd.read_csv(population_csv_path, dtype=object,
+                                encoding="ISO-8859-1"), repeat=repeat)
+    for engine in CSV_PARSER_ENGINES:
+        for compact in [False, True]:
+            measure(results,
+                    f"NewYorkTimesCovid19Data.__init__[{engine}, "
+                    f"compact={compact}]",
+                    lambda: NewYorkTimesCovid19Data(
+                        covid19_csv_path, compact=compact,
+                        csv_engine=engine), repeat=repeat)
+            measure(results,
+                    f"PopulationEstimateData2019.__init__[{engine}, "
+                    f"compact={compact}]",
+                    lambda: PopulationEstimateData2019(
+                        population_csv_path, compact, csv_engine=engine),
+                    repeat=repeat)
+    return results
+
+
+def main():
+    """
+    Function to benchmark the parsing of the source csv files, on given
+    files or on synthetic files
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark parsing of New York Times COVID-19 Data and "
+                    "Population Estimate Data 2019 csv files")
+
+    parser.add_argument('--covid19_csv_path',
+                        type=str,
+                        default=None,
+                        help="Path of New York Times COVID-19 Data, "
+                             "synthetic files are generated if not provided")
+
+    parser.add_argument('--population_csv_path',
+                        type=str,
+                        default=None,
+                        help="Path of Population Estimate Data 2019, "
+                             "synthetic files are generated if not provided")
+
+    parser.add_argument('--scale',
+                        type=float,
+                        default=1.0,
+                        help="Scale of number of counties of synthetic files "
+                             "compared to real dataset, up to 10")
+
+    parser.add_argument('--repeat',
+                        type=int,
+                        default=3,
+                        help="Number of runs of every step, best time is "
+                             "reported")
+
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as data_dir:
+        covid19_csv_path = args.covid19_csv_path
+        population_csv_path = args.population_csv_path
+        if covid19_csv_path is None or population_csv_path is None:
+            fips = generate_fips_codes(
+                int(REAL_NUMBER_OF_COUNTIES * args.scale))
+            covid19_csv_path = os.path.join(data_dir, "us-counties.csv")
+            population_csv_path = os.path.join(data_dir,
+                                               "co-est2019-alldata.csv")
+            generate_population_csv(population_csv_path, fips)
+            generate_covid19_csv(covid19_csv_path, fips, REAL_NUMBER_OF_DAYS)
+        results = run_benchmark(covid19_csv_path, population_csv_path,
+                                args.repeat)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
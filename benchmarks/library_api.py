@@ -0,0 +1,139 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from covid19_data_with_population.newyork_times_covid19_data import \
+    NewYorkTimesCovid19Data
+from covid19_data_with_population.pipeline import run_pipeline
+
+from .synthetic_data import REAL_NUMBER_OF_COUNTIES, REAL_NUMBER_OF_DAYS, \
+    generate_covid19_csv, generate_fips_codes, generate_population_csv
+
+
+def measure_peak_memory(results: list, name: str, input_bytes: int,
+                        function, *args):
+    """
+    Function to measure the wall time and the peak memory traced by
+    tracemalloc (numpy and pandas allocations included) of function(*args),
+    the wall time includes the overhead of tracemalloc which is large for
+    the nullable integer columns of compact representation
+
+    Returns:
+    -------
+    value: value returned by function
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    value = function(*args)
+    seconds = time.perf_counter() - start
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    results.append({"name": name, "seconds": seconds,
+                    "peak_traced_bytes": peak_bytes,
+                    "peak_to_input_ratio": peak_bytes / input_bytes})
+    print(f"{name}: {seconds:.3f}s, peak {peak_bytes / 2 ** 20:.1f}MB "
+          f"({peak_bytes / input_bytes:.2f}x input)")
+    return value
+
+
+def run_benchmark(covid19_csv_path: str, population_csv_path: str) -> list:
+    """
+    Function to measure the peak memory of "run_pipeline" function for
+    every kind of source, relative to the size of the parsed New York
+    Times COVID-19 Data records
+
+    Parameters:
+    ----------
+    covid19_csv_path: str, path of New York Times COVID-19 Data
+    population_csv_path: str, path of Population Estimate Data 2019
+
+    Returns:
+    -------
+    results: list of dict with "name", "seconds", "peak_traced_bytes" and
+        "peak_to_input_ratio"
+    """
+    results = []
+    for compact in [False, True]:
+        df_covid19 = NewYorkTimesCovid19Data(covid19_csv_path,
+                                             compact=compact).df
+        input_bytes = int(df_covid19.memory_usage(deep=True).sum())
+        del df_covid19
+        measure_peak_memory(results,
+                            f"run_pipeline[path, compact={compact}]",
+                            input_bytes, run_pipeline, covid19_csv_path,
+                            population_csv_path, compact)
+        with open(covid19_csv_path, "rb") as f:
+            measure_peak_memory(results,
+                                f"run_pipeline[stream, compact={compact}]",
+                                input_bytes, run_pipeline, f,
+                                population_csv_path, compact)
+    # -> In memory sources are loaded before the measure, the peak is the
+    # memory allocated on top of them
+    df_covid19 = pd.read_csv(covid19_csv_path, dtype={"fips": object},
+                             parse_dates=["date"])
+    input_bytes = int(df_covid19.memory_usage(deep=True).sum())
+    measure_peak_memory(results, "run_pipeline[dataframe]", input_bytes,
+                        run_pipeline, df_covid19, population_csv_path)
+    del df_covid19
+    try:
+        import pyarrow.csv
+    except ImportError:
+        return results
+    table = pyarrow.csv.read_csv(
+        covid19_csv_path,
+        convert_options=pyarrow.csv.ConvertOptions(
+            column_types={"fips": pyarrow.string()}))
+    measure_peak_memory(results, "run_pipeline[arrow]", input_bytes,
+                        run_pipeline, table, population_csv_path)
+    return results
+
+
+def main():
+    """
+    Function to benchmark the peak memory of the in-process library API,
+    on given files or on synthetic files
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark peak memory of run_pipeline function")
+
+    parser.add_argument('--covid19_csv_path',
+                        type=str,
+                        default=None,
+                        help="Path of New York Times COVID-19 Data, "
+                             "synthetic files are generated if not provided")
+
+    parser.add_argument('--population_csv_path',
+                        type=str,
+                        default=None,
+                        help="Path of Population Estimate Data 2019, "
+                             "synthetic files are generated if not provided")
+
+    parser.add_argument('--scale',
+                        type=float,
+                        default=1.0,
+                        help="Scale of number of counties of synthetic files "
+                             "compared to real dataset, up to 10")
+
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as data_dir:
+        covid19_csv_path = args.covid19_csv_path
+        population_csv_path = args.population_csv_path
+        if covid19_csv_path is None or population_csv_path is None:
+            fips = generate_fips_codes(
+                int(REAL_NUMBER_OF_COUNTIES * args.scale))
+            covid19_csv_path = os.path.join(data_dir, "us-counties.csv")
+            population_csv_path = os.path.join(data_dir,
+                                               "co-est2019-alldata.csv")
+            generate_population_csv(population_csv_path, fips)
+            generate_covid19_csv(covid19_csv_path, fips, REAL_NUMBER_OF_DAYS)
+        results = run_benchmark(covid19_csv_path, population_csv_path)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
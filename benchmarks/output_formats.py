@@ -0,0 +1,85 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from covid19_data_with_population.dataset import DataSet, \
+    OUTPUT_FORMAT_EXTENSIONS
+
+
+def benchmark_output_format(df, output_format: str, output_dir: str,
+                            repeat: int) -> dict:
+    """
+    Function to measure write time, file size and read back time of given
+    output format
+
+    Parameters:
+    ----------
+    df: pd.DataFrame object with prepared statistics indexed by
+        ("fips", "date")
+    output_format: str, one of OUTPUT_FORMAT_EXTENSIONS keys
+    output_dir: str, directory used to write the output file
+    repeat: int, number of repetitions, the best time is reported
+
+    Returns:
+    -------
+    result: dict with "output_format", "write_seconds", "file_size_bytes"
+        and "read_seconds"
+    """
+    dataset = DataSet()
+    file_path = os.path.join(
+        output_dir, f"output{OUTPUT_FORMAT_EXTENSIONS[output_format]}")
+    write_seconds = []
+    read_seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        dataset.save_dataframe(df, file_path, output_format)
+        write_seconds.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        dataset.read_saved_dataframe(file_path, output_format)
+        read_seconds.append(time.perf_counter() - start)
+    return {"output_format": output_format,
+            "write_seconds": min(write_seconds),
+            "file_size_bytes": os.path.getsize(file_path),
+            "read_seconds": min(read_seconds)}
+
+
+def main():
+    """
+    Function to compare the output formats supported by
+    "DataSet.save_dataframe" on a prepared output file
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark write time, file size and read back time of "
+                    "output formats")
+
+    parser.add_argument('--input_file_path',
+                        type=str,
+                        default="./aggregated_covid19_data_with_population.csv",
+                        help="Path of prepared output file used as input")
+
+    parser.add_argument('--output_formats',
+                        type=str,
+                        nargs="+",
+                        default=list(OUTPUT_FORMAT_EXTENSIONS),
+                        choices=list(OUTPUT_FORMAT_EXTENSIONS),
+                        help="Output formats to benchmark")
+
+    parser.add_argument('--repeat',
+                        type=int,
+                        default=3,
+                        help="Number of repetitions, best time is reported")
+
+    args = parser.parse_args()
+    df = DataSet().read_saved_dataframe(args.input_file_path)
+    df = df.set_index(["fips", "date"])
+    with tempfile.TemporaryDirectory() as output_dir:
+        for output_format in args.output_formats:
+            result = benchmark_output_format(df, output_format, output_dir,
+                                             args.repeat)
+            print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
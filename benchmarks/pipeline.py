@@ -0,0 +1,194 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+
+import pandas as pd
+
+from covid19_data_with_population.binary_store import StatsBinaryStore
+from covid19_data_with_population.newyork_times_covid19_data import \
+    NewYorkTimesCovid19Data, STATS_ENGINES
+from covid19_data_with_population.population_estimate_data_2019 import \
+    PopulationEstimateData2019
+from covid19_data_with_population.stats_metrics import StatsMetrics
+
+from .synthetic_data import REAL_NUMBER_OF_COUNTIES, REAL_NUMBER_OF_DAYS, \
+    generate_covid19_csv, generate_fips_codes, generate_population_csv
+
+
+def get_git_commit() -> str:
+    """
+    Function to get the current git commit of the repository
+
+    Returns:
+    -------
+    commit: str, commit hash, None if it is not available
+    """
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL,
+            cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(results: list, name: str, function, *args, repeat: int = 1):
+    """
+    Function to measure the wall time of function(*args), the best time of
+    "repeat" runs is appended to results
+
+    Returns:
+    -------
+    value: value returned by the last run of function
+    """
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = function(*args)
+        seconds.append(time.perf_counter() - start)
+    results.append({"name": name, "seconds": min(seconds),
+                    "repeat": repeat})
+    print(f"{name}: {min(seconds):.3f}s")
+    return value
+
+
+def run_benchmark(covid19_csv_path: str, population_csv_path: str,
+                  output_dir: str, repeat: int) -> list:
+    """
+    Function to time every public step of the pipeline on given files
+
+    Parameters:
+    ----------
+    covid19_csv_path: str, path of New York Times COVID-19 Data
+    population_csv_path: str, path of Population Estimate Data 2019
+    output_dir: str, directory used to save the output file
+    repeat: int, number of runs of every step, best time is reported
+
+    Returns:
+    -------
+    results: list of dict with "name", "seconds" and "repeat"
+    """
+    results = []
+    newyork_times_covid19_data = measure(
+        results, "NewYorkTimesCovid19Data.__init__", NewYorkTimesCovid19Data,
+        covid19_csv_path)
+    population_estimate_data_2019 = measure(
+        results, "PopulationEstimateData2019.__init__",
+        PopulationEstimateData2019, population_csv_path)
+    df_population = measure(
+        results, "PopulationEstimateData2019.preprocess",
+        lambda: population_estimate_data_2019.preprocess(
+            population_estimate_data_2019.df.copy()), repeat=repeat)
+    df_covid19 = measure(
+        results, "NewYorkTimesCovid19Data.preprocess",
+        newyork_times_covid19_data.preprocess,
+        newyork_times_covid19_data.df, repeat=repeat)
+    df_combined = measure(
+        results, "NewYorkTimesCovid19Data.combine_with_population_data",
+        newyork_times_covid19_data.combine_with_population_data,
+        df_covid19, df_population, repeat=repeat)
+    # -> Join of the population estimate of the year of every record, to
+    # be compared with the join of a lookup of a single year
+    population_lookup = measure(
+        results, "PopulationEstimateData2019.generate_population_lookup",
+        population_estimate_data_2019.generate_population_lookup,
+        df_population, repeat=repeat)
+    measure(results,
+            "NewYorkTimesCovid19Data.combine_with_population_lookup"
+            "[year matched]",
+            newyork_times_covid19_data.combine_with_population_lookup,
+            df_covid19, population_lookup, repeat=repeat)
+    measure(results,
+            "NewYorkTimesCovid19Data.combine_with_population_lookup"
+            "[single year]",
+            newyork_times_covid19_data.combine_with_population_lookup,
+            df_covid19, population_lookup[-1], repeat=repeat)
+    for engine in STATS_ENGINES:
+        df_out = measure(
+            results, f"NewYorkTimesCovid19Data.generate_stats[{engine}]",
+            newyork_times_covid19_data.generate_stats, df_combined, engine,
+            repeat=repeat)
+    measure(results, "NewYorkTimesCovid19Data.generate_rollups",
+            newyork_times_covid19_data.generate_rollups, df_out,
+            repeat=repeat)
+    # -> Metrics are timed on the output of the last stats engine, to be
+    # compared with the time of generating the statistics
+    measure(results, "StatsMetrics.generate_metrics",
+            StatsMetrics().generate_metrics, df_out, repeat=repeat)
+    measure(results, "NewYorkTimesCovid19Data.sanity_check_prepared_data",
+            newyork_times_covid19_data.sanity_check_prepared_data, df_out,
+            repeat=repeat)
+    measure(results, "DataSet.save_dataframe_as_csv",
+            newyork_times_covid19_data.save_dataframe_as_csv, df_out,
+            os.path.join(output_dir, "output.csv"), repeat=repeat)
+    # -> Reopening the output, parsing the csv file compared to memory
+    # mapping the binary store
+    measure(results, "DataSet.read_saved_dataframe[csv]",
+            newyork_times_covid19_data.read_saved_dataframe,
+            os.path.join(output_dir, "output.csv"), repeat=repeat)
+    measure(results, "StatsBinaryStore.write", StatsBinaryStore.write,
+            df_out, os.path.join(output_dir, "output.bin"), repeat=repeat)
+    measure(results, "StatsBinaryStore.__init__", StatsBinaryStore,
+            os.path.join(output_dir, "output.bin"), repeat=repeat)
+    return results
+
+
+def main():
+    """
+    Function to generate synthetic input files and benchmark the pipeline
+    on them, results are saved as json to compare them across commits
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark the pipeline on synthetic New York Times "
+                    "COVID-19 Data and Population Estimate Data 2019")
+
+    parser.add_argument('--scale',
+                        type=float,
+                        default=0.1,
+                        help="Scale of number of counties compared to real "
+                             "dataset, up to 10")
+
+    parser.add_argument('--number_of_days',
+                        type=int,
+                        default=REAL_NUMBER_OF_DAYS,
+                        help="Number of days")
+
+    parser.add_argument('--repeat',
+                        type=int,
+                        default=3,
+                        help="Number of runs of every step, best time is "
+                             "reported")
+
+    parser.add_argument('--results_path',
+                        type=str,
+                        default="./benchmark_results.json",
+                        help="Path of json file with benchmark results")
+
+    args = parser.parse_args()
+    number_of_counties = int(REAL_NUMBER_OF_COUNTIES * args.scale)
+    with tempfile.TemporaryDirectory() as data_dir:
+        covid19_csv_path = os.path.join(data_dir, "us-counties.csv")
+        population_csv_path = os.path.join(data_dir, "co-est2019-alldata.csv")
+        fips = generate_fips_codes(number_of_counties)
+        generate_population_csv(population_csv_path, fips)
+        generate_covid19_csv(covid19_csv_path, fips, args.number_of_days)
+        number_of_records = sum(1 for _ in open(covid19_csv_path)) - 1
+        results = run_benchmark(covid19_csv_path, population_csv_path,
+                                data_dir, args.repeat)
+    report = {"git_commit": get_git_commit(),
+              "python_version": platform.python_version(),
+              "pandas_version": pd.__version__,
+              "number_of_counties": number_of_counties,
+              "number_of_days": args.number_of_days,
+              "number_of_records": number_of_records,
+              "results": results}
+    with open(args.results_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Completed: save benchmark results to: {args.results_path}")
+
+
+if __name__ == '__main__':
+    main()
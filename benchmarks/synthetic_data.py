@@ -0,0 +1,184 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# Size of the real us-counties.csv dataset used as reference for scaling
+REAL_NUMBER_OF_COUNTIES = 3200
+REAL_NUMBER_OF_DAYS = 800
+
+# First date of New York Times COVID-19 Data
+FIRST_DATE = "2020-01-21"
+
+# State codes used for synthetic fips codes, 72 is Puerto Rico
+STATE_CODES = [c for c in range(1, 57) if c not in [3, 7, 14, 43, 52]] + [72]
+
+# fips codes reported by New York Times without Population Estimate Data
+FIPS_WITHOUT_POPULATION = ["69110", "69120", "78010", "78020", "78030"]
+
+# Counties reported by New York Times without fips code, see
+# "update_df_with_geographic_exceptions" of NewYorkTimesCovid19Data class
+COUNTIES_WITHOUT_FIPS = [("New York City", "New York"),
+                         ("Kansas City", "Missouri"),
+                         ("Joplin", "Missouri")]
+
+
+def generate_fips_codes(number_of_counties: int) -> list:
+    """
+    Function to generate distinct 5 digit fips codes spread over the states
+
+    Parameters:
+    ----------
+    number_of_counties: int, number of fips codes
+
+    Returns:
+    -------
+    fips: list of str, sorted 5 digit fips codes
+    """
+    county_codes = np.arange(number_of_counties) // len(STATE_CODES) + 1
+    state_codes = np.resize(STATE_CODES, number_of_counties)
+    if number_of_counties > len(STATE_CODES) * 999:
+        raise ValueError(f"At most {len(STATE_CODES) * 999} counties "
+                         f"can be generated")
+    return sorted(f"{s:02d}{c:03d}" for s, c in zip(state_codes,
+                                                     county_codes))
+
+
+def generate_population_csv(file_path: str, fips: list, seed: int = 0):
+    """
+    Function to generate a synthetic co-est2019-alldata.csv file, with
+    state summary records, non ASCII county names and ISO-8859-1 encoding
+
+    Parameters:
+    ----------
+    file_path: str, path of the csv file
+    fips: list of str, fips codes of the counties
+    seed: int, seed of the random generator
+    """
+    rng = np.random.default_rng(seed)
+    states = sorted(set(f[:2] for f in fips))
+    df_states = pd.DataFrame({"SUMLEV": "040", "STATE": states,
+                              "COUNTY": "000"})
+    df_counties = pd.DataFrame({"SUMLEV": "050",
+                                "STATE": [f[:2] for f in fips],
+                                "COUNTY": [f[2:] for f in fips]})
+    df = pd.concat([df_states, df_counties]).sort_values(["STATE", "COUNTY"])
+    df["REGION"] = "3"
+    df["DIVISION"] = "6"
+    df["STNAME"] = "State " + df["STATE"]
+    df["CTYNAME"] = "Doña Ana County " + df["COUNTY"]
+    # -> Same columns as the Census file (~160), only a few of them are
+    # needed by the pipeline
+    populations = rng.lognormal(10, 1.3, len(df)).astype(int) + 100
+    columns = {"CENSUS2010POP": populations - 90,
+               "ESTIMATESBASE2010": populations - 90}
+    for year in range(2010, 2020):
+        columns[f"POPESTIMATE{year}"] = populations + (year - 2019) * 10
+    for component in ["NPOPCHG_", "BIRTHS", "DEATHS", "NATURALINC",
+                      "INTERNATIONALMIG", "DOMESTICMIG", "NETMIG",
+                      "RESIDUAL"]:
+        for year in range(2010, 2020):
+            columns[f"{component}{year}"] = rng.integers(-500, 500, len(df))
+    columns["GQESTIMATESBASE2010"] = rng.integers(0, 5000, len(df))
+    for year in range(2010, 2020):
+        columns[f"GQESTIMATES{year}"] = rng.integers(0, 5000, len(df))
+    for component in ["RBIRTH", "RDEATH", "RNATURALINC",
+                      "RINTERNATIONALMIG", "RDOMESTICMIG", "RNETMIG"]:
+        for year in range(2011, 2020):
+            columns[f"{component}{year}"] = \
+                rng.normal(0, 5, len(df)).round(6)
+    df = pd.concat([df.reset_index(drop=True), pd.DataFrame(columns)],
+                   axis=1)
+    df.to_csv(file_path, index=False, encoding="ISO-8859-1")
+
+
+def generate_covid19_csv(file_path: str, fips: list, number_of_days: int,
+                         seed: int = 0):
+    """
+    Function to generate a synthetic us-counties.csv file sorted by date,
+    with counties reporting from different start dates, records without
+    fips code, "Unknown" counties, fips codes without population estimate
+    and Puerto Rico records without deaths
+
+    Parameters:
+    ----------
+    file_path: str, path of the csv file
+    fips: list of str, fips codes of the counties
+    number_of_days: int, number of days
+    seed: int, seed of the random generator
+    """
+    rng = np.random.default_rng(seed)
+    fips = np.array(list(fips) + FIPS_WITHOUT_POPULATION)
+    counties = np.char.add("County ", fips)
+    states = np.char.add("State ", np.array([f[:2] for f in fips]))
+    first_day = rng.integers(0, max(number_of_days // 3, 1), len(fips))
+    dates = pd.date_range(FIRST_DATE, periods=number_of_days)\
+        .strftime("%Y-%m-%d")
+    is_puerto_rico = np.array([f.startswith("72") for f in fips])
+    header = True
+    with open(file_path, "w", newline="") as f:
+        for day, date in enumerate(dates):
+            is_reporting = first_day <= day
+            n = int(is_reporting.sum())
+            df = pd.DataFrame({
+                "date": date,
+                "county": counties[is_reporting],
+                "state": states[is_reporting],
+                "fips": fips[is_reporting],
+                "cases": rng.poisson(20, n),
+                "deaths": rng.poisson(0.5, n).astype(object)})
+            df.loc[is_puerto_rico[is_reporting], "deaths"] = None
+            df_without_fips = pd.DataFrame(
+                [(date, county, state, None, rng.poisson(50), rng.poisson(1))
+                 for county, state in COUNTIES_WITHOUT_FIPS]
+                + [(date, "Unknown", f"State {s:02d}", None, rng.poisson(2),
+                    rng.poisson(0.1)) for s in STATE_CODES[:10]],
+                columns=df.columns)
+            df = pd.concat([df, df_without_fips])
+            df.to_csv(f, index=False, header=header)
+            header = False
+
+
+def main():
+    """
+    Function to generate synthetic New York Times COVID-19 Data and
+    Population Estimate Data 2019 csv files
+    """
+    parser = argparse.ArgumentParser(
+        description="Generate synthetic us-counties.csv and "
+                    "co-est2019-alldata.csv files")
+
+    parser.add_argument('--output_dir',
+                        type=str,
+                        default="./synthetic_data",
+                        help="Directory of generated csv files")
+
+    parser.add_argument('--scale',
+                        type=float,
+                        default=1.0,
+                        help="Scale of number of counties compared to real "
+                             "dataset, up to 10")
+
+    parser.add_argument('--number_of_days',
+                        type=int,
+                        default=REAL_NUMBER_OF_DAYS,
+                        help="Number of days")
+
+    parser.add_argument('--seed',
+                        type=int,
+                        default=0,
+                        help="Seed of the random generator")
+
+    args = parser.parse_args()
+    os.makedirs(args.output_dir, exist_ok=True)
+    fips = generate_fips_codes(int(REAL_NUMBER_OF_COUNTIES * args.scale))
+    generate_population_csv(
+        os.path.join(args.output_dir, "co-est2019-alldata.csv"), fips,
+        args.seed)
+    generate_covid19_csv(os.path.join(args.output_dir, "us-counties.csv"),
+                         fips, args.number_of_days, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,638 @@
 import argparse
-from .newyork_times_covid19_data import NewYorkTimesCovid19Data
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .batch_runner import BatchRunner
+from .binary_store import StatsBinaryStore
+from .dataset import CSV_PARSER_ENGINES, DataSet, OUTPUT_FORMAT_EXTENSIONS, \
+    ROLLUP_LEVELS
+from .delta_output import DELTA_COMPARED_COLUMNS, StatsDelta
+from .download_cache import DownloadCache
+from .newyork_times_covid19_data import NewYorkTimesCovid19Data, \
+    STATS_ENGINES
+from .partitioned_output import PartitionedOutput
+from .pipeline_profiler import PipelineProfiler
 from .population_estimate_data_2019 import PopulationEstimateData2019
+from .sqlite_backend import PIPELINE_ENGINES, SQLITE_LOAD_CHUNKSIZE, \
+    SqliteBackend
+from .stage_checkpoints import CHECKPOINT_STAGES, StageCheckpointCache
+from .stats_metrics import DEFAULT_GROWTH_PERIOD, DEFAULT_PER_CAPITA_BASE, \
+    DEFAULT_ROLLING_WINDOWS, StatsMetrics
+from . import query_service
 
 
-def main():
+def generate_and_save_stats_in_chunks(
+        newyork_times_covid19_data: NewYorkTimesCovid19Data,
+        population_lookup: np.ndarray, df_state: pd.DataFrame,
+        output_file_path: str, append: bool) -> pd.DataFrame:
     """
-    Function to execute all the required steps in a sequence to generate
-    desired output data file
+    Function to stream New York Times COVID-19 Data in chunks, generate the
+    statistics for each chunk and save them to the output file as soon as
+    they are generated
+
+    Parameters:
+    ----------
+    newyork_times_covid19_data: NewYorkTimesCovid19Data object created with
+        a chunksize
+    population_lookup: np.ndarray object with population estimate of
+        every year and fips code
+    df_state: pd.DataFrame object with the state saved by the previous
+        incremental run, None for a full run
+    output_file_path: str, path of the output csv file
+    append: bool, True: append to the existing output file
+
+    Returns:
+    -------
+    df_state: pd.DataFrame object with the cumulative state of each fips
+        code after the last chunk
+    """
+    chunks = newyork_times_covid19_data.read_preprocessed_chunks()
+    df_stats_chunks = newyork_times_covid19_data.generate_stats_from_chunks(
+        chunks, population_lookup, df_state)
+    # -> A new output file is streamed to a temporary file which replaces
+    # the output file after the last chunk
+    stream_file_path = output_file_path if append \
+        else f"{output_file_path}.stream.tmp"
+    is_first_chunk = not append
+    for df_stats, df_state in df_stats_chunks:
+        df_stats = newyork_times_covid19_data.decode_compact_stats(df_stats)
+        if is_first_chunk:
+            df_stats.to_csv(stream_file_path)
+            is_first_chunk = False
+        else:
+            newyork_times_covid19_data.append_dataframe_to_csv(
+                df_stats, stream_file_path)
+    if not append and not is_first_chunk:
+        os.replace(stream_file_path, output_file_path)
+    print("Completed: Generate statistics for all the chunks")
+    return df_state
+
+
+def generate_and_save_stats_with_sqlite(
+        newyork_times_covid19_data: NewYorkTimesCovid19Data,
+        population_lookup: np.ndarray, database_path: str,
+        keep_database: bool, output_file_path: str,
+        profiler: PipelineProfiler):
+    """
+    Function to load New York Times COVID-19 Data chunks and population
+    lookup in a SQLite database, generate the statistics with SQL window
+    functions and save them to the output file batch by batch
+
+    Parameters:
+    ----------
+    newyork_times_covid19_data: NewYorkTimesCovid19Data object created with
+        a chunksize
+    population_lookup: np.ndarray object with population estimate of
+        every year and fips code
+    database_path: str, path of the SQLite database file
+    keep_database: bool, True: keep the database file after the run
+    output_file_path: str, path of the output csv file
+    profiler: PipelineProfiler object recording the stages
+    """
+    sqlite_backend = SqliteBackend(database_path)
+    try:
+        with profiler.stage("load_sqlite") as stage:
+            sqlite_backend.load_population_lookup(population_lookup)
+            stage["rows_out"] = sqlite_backend.load_covid19_chunks(
+                newyork_times_covid19_data.read_preprocessed_chunks())
+        print("Completed: Load covid19 data and population data in SQLite")
+        with profiler.stage("generate_and_save_stats_with_sqlite",
+                            stage["rows_out"]) as stage:
+            # -> The batches are streamed to a temporary file which
+            # replaces the output file after the last batch
+            stage["rows_out"] = 0
+            stream_file_path = f"{output_file_path}.stream.tmp"
+            is_first_batch = True
+            for df_stats in sqlite_backend.generate_stats():
+                if is_first_batch:
+                    df_stats.to_csv(stream_file_path)
+                    is_first_batch = False
+                else:
+                    newyork_times_covid19_data.append_dataframe_to_csv(
+                        df_stats, stream_file_path)
+                stage["rows_out"] += len(df_stats)
+            if not is_first_batch:
+                os.replace(stream_file_path, output_file_path)
+        print("Completed: Generate statistics with SQLite")
+    finally:
+        sqlite_backend.close(remove=not keep_database)
+
+
+def get_population_lookup(population_csv_path: str,
+                          population_lookup_path: str, compact: bool,
+                          download_cache: DownloadCache,
+                          profiler: PipelineProfiler,
+                          csv_engine: str = "c",
+                          checkpoint_cache: StageCheckpointCache = None,
+                          checkpoint_key: str = None,
+                          population_vintage_csv_paths: list = None) \
+        -> np.ndarray:
+    """
+    Function to get and preprocess Population Estimate Data 2019 and other
+    vintage files as a dense population lookup array indexed by year and
+    fips code
+
+    Parameters:
+    ----------
+    population_csv_path: str, path/url for 2019 Population Estimate Data
+    population_lookup_path: str, optional, path of .npy population lookup
+        array, read instead of the csv file if it exists, otherwise saved
+        after preprocessing the csv file
+    compact: bool, True: use compact representation
+    download_cache: DownloadCache object, optional
+    profiler: PipelineProfiler object recording the stages
+    csv_engine: str, one of CSV_PARSER_ENGINES, parser engine of the csv
+        file
+    checkpoint_cache: StageCheckpointCache object, optional, the population
+        lookup is read from and saved to the "preprocess_population"
+        checkpoint
+    checkpoint_key: str, optional, key of the "preprocess_population"
+        checkpoint
+    population_vintage_csv_paths: list of str, optional, paths/urls of
+        other Population Estimate Data vintage files, combined with
+        "combine_population_tables" function of PopulationEstimateData2019
+        class
+
+    Returns:
+    -------
+    population_lookup: np.ndarray object with population estimate of
+        every year and fips code
+    """
+    # -> Population estimate data 2019 is used as a dense lookup array
+    # indexed by year and fips code, which can be reused across runs
+    if (population_lookup_path is not None
+            and os.path.exists(population_lookup_path)):
+        with profiler.stage("read_population_lookup"):
+            return PopulationEstimateData2019.read_population_lookup(
+                population_lookup_path)
+    if checkpoint_cache is not None:
+        with profiler.stage("load_checkpoint") as stage:
+            population_lookup = checkpoint_cache.load(
+                "preprocess_population", checkpoint_key)
+            stage["checkpoint"] = "preprocess_population"
+            stage["checkpoint_hit"] = population_lookup is not None
+        if population_lookup is not None:
+            return population_lookup
+    population_tables = []
+    for csv_path in [population_csv_path] + (population_vintage_csv_paths
+                                             or []):
+        # Get  Population estimate 2019 data
+        with profiler.stage("ingest_population") as stage:
+            population_estimate_data_2019 = PopulationEstimateData2019(
+                csv_path, compact, download_cache, csv_engine)
+            stage["rows_out"] = len(population_estimate_data_2019.df)
+        # preprocess Population estimate data 2019
+        with profiler.stage("preprocess_population",
+                            len(population_estimate_data_2019.df)) as stage:
+            df_population = population_estimate_data_2019.preprocess(
+                population_estimate_data_2019.df)
+            population_tables.append(
+                population_estimate_data_2019.generate_population_table(
+                    df_population))
+            stage["rows_out"] = len(population_tables[-1])
+    # -> One population lookup indexed by year of all the vintage files
+    population_lookup = \
+        PopulationEstimateData2019.generate_population_table_lookup(
+            PopulationEstimateData2019.combine_population_tables(
+                population_tables))
+    if population_lookup_path is not None:
+        population_estimate_data_2019.save_population_lookup(
+            population_lookup, population_lookup_path)
+    if checkpoint_cache is not None:
+        with profiler.stage("save_checkpoint") as stage:
+            checkpoint_cache.save("preprocess_population", checkpoint_key,
+                                  population_lookup)
+            stage["checkpoint"] = "preprocess_population"
+    return population_lookup
+
+
+def run_batch(args: argparse.Namespace, download_cache: DownloadCache,
+              profiler: PipelineProfiler):
+    """
+    Function to process the entries of the batch manifest of
+    --manifest_path with a population lookup built once
+
+    Parameters:
+    ----------
+    args: argparse.Namespace object with the command line arguments
+    download_cache: DownloadCache object, optional
+    profiler: PipelineProfiler object recording the stages
+    """
+    # -> Population data is read and preprocessed once for all the
+    # entries of the manifest
+    entries = BatchRunner.read_manifest(args.manifest_path)
+    population_lookup = get_population_lookup(
+        args.population_csv_path, args.population_lookup_path,
+        args.compact, download_cache, profiler, args.csv_engine,
+        population_vintage_csv_paths=args.population_vintage_csv_paths)
+    with profiler.stage("run_batch"):
+        BatchRunner(population_lookup, args.batch_workers, args.compact,
+                    args.stats_engine, args.csv_engine,
+                    args.output_format, download_cache,
+                    args.apply_sanity_check_on_output_data,
+                    args.profile_tracemalloc).run(entries, profiler)
+    print(f"Completed: process {len(entries)} entries of batch manifest "
+          f"{args.manifest_path}")
+
+
+def load_checkpoint(checkpoint_cache: StageCheckpointCache,
+                    checkpoint_keys: dict, profiler: PipelineProfiler) \
+        -> tuple:
+    """
+    Function to load the last checkpoint of the pipeline matching the
+    source files, the stages before it are skipped
+
+    Parameters:
+    ----------
+    checkpoint_cache: StageCheckpointCache object
+    checkpoint_keys: dict, stage name to key as returned by
+        "get_stage_keys" function of StageCheckpointCache class
+    profiler: PipelineProfiler object recording the stages
+
+    Returns:
+    -------
+    df_covid19: pd.DataFrame object with preprocessed New York Times
+        COVID-19 Data, None if it is not loaded
+    df_combined: pd.DataFrame object with combined data, None if it is
+        not loaded
+    """
+    with profiler.stage("load_checkpoint") as stage:
+        for name in ["combine_with_population", "preprocess_covid19"]:
+            stage["checkpoint"] = name
+            df_checkpoint = checkpoint_cache.load(name, checkpoint_keys[name])
+            if df_checkpoint is not None:
+                stage["rows_out"] = len(df_checkpoint)
+                break
+        stage["checkpoint_hit"] = df_checkpoint is not None
+    if df_checkpoint is None:
+        return None, None
+    print(f"Completed: load {name} checkpoint from: "
+          f"{checkpoint_cache.cache_dir}")
+    if name == "combine_with_population":
+        return None, df_checkpoint
+    return df_checkpoint, None
+
+
+def preprocess_and_combine(
+        newyork_times_covid19_data: NewYorkTimesCovid19Data,
+        population_lookup: np.ndarray, df_covid19: pd.DataFrame,
+        checkpoint_cache: StageCheckpointCache, checkpoint_keys: dict,
+        profiler: PipelineProfiler) -> pd.DataFrame:
+    """
+    Function to preprocess New York Times COVID-19 Data in memory and to
+    combine it with the population lookup, the results are saved as
+    checkpoints if checkpoint_cache is provided
+
+    Parameters:
+    ----------
+    newyork_times_covid19_data: NewYorkTimesCovid19Data object
+    population_lookup: np.ndarray object with population estimate of
+        every year and fips code
+    df_covid19: pd.DataFrame object with preprocessed New York Times
+        COVID-19 Data loaded from a checkpoint, None to preprocess the
+        records of newyork_times_covid19_data
+    checkpoint_cache: StageCheckpointCache object, optional
+    checkpoint_keys: dict, stage name to checkpoint key
+    profiler: PipelineProfiler object recording the stages
+
+    Returns:
+    -------
+    df_combined: pd.DataFrame object with combined data as returned by
+        "combine_with_population_lookup" function
+    """
+    # preprocess newyork times covid19 data
+    if df_covid19 is None:
+        with profiler.stage("preprocess_covid19",
+                            len(newyork_times_covid19_data.df)) as stage:
+            df_covid19 = newyork_times_covid19_data.preprocess(
+                newyork_times_covid19_data.df)
+            stage["rows_out"] = len(df_covid19)
+        if checkpoint_cache is not None:
+            with profiler.stage("save_checkpoint") as stage:
+                checkpoint_cache.save(
+                    "preprocess_covid19",
+                    checkpoint_keys["preprocess_covid19"], df_covid19)
+                stage["checkpoint"] = "preprocess_covid19"
+    print("Completed: Get and preprocessed Raw data")
+    # -------------------------------------------------------------------------
+    # 3. Combine covid19 data and population data using left join
+    # Combine the df_covid19 with population lookup using fips column
+    with profiler.stage("combine_with_population", len(df_covid19)) as stage:
+        df_combined = \
+            newyork_times_covid19_data.combine_with_population_lookup(
+                df_covid19, population_lookup)
+        stage["rows_out"] = len(df_combined)
+    if checkpoint_cache is not None:
+        with profiler.stage("save_checkpoint") as stage:
+            checkpoint_cache.save(
+                "combine_with_population",
+                checkpoint_keys["combine_with_population"], df_combined)
+            stage["checkpoint"] = "combine_with_population"
+    print("Completed: Combine covid19 data and population data using left "
+          "join")
+    return df_combined
+
+
+def generate_stats_in_memory(
+        args: argparse.Namespace,
+        newyork_times_covid19_data: NewYorkTimesCovid19Data,
+        df_combined: pd.DataFrame, df_state: pd.DataFrame,
+        profiler: PipelineProfiler) -> tuple:
+    """
+    Function to generate the statistics, the rollups of --rollups and the
+    metrics of --metrics of the combined data in memory
+
+    Parameters:
+    ----------
+    args: argparse.Namespace object with the command line arguments
+    newyork_times_covid19_data: NewYorkTimesCovid19Data object
+    df_combined: pd.DataFrame object with combined data
+    df_state: pd.DataFrame object with the state saved by the previous
+        incremental run, None for a full run
+    profiler: PipelineProfiler object recording the stages
+
+    Returns:
+    -------
+    df_out: pd.DataFrame object indexed by ("fips", "date") with generated
+        statistics, only for the new records if df_state is provided
+    rollups: dict, rollup level to pd.DataFrame object as returned by
+        "generate_rollups" function, None without --rollups
+    """
+    # generate stats on combined dataframe
+    with profiler.stage("generate_stats", len(df_combined)) as stage:
+        if df_state is not None:
+            df_out = newyork_times_covid19_data.generate_incremental_stats(
+                df_combined, df_state)
+        elif args.workers > 1:
+            df_out = newyork_times_covid19_data.generate_stats_in_parallel(
+                df_combined, args.stats_engine, args.workers)
+        else:
+            df_out = newyork_times_covid19_data.generate_stats(
+                df_combined, args.stats_engine)
+        stage["rows_out"] = len(df_out)
+    print("Completed: Generate statistics for combined dataframe")
+    rollups = None
+    if args.rollups:
+        with profiler.stage("generate_rollups", len(df_out)) as stage:
+            rollups = newyork_times_covid19_data.generate_rollups(df_out)
+            stage["rows_out"] = sum(len(df) for df in rollups.values())
+        print("Completed: Generate state and national rollups")
+    if args.metrics:
+        stats_metrics = StatsMetrics(args.rolling_windows,
+                                     args.per_capita_base, args.growth_period)
+        with profiler.stage("generate_metrics", len(df_out)) as stage:
+            df_out = stats_metrics.generate_metrics(df_out)
+            stage["rows_out"] = len(df_out)
+        print("Completed: Generate metrics for statistics")
+    return df_out, rollups
+
+
+def save_outputs(args: argparse.Namespace, output_format: str,
+                 newyork_times_covid19_data: NewYorkTimesCovid19Data,
+                 df_out: pd.DataFrame, rollups: dict, append: bool,
+                 profiler: PipelineProfiler) -> pd.DataFrame:
+    """
+    Function to save the statistics generated in memory to the output file
+    and to the other outputs requested by the command line arguments: delta,
+    binary store, partitioned output and rollups
+
+    Parameters:
+    ----------
+    args: argparse.Namespace object with the command line arguments
+    output_format: str, one of OUTPUT_FORMAT_EXTENSIONS keys
+    newyork_times_covid19_data: NewYorkTimesCovid19Data object
+    df_out: pd.DataFrame object indexed by ("fips", "date") with generated
+        statistics
+    rollups: dict, rollup level to pd.DataFrame object, None without
+        --rollups
+    append: bool, True: df_out has the new records of an incremental run,
+        which are appended to the existing outputs
+    profiler: PipelineProfiler object recording the stages
+
+    Returns:
+    -------
+    df_out_decoded: pd.DataFrame object, df_out with decoded "fips" and
+        "date" as saved in the output file
+    """
+    df_out_decoded = newyork_times_covid19_data.decode_compact_stats(df_out)
+    # -> The delta is generated against the output file of the previous
+    # run, before it is replaced
+    if args.delta_output_path is not None:
+        with profiler.stage("generate_delta", len(df_out_decoded)) as stage:
+            stats_delta = StatsDelta()
+            if os.path.exists(args.output_file_path):
+                df_previous = stats_delta.read_saved_dataframe(
+                    args.output_file_path, output_format)
+            else:
+                df_previous = pd.DataFrame(
+                    columns=["fips", "date"] + DELTA_COMPARED_COLUMNS)
+            df_delta = stats_delta.generate_delta(df_previous,
+                                                  df_out_decoded)
+            stats_delta.save_dataframe(df_delta, args.delta_output_path)
+            stage["rows_out"] = len(df_delta)
+        print(f"Completed: save delta of "
+              f"{df_delta['change'].value_counts().to_dict()} records "
+              f"to: {args.delta_output_path}")
+    with profiler.stage("save_output", len(df_out)) as stage:
+        if append:
+            newyork_times_covid19_data.append_dataframe_to_csv(
+                df_out_decoded, args.output_file_path)
+        else:
+            newyork_times_covid19_data.save_dataframe(
+                df_out_decoded, args.output_file_path, output_format)
+        stage["rows_out"] = len(df_out_decoded)
+    if args.binary_store_path is not None:
+        with profiler.stage("save_binary_store", len(df_out_decoded)):
+            StatsBinaryStore.write(df_out_decoded, args.binary_store_path)
+        print(f"Completed: save binary store to: {args.binary_store_path}")
+    if args.partitioned_output_dir is not None:
+        with profiler.stage("save_partitioned_output", len(df_out_decoded)):
+            # -> An incremental run updates the partitions in the format of
+            # the existing directory
+            partitioned_output = PartitionedOutput(
+                args.partitioned_output_dir,
+                None if append else output_format)
+            if append:
+                partition_names = partitioned_output.update(df_out_decoded)
+                print(f"Completed: rewrite {len(partition_names)} "
+                      f"partitions in: {args.partitioned_output_dir}")
+            else:
+                partitioned_output.write(df_out_decoded)
+                print(f"Completed: save partitioned output to: "
+                      f"{args.partitioned_output_dir}")
+    if rollups is not None:
+        with profiler.stage("save_rollups"):
+            for level in ROLLUP_LEVELS:
+                rollup_file_path = \
+                    newyork_times_covid19_data.get_rollup_file_path(
+                        args.output_file_path, level, output_format)
+                newyork_times_covid19_data.save_dataframe(
+                    rollups[level], rollup_file_path, output_format)
+                print(f"Completed: save {level} rollup to: "
+                      f"{rollup_file_path}")
+    return df_out_decoded
+
+
+def run_single_input(args: argparse.Namespace, output_format: str,
+                     download_cache: DownloadCache,
+                     profiler: PipelineProfiler):
+    """
+    Function to generate the statistics of --covid19_csv_path and to save
+    them to --output_file_path with the engine of the command line
+    arguments
+
+    Parameters:
+    ----------
+    args: argparse.Namespace object with the command line arguments
+    output_format: str, one of OUTPUT_FORMAT_EXTENSIONS keys
+    download_cache: DownloadCache object, optional
+    profiler: PipelineProfiler object recording the stages
+    """
+    # -> With --checkpoint_dir the last checkpoint of the pipeline matching
+    # the source files is loaded first and the stages before it are
+    # skipped. Remote files are resolved once, to fingerprint the files
+    # of the download cache
+    covid19_csv_path = args.covid19_csv_path
+    population_csv_path = args.population_csv_path
+    population_vintage_csv_paths = args.population_vintage_csv_paths
+    checkpoint_cache = None
+    checkpoint_keys = {}
+    df_covid19 = None
+    df_combined = None
+    if args.checkpoint_dir is not None:
+        checkpoint_cache = StageCheckpointCache(
+            args.checkpoint_dir,
+            args.checkpoint_max_size_mb and
+            args.checkpoint_max_size_mb * 2 ** 20,
+            args.force_stage)
+        covid19_csv_path = DataSet().get_local_file_path(covid19_csv_path,
+                                                         download_cache)
+        population_csv_path = DataSet().get_local_file_path(
+            population_csv_path, download_cache)
+        population_vintage_csv_paths = [
+            DataSet().get_local_file_path(csv_path, download_cache)
+            for csv_path in population_vintage_csv_paths]
+        checkpoint_keys = checkpoint_cache.get_stage_keys(
+            covid19_csv_path, population_csv_path, args.compact,
+            population_vintage_csv_paths, args.population_lookup_path)
+        df_covid19, df_combined = load_checkpoint(checkpoint_cache,
+                                                  checkpoint_keys, profiler)
+    # -------------------------------------------------------------------------
+    # 2. Get and preprocess Raw data
+    # -> With --concurrent_ingest population estimate data 2019 is fetched,
+    # parsed and preprocessed in a worker thread while the much larger
+    # newyork times covid 19 data is fetched and parsed, the worker thread
+    # records its stages with its own profiler
+    population_profiler = profiler
+    population_executor = None
+    if df_combined is not None:
+        # -> Population data is only used to generate the combined data
+        population_lookup = None
+    elif args.concurrent_ingest:
+        population_profiler = PipelineProfiler()
+        population_executor = ThreadPoolExecutor(max_workers=1)
+        population_future = population_executor.submit(
+            get_population_lookup, population_csv_path,
+            args.population_lookup_path, args.compact, download_cache,
+            population_profiler, args.csv_engine, checkpoint_cache,
+            checkpoint_keys.get("preprocess_population"),
+            population_vintage_csv_paths)
+    else:
+        population_lookup = get_population_lookup(
+            population_csv_path, args.population_lookup_path,
+            args.compact, download_cache, profiler, args.csv_engine,
+            checkpoint_cache, checkpoint_keys.get("preprocess_population"),
+            population_vintage_csv_paths)
+
+    # Get the newyork times covid 19 data
+    # -> The sqlite engine always streams the covid19 data in chunks
+    chunksize = args.chunksize
+    if args.engine == "sqlite" and chunksize is None:
+        chunksize = SQLITE_LOAD_CHUNKSIZE
+    with profiler.stage("ingest_covid19") as stage:
+        newyork_times_covid19_data = NewYorkTimesCovid19Data(
+            covid19_csv_path, chunksize, args.compact, download_cache,
+            args.csv_engine,
+            lazy=df_covid19 is not None or df_combined is not None)
+        if newyork_times_covid19_data.df is not None:
+            stage["rows_out"] = len(newyork_times_covid19_data.df)
+    if population_executor is not None:
+        population_lookup = population_future.result()
+        population_executor.shutdown()
+        profiler.stages.extend(population_profiler.stages)
+    # -> In incremental mode the last cumulative state of each fips code is
+    # saved next to the output file and the stats are only generated for
+    # the newly published records
+    state_file_path = f"{args.output_file_path}.state.csv"
+    df_saved_state = None
+    if (args.incremental and os.path.exists(state_file_path)
+            and os.path.exists(args.output_file_path)):
+        df_saved_state = newyork_times_covid19_data.read_stats_state(
+            state_file_path)
+    df_out = None
+    if args.engine == "sqlite":
+        # -> Steps 2 to 5 are applied in SQLite, the records are streamed
+        # to the database and the statistics are streamed out of it
+        generate_and_save_stats_with_sqlite(
+            newyork_times_covid19_data, population_lookup,
+            args.sqlite_path or f"{args.output_file_path}.sqlite",
+            args.sqlite_path is not None, args.output_file_path, profiler)
+    elif args.chunksize:
+        # -> Steps 2 to 5 are applied chunk by chunk, so the statistics are
+        # generated and saved while the covid19 data is streamed
+        with profiler.stage("stream_stats_in_chunks"):
+            df_state = generate_and_save_stats_in_chunks(
+                newyork_times_covid19_data, population_lookup,
+                df_saved_state, args.output_file_path,
+                df_saved_state is not None)
+    else:
+        if df_combined is None:
+            df_combined = preprocess_and_combine(
+                newyork_times_covid19_data, population_lookup, df_covid19,
+                checkpoint_cache, checkpoint_keys, profiler)
+        # ---------------------------------------------------------------------
+        # 4. Generate statistics for combined dataframe
+        df_out, rollups = generate_stats_in_memory(
+            args, newyork_times_covid19_data, df_combined, df_saved_state,
+            profiler)
+        # ---------------------------------------------------------------------
+        # 5. save generated dataframe to out path
+        df_out_decoded = save_outputs(
+            args, output_format, newyork_times_covid19_data, df_out, rollups,
+            df_saved_state is not None, profiler)
+        if args.incremental:
+            df_state = newyork_times_covid19_data.generate_stats_state(
+                df_out, df_saved_state)
+    if args.incremental:
+        df_state = newyork_times_covid19_data.decode_compact_stats(df_state)
+        newyork_times_covid19_data.save_dataframe_as_csv(
+            df_state.set_index("fips"), state_file_path)
+    print(
+        f"Completed: save generated dataframe to out path: {args.output_file_path}")
+    if args.apply_sanity_check_on_output_data:
+        if df_out is None:
+            print("Sanity check is not applied on output data generated "
+                  "in chunks")
+        else:
+            # -> The output of an incremental run only has the fips codes
+            # with records later than the saved state
+            expected_fips = None
+            if df_saved_state is not None:
+                expected_fips = newyork_times_covid19_data.select_new_records(
+                    df_combined, df_saved_state)["fips"].unique()
+            with profiler.stage("sanity_check", len(df_out_decoded)):
+                newyork_times_covid19_data.sanity_check_prepared_data(
+                    df_out_decoded, expected_fips)
+
+
+def get_argument_parser() -> argparse.ArgumentParser:
+    """
+    Function to get the parser of the command line arguments
     """
-    # 1. Get the command line arguments
     parser = argparse.ArgumentParser(
         description="Prepare Covid19 cases summary with population for New York Times COVID-19 Data")
 
@@ -21,56 +645,373 @@ def main():
                         default="https://www2.census.gov/programs-surveys/popest/datasets/2010-2019/counties/totals/co-est2019-alldata.csv",
                         help="URL/Path for 2019 Population Estimate Data")
 
+    parser.add_argument('--population_vintage_csv_paths',
+                        '--population-vintage-csv-paths',
+                        type=str,
+                        nargs="+",
+                        default=[],
+                        help="URLs/Paths of other Population Estimate Data "
+                             "vintage files, for example "
+                             "co-est2023-alldata.csv, every record gets the "
+                             "population estimate of the year of its date "
+                             "from the latest vintage, or of the nearest "
+                             "year with an estimate")
+
     parser.add_argument('--output_file_path',
                         type=str,
                         default="./aggregated_covid19_data_with_population.csv",
-                        help="Path of output csv file")
+                        help="Path of output file, format is inferred from "
+                             "the extension: .csv, .csv.gz, .csv.zst, "
+                             ".parquet, .feather or .arrow")
 
     parser.add_argument('--apply_sanity_check_on_output_data',
                         type=bool,
                         default=False,
                         help="boolean value, True: apply sanity check on output data")
 
+    parser.add_argument('--stats_engine',
+                        type=str,
+                        default="vectorized",
+                        choices=STATS_ENGINES,
+                        help="Engine used to generate statistics, "
+                             "vectorized: single pass grouped cumulative sums, "
+                             "groupby: per fips code groupby.apply")
+
+    parser.add_argument('--incremental',
+                        action="store_true",
+                        help="Only process records published after the last "
+                             "run and append them to the output file, using "
+                             "the state saved next to the output file")
+
+    parser.add_argument('--chunksize',
+                        type=int,
+                        default=None,
+                        help="Stream New York Times COVID-19 Data in chunks "
+                             "of given number of records to bound the peak "
+                             "memory, the input must be sorted by date "
+                             "and the output is saved in chunk order")
+
+    parser.add_argument('--compact',
+                        action="store_true",
+                        help="Use compact typed representation in memory, "
+                             "fips/cases/deaths/population as int32 and date "
+                             "as day offset, decoded back to strings on output")
+
+    parser.add_argument('--cache_dir', '--cache-dir',
+                        type=str,
+                        default=None,
+                        help="Directory of the local download cache for "
+                             "remote source files, no cache if not provided")
+
+    parser.add_argument('--offline',
+                        action="store_true",
+                        help="Read remote source files only from the "
+                             "download cache, requires --cache_dir")
+
+    parser.add_argument('--cache_max_size_mb',
+                        type=int,
+                        default=None,
+                        help="Maximum size of the download cache in MB, "
+                             "least recently used files are evicted at the "
+                             "end of the run")
+
+    parser.add_argument('--cache_max_age_days',
+                        type=int,
+                        default=None,
+                        help="Maximum age of files in the download cache "
+                             "in days")
+
+    parser.add_argument('--output_format',
+                        type=str,
+                        default=None,
+                        choices=list(OUTPUT_FORMAT_EXTENSIONS),
+                        help="Format of output file, inferred from the "
+                             "extension of output file path if not provided")
+
+    parser.add_argument('--workers',
+                        type=int,
+                        default=1,
+                        help="Number of worker processes used to generate "
+                             "statistics on fips code shards")
+
+    parser.add_argument('--population_lookup_path',
+                        type=str,
+                        default=None,
+                        help="Path of .npy population lookup array indexed "
+                             "by year and fips code, reused instead of "
+                             "parsing the population csv files if it exists, "
+                             "otherwise saved after parsing them")
+
+    parser.add_argument('--profile_report', '--profile-report',
+                        type=str,
+                        default=None,
+                        help="Path of json run report with wall time, cpu "
+                             "time, peak memory and record counts of every "
+                             "pipeline stage")
+
+    parser.add_argument('--profile_tracemalloc',
+                        action="store_true",
+                        help="Record tracemalloc peak of every stage in the "
+                             "run report, slows down the run")
+
+    parser.add_argument('--profile_cprofile_dir',
+                        type=str,
+                        default=None,
+                        help="Directory to save a cProfile capture of every "
+                             "stage as <stage>-<index>.prof")
+
+    parser.add_argument('--concurrent_ingest',
+                        action="store_true",
+                        help="Fetch, parse and preprocess population data in "
+                             "a worker thread while New York Times COVID-19 "
+                             "Data is fetched and parsed")
+
+    parser.add_argument('--metrics',
+                        action="store_true",
+                        help="Add rolling average, per capita and growth "
+                             "metric columns to the output")
+
+    parser.add_argument('--rolling_windows',
+                        type=int,
+                        nargs="+",
+                        default=DEFAULT_ROLLING_WINDOWS,
+                        help="Rolling windows in days of the daily averages "
+                             "added by --metrics")
+
+    parser.add_argument('--per_capita_base',
+                        type=int,
+                        default=DEFAULT_PER_CAPITA_BASE,
+                        help="Number of people of the per capita rates added "
+                             "by --metrics")
+
+    parser.add_argument('--growth_period',
+                        type=int,
+                        default=DEFAULT_GROWTH_PERIOD,
+                        help="Period in days of the growth ratios added by "
+                             "--metrics, 0 to disable them")
+
+    parser.add_argument('--rollups',
+                        action="store_true",
+                        help="Save state and national rollups of the "
+                             "statistics next to the output file as "
+                             "<output>.state_rollup<extension> and "
+                             "<output>.national_rollup<extension>")
+
+    parser.add_argument('--partitioned_output_dir',
+                        type=str,
+                        default=None,
+                        help="Also save the statistics in this directory as "
+                             "state=XX/month=YYYY-MM partitions in the output "
+                             "format with a manifest.json, incremental runs "
+                             "only rewrite the partitions having new records")
+
+    parser.add_argument('--engine',
+                        type=str,
+                        default="pandas",
+                        choices=PIPELINE_ENGINES,
+                        help="Pipeline backend, pandas: in memory "
+                             "dataframes, sqlite: out of core join and "
+                             "cumulative sums in an on-disk SQLite database")
+
+    parser.add_argument('--sqlite_path',
+                        type=str,
+                        default=None,
+                        help="Path of the SQLite database of --engine sqlite, "
+                             "kept after the run if provided, otherwise a "
+                             "temporary <output>.sqlite file is used")
+
+    parser.add_argument('--delta_output_path',
+                        type=str,
+                        default=None,
+                        help="Path of the delta file with the inserted, "
+                             "updated and deleted (fips, date) records "
+                             "compared to the existing output file, saved "
+                             "before the output file is replaced, format is "
+                             "inferred from the extension")
+
+    parser.add_argument('--csv_engine',
+                        type=str,
+                        default="c",
+                        choices=CSV_PARSER_ENGINES,
+                        help="Parser engine of the source csv files, pyarrow "
+                             "is multithreaded and used if pyarrow is "
+                             "installed, not used for files read in chunks")
+
+    parser.add_argument('--binary_store_path',
+                        type=str,
+                        default=None,
+                        help="Also save the statistics as a binary store "
+                             "file (.bin) which is memory mapped by readers "
+                             "instead of parsing the output file")
+
+    parser.add_argument('--checkpoint_dir', '--checkpoint-dir',
+                        type=str,
+                        default=None,
+                        help="Directory of the stage checkpoints, the "
+                             "preprocessed and combined data are saved there "
+                             "and reused while the source files, the "
+                             "parameters and the code are unchanged")
+
+    parser.add_argument('--force_stage', '--force-stage',
+                        type=str,
+                        nargs="+",
+                        default=[],
+                        choices=list(CHECKPOINT_STAGES),
+                        help="Recompute these stages and the stages "
+                             "depending on them even if a checkpoint exists")
+
+    parser.add_argument('--checkpoint_max_size_mb',
+                        type=int,
+                        default=None,
+                        help="Maximum size of the checkpoint directory in "
+                             "MB, least recently used checkpoints are "
+                             "evicted")
+
+    parser.add_argument('--manifest_path', '--manifest-path',
+                        type=str,
+                        default=None,
+                        help="Path of a json batch manifest, a list of "
+                             "{\"covid19_csv_path\": ..., "
+                             "\"output_file_path\": ...} entries processed "
+                             "with a population lookup built once, instead "
+                             "of --covid19_csv_path and --output_file_path")
+
+    parser.add_argument('--batch_workers', '--batch-workers',
+                        type=int,
+                        default=2,
+                        help="Number of worker processes of the batch "
+                             "manifest entries, at most this number of "
+                             "entries are in memory at a time")
+    return parser
+
+
+def check_arguments(parser: argparse.ArgumentParser,
+                    args: argparse.Namespace, output_format: str):
+    """
+    Function to reject the command line arguments which can not be used
+    together, the parser exits with an error message
+
+    Parameters:
+    ----------
+    parser: argparse.ArgumentParser object returned by
+        "get_argument_parser" function
+    args: argparse.Namespace object with the parsed arguments
+    output_format: str, one of OUTPUT_FORMAT_EXTENSIONS keys
+    """
+    if args.offline and args.cache_dir is None:
+        parser.error("--offline requires --cache_dir")
+    if (args.incremental or args.chunksize) and output_format != "csv":
+        parser.error("--incremental and --chunksize require csv output "
+                     "format")
+    # -> Metrics need the history of every fips code, which is not available
+    # to incremental runs and to chunks
+    if args.metrics and (args.incremental or args.chunksize):
+        parser.error("--metrics can not be used with --incremental or "
+                     "--chunksize")
+    # -> Rollups of a date need all the records of the date, which can be
+    # split between chunks and between the runs of incremental mode
+    if args.rollups and (args.incremental or args.chunksize):
+        parser.error("--rollups can not be used with --incremental or "
+                     "--chunksize")
+    if args.partitioned_output_dir is not None and args.chunksize:
+        parser.error("--partitioned_output_dir can not be used with "
+                     "--chunksize")
+    if args.delta_output_path is not None and (
+            args.incremental or args.chunksize or args.engine == "sqlite"):
+        parser.error("--delta_output_path can not be used with "
+                     "--incremental, --chunksize or --engine sqlite")
+    if args.binary_store_path is not None and (
+            args.incremental or args.chunksize or args.engine == "sqlite"):
+        parser.error("--binary_store_path can not be used with "
+                     "--incremental, --chunksize or --engine sqlite")
+    if args.force_stage and args.checkpoint_dir is None:
+        parser.error("--force_stage requires --checkpoint_dir")
+    # -> Chunked runs never hold the preprocessed data in memory, so there
+    # is nothing to checkpoint
+    if args.checkpoint_dir is not None and (
+            args.chunksize or args.engine == "sqlite"):
+        parser.error("--checkpoint_dir can not be used with --chunksize or "
+                     "--engine sqlite")
+    # -> Batch entries only run the core pipeline, every entry is processed
+    # by a single worker process
+    if args.manifest_path is not None and (
+            args.incremental or args.chunksize or args.engine == "sqlite"
+            or args.checkpoint_dir is not None or args.metrics
+            or args.rollups or args.partitioned_output_dir is not None
+            or args.delta_output_path is not None
+            or args.binary_store_path is not None or args.workers > 1):
+        parser.error("--manifest_path can not be used with --incremental, "
+                     "--chunksize, --engine sqlite, --checkpoint_dir, "
+                     "--metrics, --rollups, --partitioned_output_dir, "
+                     "--delta_output_path, --binary_store_path or "
+                     "--workers")
+    if args.batch_workers < 1:
+        parser.error("--batch_workers should be at least 1")
+    if args.engine == "sqlite" and (
+            args.incremental or args.metrics or args.rollups
+            or args.partitioned_output_dir is not None
+            or output_format != "csv"):
+        parser.error("--engine sqlite requires csv output format and can "
+                     "not be used with --incremental, --metrics, --rollups "
+                     "or --partitioned_output_dir")
+
+
+def main():
+    """
+    Function to execute all the required steps in a sequence to generate
+    desired output data file, or to serve the output data file with
+    "serve" command
+
+    Explanation:
+        The batch manifest mode is run by "run_batch" function. Otherwise
+        the source data is ingested and the statistics are generated and
+        saved by the function of the engine: "generate_and_save_stats_with_
+        sqlite" for --engine sqlite, "generate_and_save_stats_in_chunks"
+        for --chunksize, or in memory by "preprocess_and_combine",
+        "generate_stats_in_memory" and "save_outputs" functions
+    """
+    if sys.argv[1:2] == ["serve"]:
+        query_service.main(sys.argv[2:])
+        return
+    # 1. Get the command line arguments
+    parser = get_argument_parser()
     args = parser.parse_args()
-    print(f"Reading New York Times COVID-19 Data from {args.covid19_csv_path}")
+    output_format = (args.output_format
+                     or DataSet().infer_output_format(args.output_file_path))
+    check_arguments(parser, args, output_format)
+    if args.manifest_path is None:
+        print(f"Reading New York Times COVID-19 Data from "
+              f"{args.covid19_csv_path}")
+        print(f"Output file path for processed file is: "
+              f"{args.output_file_path}")
+    else:
+        print(f"Reading batch manifest from {args.manifest_path}")
     print(
         f"Reading 2019 Population Estimate Data from {args.population_csv_path}")
-    print(f"Output file path for processed file is: {args.output_file_path}")
-    # -------------------------------------------------------------------------
-    # 2. Get and preprocess Raw data
-    # Get the newyork times covid 19 data
-    newyork_times_covid19_data = NewYorkTimesCovid19Data(
-        args.covid19_csv_path)
-    # preprocess newyork times covid19 data
-    df_covid19 = newyork_times_covid19_data.preprocess(
-        newyork_times_covid19_data.df)
-
-    # Get  Population estimate 2019 data
-    population_estimate_data_2019 = PopulationEstimateData2019(
-        args.population_csv_path)
-    # preprocess Population estimate data 2019
-    df_population = population_estimate_data_2019.preprocess(
-        population_estimate_data_2019.df)
-    print("Completed: Get and preprocessed Raw data")
-    # -------------------------------------------------------------------------
-    # 3. Combine covid19 data and population data using left join
-    # Combine the df_covid19 with df_population dataframes using fips column
-    df_combined = newyork_times_covid19_data.combine_with_population_data(
-        df_covid19, df_population)
-    print("Completed: Combine covid19 data and population data using left join")
-    # -------------------------------------------------------------------------
-    # 4. Generate statistics for combined dataframe
-    # generate stats on combined dataframe
-    df_out = newyork_times_covid19_data.generate_stats(df_combined)
-    print("Completed: Generate statistics for combined dataframe")
-    # -------------------------------------------------------------------------
-    # 5. save generated dataframe to out path
-    newyork_times_covid19_data.save_dataframe_as_csv(df_out,
-                                                     args.output_file_path)
-    print(
-        f"Completed: save generated dataframe to out path: {args.output_file_path}")
-    if args.apply_sanity_check_on_output_data:
-        newyork_times_covid19_data.sanity_check_prepared_data(df_out)
+    for population_vintage_csv_path in args.population_vintage_csv_paths:
+        print(f"Reading Population Estimate Data from "
+              f"{population_vintage_csv_path}")
+    download_cache = None
+    if args.cache_dir is not None:
+        download_cache = DownloadCache(
+            args.cache_dir, args.offline,
+            args.cache_max_size_mb and args.cache_max_size_mb * 2 ** 20,
+            args.cache_max_age_days and args.cache_max_age_days * 86400)
+    # -> Every step is recorded as a stage by the profiler, the run report
+    # is saved if --profile_report is provided
+    profiler = PipelineProfiler(args.profile_tracemalloc,
+                                args.profile_cprofile_dir)
+    if args.manifest_path is not None:
+        run_batch(args, download_cache, profiler)
+    else:
+        run_single_input(args, output_format, download_cache, profiler)
+    # -> Files of the download cache are only evicted at the end of the run,
+    # when they are no longer used by the worker threads and processes
+    if download_cache is not None:
+        download_cache.evict()
+    if args.profile_report is not None:
+        profiler.save_report(args.profile_report)
+        print(f"Completed: save profile report to: {args.profile_report}")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,265 @@
+import json
+import multiprocessing
+import os
+
+import numpy as np
+
+from .download_cache import DownloadCache, is_url
+from .exceptions import InputError
+from .newyork_times_covid19_data import NewYorkTimesCovid19Data
+from .pipeline_profiler import PipelineProfiler
+
+# Keys of every entry of a batch manifest
+# -> "covid19_csv_path": path/url of a New York Times COVID-19 Data file
+# -> "output_file_path": path of the output file of the entry
+BATCH_MANIFEST_REQUIRED_KEYS = ["covid19_csv_path", "output_file_path"]
+
+# Optional keys of every entry of a batch manifest
+# -> "output_format": one of OUTPUT_FORMAT_EXTENSIONS keys, inferred from
+# the output file extension if not provided
+BATCH_MANIFEST_OPTIONAL_KEYS = ["output_format"]
+
+# Input shared by the entries processed in a batch worker process, set
+# once per worker by "init_batch_worker" function so the population lookup
+# is not sent with every entry
+BATCH_WORKER_INPUT = {}
+
+
+def init_batch_worker(population_lookup: np.ndarray, options: dict):
+    """
+    Function to set the input shared by the entries processed in the
+    current process
+
+    Parameters:
+    ----------
+    population_lookup: np.ndarray object with population estimate of
+        every year and fips code
+    options: dict, "options" attribute of BatchRunner class
+    """
+    BATCH_WORKER_INPUT.update({"population_lookup": population_lookup,
+                               "options": options})
+
+
+def process_batch_entry(entry: dict) -> list:
+    """
+    Function to generate and save the statistics of a batch manifest entry
+    with the population lookup and options set by "init_batch_worker"
+    function
+
+    Parameters:
+    ----------
+    entry: dict, entry of the batch manifest
+
+    Returns:
+    -------
+    stages: list of dict, stage records of PipelineProfiler class, with the
+        "covid19_csv_path" of the entry
+    """
+    population_lookup = BATCH_WORKER_INPUT["population_lookup"]
+    options = BATCH_WORKER_INPUT["options"]
+    profiler = PipelineProfiler(options["trace_memory"])
+    with profiler.stage("ingest_covid19") as stage:
+        newyork_times_covid19_data = NewYorkTimesCovid19Data(
+            entry["covid19_csv_path"], compact=options["compact"],
+            download_cache=options["download_cache"],
+            csv_engine=options["csv_engine"])
+        stage["rows_out"] = len(newyork_times_covid19_data.df)
+    with profiler.stage("preprocess_covid19",
+                        len(newyork_times_covid19_data.df)) as stage:
+        df = newyork_times_covid19_data.preprocess(
+            newyork_times_covid19_data.df)
+        newyork_times_covid19_data.df = None
+        stage["rows_out"] = len(df)
+    with profiler.stage("combine_with_population", len(df)) as stage:
+        df = newyork_times_covid19_data.combine_with_population_lookup(
+            df, population_lookup)
+        stage["rows_out"] = len(df)
+    with profiler.stage("generate_stats", len(df)) as stage:
+        df = newyork_times_covid19_data.generate_stats(
+            df, options["stats_engine"])
+        stage["rows_out"] = len(df)
+    df = newyork_times_covid19_data.decode_compact_stats(df)
+    with profiler.stage("save_output", len(df)) as stage:
+        newyork_times_covid19_data.save_dataframe(
+            df, entry["output_file_path"],
+            entry.get("output_format", options["output_format"]))
+        stage["rows_out"] = len(df)
+    print(f"Completed: save generated dataframe of "
+          f"{entry['covid19_csv_path']} to out path: "
+          f"{entry['output_file_path']}")
+    if options["apply_sanity_check"]:
+        with profiler.stage("sanity_check", len(df)):
+            newyork_times_covid19_data.sanity_check_prepared_data(df)
+    for stage in profiler.stages:
+        stage["covid19_csv_path"] = entry["covid19_csv_path"]
+    return profiler.stages
+
+
+class BatchRunner(object):
+    """
+    This class is to process several New York Times COVID-19 Data files of
+    a batch manifest with a population lookup built once
+
+    Explanation:
+        The entries are processed by a pool of "workers" processes, which
+        receive the population lookup once when they start. Every worker
+        reads, preprocesses, combines, generates the statistics and saves
+        the output of one entry at a time, so the reading of an entry
+        overlaps the computation of the others, and at most "workers"
+        entries are in memory at a time. The entries are submitted from
+        the largest local file to the smallest (remote files first, their
+        size is not known), so the largest file starts first and the
+        smaller files are processed by the other workers meanwhile: the
+        total time is about the time of the largest file when the other
+        files fit in the other workers
+
+    Attributes:
+        population_lookup: np.ndarray object with population estimate of
+            every year and fips code
+        workers: int, number of worker processes
+        options: dict, options of the pipeline of every entry
+    """
+
+    def __init__(self, population_lookup: np.ndarray, workers: int = 2,
+                 compact: bool = False, stats_engine: str = "vectorized",
+                 csv_engine: str = "c", output_format: str = None,
+                 download_cache: DownloadCache = None,
+                 apply_sanity_check: bool = False,
+                 trace_memory: bool = False):
+        """
+        The constructor for BatchRunner class
+
+        Parameters:
+        ----------
+        population_lookup: np.ndarray object generated by
+            "generate_population_lookup" function of
+            PopulationEstimateData2019 class
+        workers: int, number of worker processes, 1: the entries are
+            processed one after the other in the current process
+        compact: bool, True: use compact representation
+        stats_engine: str, one of STATS_ENGINES
+        csv_engine: str, one of CSV_PARSER_ENGINES, parser engine of the
+            csv files
+        output_format: str, optional, output format of the entries without
+            "output_format", inferred from the output file extension if
+            not provided
+        download_cache: DownloadCache object, optional, cache of remote
+            files shared by the worker processes, which never evict files,
+            "evict" function is called after the batch
+        apply_sanity_check: bool, True: apply sanity check on the output
+            data of every entry
+        trace_memory: bool, True: record tracemalloc peak of every stage
+        """
+        self.population_lookup = population_lookup
+        self.workers = workers
+        self.options = {"compact": compact, "stats_engine": stats_engine,
+                        "csv_engine": csv_engine,
+                        "output_format": output_format,
+                        "download_cache": download_cache,
+                        "apply_sanity_check": apply_sanity_check,
+                        "trace_memory": trace_memory}
+
+    @staticmethod
+    def read_manifest(file_path: str) -> list:
+        """
+        Function to read a batch manifest, a json file with a list of
+        entries having BATCH_MANIFEST_REQUIRED_KEYS and optionally
+        BATCH_MANIFEST_OPTIONAL_KEYS, for example:
+            [{"covid19_csv_path": "us-counties.csv",
+              "output_file_path": "us-counties-stats.csv"},
+             {"covid19_csv_path": "us-counties-recent.csv",
+              "output_file_path": "us-counties-recent-stats.parquet"}]
+        Relative local paths are relative to the directory of the manifest
+
+        Parameters:
+        ----------
+        file_path: str, path of the manifest file
+
+        Returns:
+        -------
+        entries: list of dict, entries with resolved paths
+        """
+        with open(file_path) as f:
+            entries = json.load(f)
+        if not isinstance(entries, list) or not entries:
+            raise InputError(file_path,
+                             f"Batch manifest {file_path} should be a non "
+                             f"empty list of entries")
+        manifest_dir = os.path.dirname(os.path.abspath(file_path))
+        output_file_paths = set()
+        for i, entry in enumerate(entries):
+            for key in BATCH_MANIFEST_REQUIRED_KEYS:
+                if not isinstance(entry, dict) or key not in entry:
+                    raise InputError(entry,
+                                     f"Entry {i} of batch manifest "
+                                     f"{file_path} has no {key}")
+            for key in entry:
+                if key not in (BATCH_MANIFEST_REQUIRED_KEYS
+                               + BATCH_MANIFEST_OPTIONAL_KEYS):
+                    raise InputError(entry,
+                                     f"Entry {i} of batch manifest "
+                                     f"{file_path} has unknown key {key}")
+            for key in BATCH_MANIFEST_REQUIRED_KEYS:
+                if not is_url(entry[key]):
+                    entry[key] = os.path.join(manifest_dir, entry[key])
+            # -> Entries are processed concurrently, they can not write the
+            # same output file
+            if entry["output_file_path"] in output_file_paths:
+                raise InputError(entry,
+                                 f"Output file {entry['output_file_path']} "
+                                 f"is used by several entries of batch "
+                                 f"manifest {file_path}")
+            output_file_paths.add(entry["output_file_path"])
+        return entries
+
+    def get_submission_order(self, entries: list) -> list:
+        """
+        Function to get the order in which the entries are submitted to the
+        workers, from the largest local file to the smallest, remote files
+        first
+
+        Parameters:
+        ----------
+        entries: list of dict, entries of the batch manifest
+
+        Returns:
+        -------
+        order: list of int, positions of the entries
+        """
+        def get_size(i: int) -> float:
+            covid19_csv_path = entries[i]["covid19_csv_path"]
+            if is_url(covid19_csv_path):
+                return float("inf")
+            return os.path.getsize(covid19_csv_path)
+
+        return sorted(range(len(entries)), key=get_size, reverse=True)
+
+    def run(self, entries: list, profiler: PipelineProfiler = None):
+        """
+        Function to process all the entries, an error of an entry stops
+        the batch
+
+        Parameters:
+        ----------
+        entries: list of dict, entries of the batch manifest
+        profiler: PipelineProfiler object, optional, the stages of every
+            entry are added to its stages in manifest order
+        """
+        order = self.get_submission_order(entries)
+        if self.workers == 1 or len(entries) == 1:
+            init_batch_worker(self.population_lookup, self.options)
+            try:
+                stages = {i: process_batch_entry(entries[i]) for i in order}
+            finally:
+                BATCH_WORKER_INPUT.clear()
+        else:
+            with multiprocessing.Pool(
+                    min(self.workers, len(entries)), init_batch_worker,
+                    (self.population_lookup, self.options)) as pool:
+                results = {i: pool.apply_async(process_batch_entry,
+                                               (entries[i],))
+                           for i in order}
+                stages = {i: result.get() for i, result in results.items()}
+        if profiler is not None:
+            for i in range(len(entries)):
+                profiler.stages.extend(stages[i])
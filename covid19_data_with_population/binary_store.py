@@ -0,0 +1,268 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from .dataset import DataSet, FIPS_LOOKUP_SIZE
+from .exceptions import InputError
+
+# Extension of the binary store files
+BINARY_STORE_EXTENSION = ".bin"
+
+# First bytes of a binary store file, followed by the header
+# -> 8 bytes magic, 4 bytes little endian header length, json header
+BINARY_STORE_MAGIC = b"C19STATS"
+
+# Version of the binary store layout, written in the header
+BINARY_STORE_VERSION = 1
+
+# Alignment in bytes of the header and of every array of the binary store,
+# so the arrays can be viewed with any data type without copying
+BINARY_STORE_ALIGNMENT = 64
+
+
+class StatsBinaryStore(DataSet):
+    """
+    This class is to save the generated statistics as a binary store file
+    and to read it back with memory mapped, zero copy views
+
+    Explanation:
+        The file has a header followed by fixed width column arrays:
+            "fips": int32 integer fips code of every record
+            "date": datetime64[ns] date of every record
+            other columns: data type of the statistics column, for example
+                int64, or float64 when a column has null values
+        and by the offset table, an int64 array of FIPS_LOOKUP_SIZE + 1
+        positions: the records of integer fips code f are the records
+        offsets[f] to offsets[f + 1] (records are sorted by fips code and
+        date). The json header has the number of records and the data
+        type and position in the file of every array.
+
+        Opening the store only reads the header, the arrays are views of the
+        memory mapped file and the pages are read by the operating system
+        when they are accessed, so loading time does not depend on the
+        size of the file. The records of a fips code are found with two
+        reads of the offset table
+
+    Attributes:
+        file_path: str, path of the binary store file
+        number_of_records: int, number of records in the store
+        columns: list of str, names of the statistics columns
+        offsets: np.ndarray object, offset table indexed by integer fips
+            code
+    """
+
+    def __init__(self, file_path: str):
+        """
+        The constructor for StatsBinaryStore class, the file is memory
+        mapped read only
+
+        Parameters:
+        ----------
+        file_path: str, path of a binary store file saved by "write"
+            function
+        """
+        self.file_path = file_path
+        self.buffer = np.memmap(file_path, dtype="uint8", mode="r")
+        magic_size = len(BINARY_STORE_MAGIC)
+        if bytes(self.buffer[:magic_size]) != BINARY_STORE_MAGIC:
+            raise InputError(file_path,
+                             f"{file_path} is not a binary store file")
+        header_size = int(self.buffer[magic_size:magic_size + 4]
+                          .view("<u4")[0])
+        self.header = json.loads(bytes(
+            self.buffer[magic_size + 4:magic_size + 4 + header_size])
+            .decode("utf-8"))
+        if self.header["version"] != BINARY_STORE_VERSION:
+            raise InputError(file_path,
+                             f"Binary store version "
+                             f"{self.header['version']} of {file_path} is "
+                             f"not supported")
+        self.number_of_records = self.header["number_of_records"]
+        self.columns = [c for c in self.header["arrays"]
+                        if c not in ["fips", "date", "offsets"]]
+        self.offsets = self.get_array("offsets")
+
+    def get_array(self, name: str) -> np.ndarray:
+        """
+        Function to get a read only view of an array of the memory mapped
+        file, nothing is copied
+
+        Parameters:
+        ----------
+        name: str, "fips", "date", "offsets" or one of columns
+
+        Returns:
+        -------
+        values: np.ndarray object
+        """
+        if name not in self.header["arrays"]:
+            raise InputError(name,
+                             f"Column {name} not found in binary store "
+                             f"{self.file_path}")
+        array = self.header["arrays"][name]
+        return np.frombuffer(self.buffer, dtype=np.dtype(array["dtype"]),
+                             count=array["count"], offset=array["offset"])
+
+    def get_fips_range(self, fips) -> tuple:
+        """
+        Function to get the positions of the records of a fips code from
+        the offset table
+
+        Parameters:
+        ----------
+        fips: str or int, fips code
+
+        Returns:
+        -------
+        start: int, position of the first record of the fips code
+        end: int, position after the last record, equal to start if the
+            fips code has no records
+        """
+        fips = int(fips)
+        if fips < 0 or fips >= FIPS_LOOKUP_SIZE:
+            return 0, 0
+        return int(self.offsets[fips]), int(self.offsets[fips + 1])
+
+    def get_fips_codes(self) -> pd.Index:
+        """
+        Function to get the fips codes having records, from the offset
+        table
+
+        Returns:
+        -------
+        fips: pd.Index object with sorted 5 digit string fips codes
+        """
+        return self.decode_fips(np.flatnonzero(np.diff(self.offsets)))
+
+    def get_series(self, column: str, fips=None) -> pd.Series:
+        """
+        Function to get a column of all the records, or of the records of a
+        fips code, as a series indexed by date, values and dates are views
+        of the memory mapped file
+
+        Parameters:
+        ----------
+        column: str, one of columns
+        fips: str or int, optional, fips code
+
+        Returns:
+        -------
+        series: pd.Series object indexed by date
+        """
+        start, end = 0, self.number_of_records
+        if fips is not None:
+            start, end = self.get_fips_range(fips)
+        dates = self.get_array("date")[start:end]
+        return pd.Series(self.get_array(column)[start:end],
+                         index=pd.DatetimeIndex(dates, name="date"),
+                         name=column, copy=False)
+
+    def get_fips_dataframe(self, fips) -> pd.DataFrame:
+        """
+        Function to get the records of a fips code
+
+        Parameters:
+        ----------
+        fips: str or int, fips code
+
+        Returns:
+        -------
+        df: pd.DataFrame object indexed by date with the statistics
+            columns, empty if the fips code has no records
+        """
+        return pd.DataFrame({c: self.get_series(c, fips)
+                             for c in self.columns})
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Function to read all the records in the same layout as the other
+        output formats, the records are copied in memory
+
+        Returns:
+        -------
+        df: pd.DataFrame object indexed by ("fips", "date") with 5 digit
+            string fips code and datetime64[ns] date
+        """
+        df = pd.DataFrame({c: self.get_array(c) for c in self.columns})
+        df.index = pd.MultiIndex.from_arrays(
+            [self.decode_fips(self.get_array("fips")),
+             pd.DatetimeIndex(self.get_array("date"))],
+            names=["fips", "date"])
+        return df
+
+    @staticmethod
+    def write(df: pd.DataFrame, file_path: str):
+        """
+        Function to save the statistics as a binary store file, the file is
+        written to a temporary path and renamed so readers never see a
+        partial file
+
+        Parameters:
+        ----------
+        df: pd.DataFrame object indexed by ("fips", "date") with string or
+            integer fips code and datetime64[ns] date, and numeric columns
+        file_path: str, path of the binary store file
+        """
+        if not df.index.is_monotonic_increasing:
+            df = df.sort_index()
+        dataset = DataSet()
+        fips = dataset.fips_to_int(
+            pd.Series(df.index.get_level_values("fips"))).astype("int32")
+        arrays = {"fips": fips,
+                  "date": df.index.get_level_values("date").values
+                  .astype("datetime64[ns]")}
+        for c in df.columns:
+            values = df[c]
+            if not pd.api.types.is_numeric_dtype(values.dtype):
+                raise InputError(c,
+                                 f"Column {c} of type {values.dtype} can not "
+                                 f"be saved in a binary store")
+            # -> Nullable integer columns are saved as float64 with NaN,
+            # same as the csv output read back by pandas
+            if pd.api.types.is_extension_array_dtype(values.dtype):
+                values = values.to_numpy(
+                    dtype="float64" if values.hasnans else
+                    values.dtype.numpy_dtype, na_value=np.nan)
+            arrays[c] = np.asarray(values)
+        # -> Offset table as cumulative record counts per fips code, the
+        # records are sorted by fips code so the ranges are contiguous
+        arrays["offsets"] = np.zeros(FIPS_LOOKUP_SIZE + 1, dtype="int64")
+        np.cumsum(np.bincount(fips, minlength=FIPS_LOOKUP_SIZE),
+                  out=arrays["offsets"][1:])
+
+        def align(position: int) -> int:
+            return -(-position // BINARY_STORE_ALIGNMENT) \
+                * BINARY_STORE_ALIGNMENT
+
+        # -> The array positions depend on the header size, which depends
+        # on the array positions, so the positions are computed again
+        # after the first array until the header fits before it
+        arrays = {name: np.ascontiguousarray(values)
+                  for name, values in arrays.items()}
+        header_start = len(BINARY_STORE_MAGIC) + 4
+        first_position = align(header_start)
+        while True:
+            header = {"version": BINARY_STORE_VERSION,
+                      "number_of_records": len(df),
+                      "arrays": {}}
+            position = first_position
+            for name, values in arrays.items():
+                header["arrays"][name] = {"dtype": values.dtype.str,
+                                          "count": len(values),
+                                          "offset": position}
+                position = align(position + values.nbytes)
+            header_bytes = json.dumps(header).encode("utf-8")
+            if header_start + len(header_bytes) <= first_position:
+                break
+            first_position = align(header_start + len(header_bytes))
+        with open(f"{file_path}.tmp", "wb") as f:
+            f.write(BINARY_STORE_MAGIC)
+            f.write(np.array([len(header_bytes)], dtype="<u4").tobytes())
+            f.write(header_bytes)
+            for name, values in arrays.items():
+                f.seek(header["arrays"][name]["offset"])
+                values.tofile(f)
+            f.truncate(position)
+        os.replace(f"{file_path}.tmp", file_path)
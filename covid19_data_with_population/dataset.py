@@ -1,5 +1,52 @@
+import csv
+import os
+import urllib.request
+
+import numpy as np
 import pandas as pd
 
+from .download_cache import DownloadCache, is_url
+from .exceptions import InputError
+
+# Reference date for day offset encoding of dates in compact representation
+COMPACT_DATE_EPOCH = np.datetime64("1970-01-01", "D")
+
+# Output formats supported by "save_dataframe" function with the file
+# extension used to infer them
+# -> "feather" is compressed with lz4, "arrow" is an uncompressed Arrow IPC
+# file which can be memory mapped for zero copy reads
+OUTPUT_FORMAT_EXTENSIONS = {"csv": ".csv",
+                            "csv.gz": ".csv.gz",
+                            "csv.zst": ".csv.zst",
+                            "parquet": ".parquet",
+                            "feather": ".feather",
+                            "arrow": ".arrow"}
+
+# Number of records per row group of parquet output files
+PARQUET_ROW_GROUP_SIZE = 256 * 1024
+
+# Size of dense lookup arrays indexed by 5 digit integer fips code
+FIPS_LOOKUP_SIZE = 100000
+
+# Value of dense lookup arrays for fips codes without value
+FIPS_LOOKUP_SENTINEL = -1
+
+# Year of the first row of dense lookup arrays indexed by year and fips
+# code, see "gather_from_fips_lookup" function
+# -> First year of the 2010-2019 Census population estimates
+FIPS_LOOKUP_FIRST_YEAR = 2010
+
+# Parser engines of "read_csv_with_schema" function
+# -> "c": pandas C parser
+# -> "pyarrow": multithreaded pyarrow.csv parser, the C parser is used if
+# pyarrow is not installed, the file is read in chunks or the source is a
+# file-like object
+CSV_PARSER_ENGINES = ["c", "pyarrow"]
+
+# Levels of the rollups of the county statistics, saved next to the output
+# file as <output>.<level>_rollup<extension>
+ROLLUP_LEVELS = ["state", "national"]
+
 
 class DataSet(object):
     """
@@ -15,6 +62,373 @@ class DataSet(object):
         """
         pass
 
+    def get_local_file_path(self, file_path: str,
+                            download_cache: DownloadCache = None) -> str:
+        """
+        Function to get the path used to read a source file, remote files
+        are read from download_cache if it is provided
+
+        Parameters:
+        ----------
+        file_path: str, path/url of the source file, file-like objects
+            are returned as they are
+        download_cache: DownloadCache object, optional
+
+        Returns:
+        -------
+        file_path: str, local cached path for remote files if
+            download_cache is provided, otherwise given file_path
+        """
+        if download_cache is None or not isinstance(file_path, str):
+            return file_path
+        return download_cache.get(file_path)
+
+    def open_csv_source(self, csv_file_path) -> tuple:
+        """
+        Function to open a csv source as a stream which is read once
+
+        Explanation: An url is opened with urllib and its body is streamed
+        to the parser. pandas would fetch the whole body of an url in
+        memory before parsing it, and pyarrow can only open local paths
+
+        Parameters:
+        ----------
+        csv_file_path: str path/url of the csv file or file-like object
+
+        Returns:
+        -------
+        stream: file-like object, binary for paths and urls
+        is_owned: bool, True if the stream is opened by this function and
+            must be closed by the caller
+        """
+        if not isinstance(csv_file_path, str):
+            return csv_file_path, False
+        if is_url(csv_file_path):
+            return urllib.request.urlopen(csv_file_path), True
+        return open(csv_file_path, "rb"), True
+
+    def read_csv_header(self, stream, encoding: str = None) -> list:
+        """
+        Function to read the header line of a csv stream, the stream is
+        left at the first record
+
+        Parameters:
+        ----------
+        stream: file-like object returned by "open_csv_source" function
+        encoding: str, optional, encoding of the csv file
+
+        Returns:
+        -------
+        columns: list of str, column names of the header
+        """
+        line = stream.readline()
+        if isinstance(line, bytes):
+            line = line.decode(encoding or "utf-8-sig")
+        return next(csv.reader([line.rstrip("\r\n")]), [])
+
+    def validate_csv_header(self, columns: list, required_columns: list,
+                            source: str):
+        """
+        Function to check that the header of a csv file has the required
+        columns
+
+        Parameters:
+        ----------
+        columns: list of str, column names of the header
+        required_columns: list of str, required column names
+        source: str, name of the source used in the error message
+        """
+        for c in required_columns:
+            if c not in columns:
+                raise InputError(source,
+                                 f"Column {c} of type string not found in "
+                                 f"source dataset {source}")
+
+    def validate_csv_columns(self, csv_file_path: str,
+                             required_columns: list,
+                             encoding: str = None) -> list:
+        """
+        Function to check that the header of a csv file has the required
+        columns, only the header line is read
+
+        Parameters:
+        ----------
+        csv_file_path: str, path/url of the csv file
+        required_columns: list of str, required column names
+        encoding: str, optional, encoding of the csv file
+
+        Returns:
+        -------
+        columns: list of str, column names of the header
+        """
+        stream, _ = self.open_csv_source(csv_file_path)
+        with stream:
+            columns = self.read_csv_header(stream, encoding)
+        self.validate_csv_header(columns, required_columns, csv_file_path)
+        return columns
+
+    def read_csv_with_schema(self, csv_file_path: str, schema: dict,
+                             required_columns: list, encoding: str = None,
+                             chunksize: int = None, engine: str = "c"):
+        """
+        Function to read only the columns of a schema from a csv file,
+        parsed directly to the types of the schema
+
+        Explanation:
+            The source is opened once by "open_csv_source" function, the
+            required columns are validated on its header line and the
+            records are parsed from the same stream, so an url is fetched
+            only once, and streamed when it is read in chunks. Only the
+            schema columns are parsed (other columns are skipped by the
+            parser). Schema columns which are not required and not found
+            in the file are skipped. Column types are numpy/pandas data
+            types or:
+                "string": str, leading zeros are kept
+                "category": str stored as pandas categorical
+                "datetime64[ns]": ISO dates parsed as datetime64[ns]
+            With "pyarrow" engine the file is parsed by pyarrow.csv in
+            several threads, string columns are read as strings so leading
+            zeros are kept, and the result has the same types as with "c"
+            engine. A file-like object (stream) given by the caller is
+            always parsed with "c" engine and is not closed
+
+        Parameters:
+        ----------
+        csv_file_path: str or file-like object, path/url of the csv file
+            or stream of its content
+        schema: dict, column name to column type, in file order or not
+        required_columns: list of str, columns validated on the header
+        encoding: str, optional, encoding of the csv file
+        chunksize: int, optional, number of records per chunk
+        engine: str, one of CSV_PARSER_ENGINES
+
+        Returns:
+        -------
+        df: pd.DataFrame object, or iterator of pd.DataFrame objects if
+            chunksize is provided
+        """
+        if engine not in CSV_PARSER_ENGINES:
+            raise InputError(engine,
+                             f"CSV parser engine {engine} is not one of "
+                             f"{CSV_PARSER_ENGINES}")
+        source = (csv_file_path if isinstance(csv_file_path, str)
+                  else "stream")
+        stream, is_owned = self.open_csv_source(csv_file_path)
+        chunks = None
+        try:
+            columns = self.read_csv_header(stream, encoding)
+            self.validate_csv_header(columns, required_columns, source)
+            schema = {c: schema[c] for c in columns if c in schema}
+            if engine == "pyarrow" and chunksize is None and is_owned:
+                try:
+                    import pyarrow
+                    import pyarrow.csv
+                except ImportError:
+                    pass
+                else:
+                    return self.read_csv_with_pyarrow(
+                        stream, columns, schema, encoding, source)
+            reader = pd.read_csv(
+                stream, header=None, names=columns, usecols=list(schema),
+                dtype={c: object if t in ["string", "datetime64[ns]"] else t
+                       for c, t in schema.items()},
+                parse_dates=[c for c, t in schema.items()
+                             if t == "datetime64[ns]"],
+                encoding=encoding, chunksize=chunksize)
+            if chunksize is None:
+                return reader
+            # -> The stream is closed by the chunk iterator
+            chunks = self.read_csv_chunks(reader,
+                                          stream if is_owned else None)
+            return chunks
+        finally:
+            if is_owned and chunks is None:
+                stream.close()
+
+    def read_csv_chunks(self, reader, stream=None):
+        """
+        Function to iterate over the chunks of a csv reader and to close
+        the stream of the reader once all the chunks are read
+
+        Parameters:
+        ----------
+        reader: iterator of pd.DataFrame objects returned by pd.read_csv
+        stream: file-like object, optional, closed after the last chunk
+        """
+        try:
+            for df in reader:
+                yield df
+        finally:
+            if stream is not None:
+                stream.close()
+
+    def validate_columns(self, df: pd.DataFrame, required_columns: list,
+                         source: str):
+        """
+        Function to check that an in memory dataframe has the required
+        columns
+
+        Parameters:
+        ----------
+        df: pd.DataFrame object
+        required_columns: list of str, required column names
+        source: str, name of the source used in the error message
+        """
+        for c in required_columns:
+            if c not in df.columns:
+                raise InputError(source,
+                                 f"Column {c} not found in source dataset "
+                                 f"{source}")
+
+    def conform_to_schema(self, df: pd.DataFrame, schema: dict,
+                          required_columns: list,
+                          source: str = "dataframe") -> pd.DataFrame:
+        """
+        Function to select the columns of a schema from an in memory
+        dataframe and convert them to the types of the schema, as if they
+        were parsed by "read_csv_with_schema" function
+
+        Explanation: Columns which already have the type of the schema are
+        not converted, they are shared with df and not copied (pandas >=
+        1.3 builds the new dataframe without consolidating the columns).
+        Other columns are converted, which copies them. Schema columns
+        which are not required and not found in df are skipped. "string"
+        columns must hold str values, numbers are not converted to strings
+        since leading zeros can not be recovered
+
+        Parameters:
+        ----------
+        df: pd.DataFrame object, not modified
+        schema: dict, column name to column type as in
+            "read_csv_with_schema" function
+        required_columns: list of str, required column names
+        source: str, name of the source used in the error messages
+
+        Returns:
+        -------
+        df: pd.DataFrame object with the schema columns
+        """
+        self.validate_columns(df, required_columns, source)
+        columns = {}
+        for c, t in schema.items():
+            if c not in df.columns:
+                continue
+            values = df[c]
+            if t == "string":
+                if not pd.api.types.is_object_dtype(values.dtype):
+                    if not pd.api.types.is_string_dtype(values.dtype):
+                        raise InputError(source,
+                                         f"Column {c} of source dataset "
+                                         f"{source} must have str values, "
+                                         f"got {values.dtype}")
+                    values = values.astype(object)
+            elif t == "datetime64[ns]":
+                if values.dtype != np.dtype("datetime64[ns]"):
+                    values = pd.to_datetime(values)
+            elif not pd.api.types.is_dtype_equal(values.dtype, t):
+                # -> Older pandas versions do not convert str values to
+                # nullable integer types, they are parsed as numbers first
+                if (pd.api.types.is_object_dtype(values.dtype)
+                        and pd.api.types.is_numeric_dtype(
+                            pd.api.types.pandas_dtype(t))):
+                    values = pd.to_numeric(values)
+                values = values.astype(t)
+            columns[c] = values
+        return pd.DataFrame(columns, copy=False)
+
+    def arrow_table_to_dataframe(self, table, schema: dict,
+                                 required_columns: list,
+                                 source: str = "arrow table") \
+            -> pd.DataFrame:
+        """
+        Function to convert the columns of a schema of a pyarrow Table to a
+        dataframe with the types of the schema, see "conform_to_schema"
+        function
+
+        Explanation: Only the schema columns are converted, every column
+        to its own array (no consolidation copy). Missing strings are None
+        in pyarrow, or empty strings if the csv file was read by pyarrow
+        without "strings_can_be_null" option, and are replaced by NaN in
+        every string column as with the C parser. Categories are sorted as
+        with the C parser
+
+        Parameters:
+        ----------
+        table: pyarrow.Table object
+        schema: dict, column name to column type as in
+            "read_csv_with_schema" function
+        required_columns: list of str, required column names
+        source: str, name of the source used in the error messages
+
+        Returns:
+        -------
+        df: pd.DataFrame object with the schema columns
+        """
+        for c in required_columns:
+            if c not in table.column_names:
+                raise InputError(source,
+                                 f"Column {c} not found in source dataset "
+                                 f"{source}")
+        import pyarrow
+        table = table.select([c for c in schema if c in table.column_names])
+        df = table.to_pandas(split_blocks=True)
+        for c in table.column_names:
+            if pyarrow.types.is_dictionary(table.schema.field(c).type):
+                # -> pyarrow keeps the categories in the order of their
+                # first record, the C parser sorts them
+                df[c] = df[c].cat.reorder_categories(
+                    df[c].cat.categories.sort_values())
+                continue
+            if not pyarrow.types.is_string(table.schema.field(c).type):
+                continue
+            is_missing = df[c].isna() | (df[c] == "")
+            if is_missing.any():
+                df[c] = df[c].mask(is_missing, np.nan)
+        return self.conform_to_schema(df, schema, required_columns, source)
+
+    def read_csv_with_pyarrow(self, stream, columns: list, schema: dict,
+                              encoding: str = None,
+                              source: str = "stream") -> pd.DataFrame:
+        """
+        Function to read the columns of a schema from a binary csv stream
+        after its header line with pyarrow.csv, see "read_csv_with_schema"
+        function
+
+        Parameters:
+        ----------
+        stream: binary file-like object positioned at the first record
+        columns: list of str, column names of the header line
+        schema: dict, column name to column type of the columns to read
+        encoding: str, optional, encoding of the csv file
+        source: str, name of the source used in the error messages
+
+        Returns:
+        -------
+        df: pd.DataFrame object with the schema columns
+        """
+        import pyarrow
+        import pyarrow.csv
+        column_types = {}
+        for c, t in schema.items():
+            if t == "string":
+                column_types[c] = pyarrow.string()
+            elif t == "category":
+                # -> Dictionary encoded strings are converted to pandas
+                # categorical without building python strings per record
+                column_types[c] = pyarrow.dictionary(pyarrow.int32(),
+                                                     pyarrow.string())
+            elif t == "datetime64[ns]":
+                column_types[c] = pyarrow.timestamp("ns")
+        table = pyarrow.csv.read_csv(
+            stream,
+            read_options=pyarrow.csv.ReadOptions(
+                column_names=columns, encoding=encoding or "utf8"),
+            convert_options=pyarrow.csv.ConvertOptions(
+                include_columns=list(schema), column_types=column_types,
+                strings_can_be_null=True))
+        return self.arrow_table_to_dataframe(table, schema, list(schema),
+                                             source)
+
     def feature_selection(self, df: pd.DataFrame, feature_list: list) -> \
             pd.DataFrame:
         """
@@ -31,13 +445,345 @@ class DataSet(object):
         """
         return df[feature_list]
 
+    def encode_dates(self, dates: pd.Series) -> pd.Series:
+        """
+        Function to encode datetime64 dates as int32 day offsets from
+        COMPACT_DATE_EPOCH for compact representation
+
+        Parameters:
+        ----------
+        dates: pd.Series object with datetime64[ns] values
+
+        Returns:
+        -------
+        dates: pd.Series object with int32 day offsets
+        """
+        days = (dates.values.astype("datetime64[D]")
+                - COMPACT_DATE_EPOCH).astype("int32")
+        return pd.Series(days, index=dates.index, name=dates.name)
+
+    def decode_dates(self, days) -> pd.DatetimeIndex:
+        """
+        Function to decode int32 day offsets encoded by "encode_dates"
+        function to datetime64 dates
+
+        Parameters:
+        ----------
+        days: array like object with int32 day offsets
+
+        Returns:
+        -------
+        dates: pd.DatetimeIndex object with datetime64[ns] values
+        """
+        return pd.DatetimeIndex(
+            (COMPACT_DATE_EPOCH + np.asarray(days)).astype("datetime64[ns]"))
+
+    def decode_fips(self, fips) -> pd.Index:
+        """
+        Function to decode integer fips code to 5 digit string fips code,
+        for example 1001 -> "01001"
+
+        Parameters:
+        ----------
+        fips: array like object with integer fips code
+
+        Returns:
+        -------
+        fips: pd.Index object with 5 digit string fips code
+        """
+        return pd.Index(np.char.zfill(np.asarray(fips).astype(str), 5),
+                        dtype=object)
+
+    @staticmethod
+    def fips_to_int(fips: pd.Series) -> np.ndarray:
+        """
+        Function to convert fips codes to integers, for example
+        "01001" -> 1001, integer fips codes of compact representation are
+        returned as they are
+
+        Explanation: String fips codes are factorized first, so only the
+        unique fips codes are parsed as integers
+
+        Parameters:
+        ----------
+        fips: pd.Series object with string or integer fips codes
+
+        Returns:
+        -------
+        fips: np.ndarray object with integer fips codes
+        """
+        if pd.api.types.is_integer_dtype(fips.dtype):
+            return fips.values
+        codes, uniques = pd.factorize(fips)
+        return uniques.astype("int32").values[codes]
+
+    def generate_fips_lookup(self, fips: pd.Series,
+                             values: pd.Series) -> np.ndarray:
+        """
+        Function to generate a dense lookup array indexed by integer fips
+        code, fips codes without value are set to FIPS_LOOKUP_SENTINEL
+
+        Parameters:
+        ----------
+        fips: pd.Series object with string or integer fips codes
+        values: pd.Series object with non negative integer values of the
+            fips codes
+
+        Returns:
+        -------
+        lookup: np.ndarray object of size FIPS_LOOKUP_SIZE with the same
+            data type as values
+        """
+        lookup = np.full(FIPS_LOOKUP_SIZE, FIPS_LOOKUP_SENTINEL,
+                         dtype=values.dtype)
+        lookup[self.fips_to_int(fips)] = values.values
+        return lookup
+
+    def get_lookup_rows(self, dates: pd.Series, number_of_rows: int):
+        """
+        Function to get the row of the year of every date in a dense lookup
+        array indexed by year and fips code, see "gather_from_fips_lookup"
+        function
+
+        Explanation: The row of every date is found with a single binary
+        search in the sorted first dates of the years of the lookup,
+        instead of converting every date to its year. The minimum and the
+        maximum dates are searched first, so the row is found without a
+        pass on the dates when all of them are in the same row, for example
+        the dates after the last year of the lookup
+
+        Parameters:
+        ----------
+        dates: pd.Series object with datetime64[ns] dates, or int32 day
+            offsets of compact representation
+        number_of_rows: int, number of years of the lookup array
+
+        Returns:
+        -------
+        rows: np.ndarray object with the row of every date, or int if all
+            the dates have the same row. Dates before the first year are in
+            the first row and dates after the last year are in the last row
+        """
+        year_starts = (np.datetime64(str(FIPS_LOOKUP_FIRST_YEAR), "Y")
+                       + np.arange(1, number_of_rows))
+        if pd.api.types.is_integer_dtype(dates.dtype):
+            year_starts = (year_starts.astype("datetime64[D]")
+                           - COMPACT_DATE_EPOCH).astype(dates.dtype)
+        else:
+            year_starts = year_starts.astype(dates.dtype)
+        dates = dates.values
+        if len(dates) == 0:
+            return 0
+        # -> Row i is the year of year_starts[i - 1] (row 0 is the first
+        # year), so the row of a date is the number of first dates of years
+        # not after it, which is between 0 and number_of_rows - 1
+        first_row, last_row = np.searchsorted(
+            year_starts, [dates.min(), dates.max()], side="right")
+        if first_row == last_row:
+            return int(first_row)
+        return np.searchsorted(year_starts, dates, side="right")
+
+    def gather_from_fips_lookup(self, fips: pd.Series, lookup: np.ndarray,
+                                dates: pd.Series = None) -> pd.Series:
+        """
+        Function to get the value of every fips code from a dense lookup
+        array generated by "generate_fips_lookup" function, or of every
+        fips code and year from a dense lookup array indexed by year and
+        fips code
+
+        Explanation: Row i of a lookup array indexed by year and fips code
+        has the values of year FIPS_LOOKUP_FIRST_YEAR + i. The row of every
+        record is the row of the year of its date, clipped to the rows of
+        the lookup, and the values are gathered with a single flat index,
+        so the cost does not depend on the number of years
+
+        Parameters:
+        ----------
+        fips: pd.Series object with string or integer fips codes
+        lookup: np.ndarray object indexed by integer fips code, or by year
+            and integer fips code
+        dates: pd.Series object with the dates of the records, as accepted
+            by "get_lookup_rows" function, required if lookup is indexed by
+            year
+
+        Returns:
+        -------
+        values: pd.Series object with the same index as fips, values are
+            NaN (and data type float) for fips codes without value in the
+            lookup, same as a left join
+        """
+        fips_int = self.fips_to_int(fips)
+        is_in_range = (fips_int >= 0) & (fips_int < lookup.shape[-1])
+        index = np.where(is_in_range, fips_int, 0)
+        if lookup.ndim == 2 and len(lookup) > 1:
+            rows = self.get_lookup_rows(dates, len(lookup))
+            index = rows * lookup.shape[1] + index
+        values = lookup.reshape(-1)[index]
+        is_missing = ~is_in_range | (values == FIPS_LOOKUP_SENTINEL)
+        if is_missing.any():
+            values = np.where(is_missing, np.nan, values)
+        return pd.Series(values, index=fips.index)
+
     def save_dataframe_as_csv(self, df: pd.DataFrame, csv_file_path: str):
         """
         Function to save dataframe df as csv file in local file system
 
+        Explanation: The file is written to a temporary file which then
+        replaces csv_file_path, so readers never see a partial file
+
         Parameters:
         ----------
         df: pd.DataFrame object with data
         path: path of the output csv file
         """
-        df.to_csv(csv_file_path)
+        df.to_csv(f"{csv_file_path}.tmp")
+        os.replace(f"{csv_file_path}.tmp", csv_file_path)
+
+    def append_dataframe_to_csv(self, df: pd.DataFrame, csv_file_path: str):
+        """
+        Function to append dataframe df to an existing csv file in local
+        file system, without writing the header again
+
+        Explanation: The records are appended in place, readers of the file
+        can see a partial file while it is written
+
+        Parameters:
+        ----------
+        df: pd.DataFrame object with data having the same columns as the
+            existing csv file
+        path: path of the existing output csv file
+        """
+        df.to_csv(csv_file_path, mode="a", header=False)
+
+    def infer_output_format(self, file_path: str) -> str:
+        """
+        Function to infer the output format from the file extension
+
+        Parameters:
+        ----------
+        file_path: str, path of the output file
+
+        Returns:
+        -------
+        output_format: str, one of OUTPUT_FORMAT_EXTENSIONS keys, "csv" if
+            the extension is not known
+        """
+        # -> Checking the longest extensions first, so ".csv.gz" is not
+        # inferred as ".gz"
+        for output_format, extension in sorted(
+                OUTPUT_FORMAT_EXTENSIONS.items(),
+                key=lambda item: -len(item[1])):
+            if file_path.endswith(extension):
+                return output_format
+        return "csv"
+
+    def get_rollup_file_path(self, file_path: str, level: str,
+                             output_format: str = None) -> str:
+        """
+        Function to get the path of the rollup file of given level next to
+        the output file, for example "output.csv" -> "output.state_rollup.csv"
+
+        Parameters:
+        ----------
+        file_path: str, path of the output file
+        level: str, one of ROLLUP_LEVELS
+        output_format: str, one of OUTPUT_FORMAT_EXTENSIONS keys, inferred
+            from the file extension if not provided
+
+        Returns:
+        -------
+        file_path: str, path of the rollup file in the same format
+        """
+        if level not in ROLLUP_LEVELS:
+            raise InputError(level,
+                             f"Rollup level {level} is not one of "
+                             f"{ROLLUP_LEVELS}")
+        if output_format is None:
+            output_format = self.infer_output_format(file_path)
+        extension = OUTPUT_FORMAT_EXTENSIONS[output_format]
+        if file_path.endswith(extension):
+            file_path = file_path[:-len(extension)]
+        return f"{file_path}.{level}_rollup{extension}"
+
+    def save_dataframe(self, df: pd.DataFrame, file_path: str,
+                       output_format: str = None):
+        """
+        Function to save dataframe df in local file system in given format
+
+        Explanation:
+            csv: same as "save_dataframe_as_csv" function
+            csv.gz/csv.zst: csv compressed with gzip/zstandard
+            parquet: index is saved as columns and records are sorted by
+                index, so every row group holds a contiguous range of fips
+                codes
+            feather: Arrow IPC file compressed with lz4
+            arrow: uncompressed Arrow IPC file for zero copy reads
+            The columnar formats require pyarrow, csv.zst requires
+            zstandard. The file is written to a temporary file which then
+            replaces file_path, so readers never see a partial file
+
+        Parameters:
+        ----------
+        df: pd.DataFrame object with data
+        file_path: path of the output file
+        output_format: str, one of OUTPUT_FORMAT_EXTENSIONS keys, inferred
+            from the file extension if not provided
+        """
+        if output_format is None:
+            output_format = self.infer_output_format(file_path)
+        if output_format not in OUTPUT_FORMAT_EXTENSIONS:
+            raise InputError(output_format,
+                             f"Output format {output_format} is not one of "
+                             f"{list(OUTPUT_FORMAT_EXTENSIONS)}")
+        tmp_path = f"{file_path}.tmp"
+        if output_format == "csv":
+            df.to_csv(tmp_path)
+        elif output_format == "csv.gz":
+            df.to_csv(tmp_path, compression="gzip")
+        elif output_format == "csv.zst":
+            import zstandard
+            with zstandard.open(tmp_path, "wt", encoding="utf-8",
+                                newline="") as f:
+                df.to_csv(f)
+        else:
+            if not df.index.is_monotonic_increasing:
+                df = df.sort_index()
+            df = df.reset_index()
+            if output_format == "parquet":
+                df.to_parquet(tmp_path, engine="pyarrow", index=False,
+                              row_group_size=PARQUET_ROW_GROUP_SIZE)
+            elif output_format == "feather":
+                df.to_feather(tmp_path)
+            else:
+                df.to_feather(tmp_path, compression="uncompressed")
+        os.replace(tmp_path, file_path)
+
+    def read_saved_dataframe(self, file_path: str,
+                             output_format: str = None) -> pd.DataFrame:
+        """
+        Function to read a dataframe saved by "save_dataframe" function
+
+        Parameters:
+        ----------
+        file_path: path of the saved file
+        output_format: str, one of OUTPUT_FORMAT_EXTENSIONS keys, inferred
+            from the file extension if not provided
+
+        Returns:
+        -------
+        df: pd.DataFrame object with "fips" and "date" as columns, "fips"
+            as string and "date" as datetime64[ns]
+        """
+        if output_format is None:
+            output_format = self.infer_output_format(file_path)
+        if output_format == "parquet":
+            return pd.read_parquet(file_path, engine="pyarrow")
+        if output_format in ["feather", "arrow"]:
+            return pd.read_feather(file_path)
+        if output_format == "csv.zst":
+            import zstandard
+            with zstandard.open(file_path, "rt", encoding="utf-8") as f:
+                return pd.read_csv(f, dtype={"fips": object},
+                                   parse_dates=["date"])
+        return pd.read_csv(file_path, dtype={"fips": object},
+                           parse_dates=["date"])
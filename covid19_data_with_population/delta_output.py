@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+
+from .dataset import DataSet
+
+# Columns compared between the previous and the new statistics, the other
+# columns (for example metrics) are derived from them per fips code
+DELTA_COMPARED_COLUMNS = ["population", "daily_cases", "daily_deaths",
+                          "cumulative_cases_to_date",
+                          "cumulative_deaths_to_date"]
+
+# Values of "change" column of the delta
+# -> "insert": ("fips", "date") only in the new statistics
+# -> "update": ("fips", "date") in both with different values
+# -> "delete": ("fips", "date") only in the previous statistics
+DELTA_CHANGES = ["insert", "update", "delete"]
+
+
+class StatsDelta(DataSet):
+    """
+    This class is to generate the delta between the statistics of the
+    previous run and the new statistics
+
+    Explanation:
+        A content hash is computed for every fips code, as the sum of the
+        hashes of its records, on both statistics. Fips codes with the same
+        hash are unchanged and are skipped, only the records of the other
+        fips codes are compared by ("fips", "date") to find the inserted,
+        updated and deleted records. Values are compared as float64, so
+        integer columns read back as float (because of null values) are
+        equal to the generated integer columns
+    """
+
+    def __init__(self):
+        """
+        The constructor for StatsDelta class
+        """
+        pass
+
+    @staticmethod
+    def set_stats_index(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Function to index statistics read by "read_saved_dataframe"
+        function by ("fips", "date"), indexed statistics are returned as
+        they are
+        """
+        if "fips" in df.columns:
+            return df.set_index(["fips", "date"])
+        return df
+
+    def hash_fips(self, df: pd.DataFrame) -> pd.Series:
+        """
+        Function to compute the content hash of every fips code
+
+        Parameters:
+        ----------
+        df: pd.DataFrame object indexed by ("fips", "date") with decoded
+            string fips code and datetime64[ns] date and
+            DELTA_COMPARED_COLUMNS
+
+        Returns:
+        -------
+        hashes: pd.Series object of uint64 hashes indexed by fips code
+        """
+        fips = df.index.get_level_values("fips")
+        df_hashed = pd.DataFrame(
+            {c: df[c].values.astype("float64")
+             for c in DELTA_COMPARED_COLUMNS})
+        df_hashed.insert(0, "date", df.index.get_level_values("date"))
+        df_hashed.insert(0, "fips", np.asarray(fips, dtype=object))
+        row_hashes = pd.util.hash_pandas_object(df_hashed,
+                                                index=False).values
+        # -> The sum (modulo 2**64) of the record hashes does not depend on
+        # the order of the records of a fips code
+        fips_codes, fips_uniques = pd.factorize(fips, sort=True)
+        if len(fips_codes) == 0:
+            return pd.Series([], index=pd.Index([], dtype=object),
+                             dtype="uint64")
+        order = np.argsort(fips_codes, kind="mergesort")
+        is_first = np.ones(len(order), dtype=bool)
+        is_first[1:] = fips_codes[order][1:] != fips_codes[order][:-1]
+        hashes = np.add.reduceat(row_hashes[order], np.flatnonzero(is_first))
+        return pd.Series(hashes, index=pd.Index(fips_uniques, dtype=object))
+
+    def get_changed_fips(self, df_previous: pd.DataFrame,
+                         df_new: pd.DataFrame) -> pd.Index:
+        """
+        Function to get the fips codes whose content hash changed, or
+        which are only in one of the statistics
+
+        Returns:
+        -------
+        fips: pd.Index object with changed fips codes
+        """
+        hashes = pd.concat([self.hash_fips(df_previous),
+                            self.hash_fips(df_new)], axis=1,
+                           keys=["previous", "new"])
+        is_changed = (hashes["previous"].isna() | hashes["new"].isna()
+                      | (hashes["previous"] != hashes["new"]))
+        return hashes.index[is_changed.values]
+
+    def generate_delta(self, df_previous: pd.DataFrame,
+                       df_new: pd.DataFrame) -> pd.DataFrame:
+        """
+        Function to generate the inserted, updated and deleted records of
+        the new statistics compared to the previous statistics
+
+        Parameters:
+        ----------
+        df_previous: pd.DataFrame object with previous statistics as read
+            by "read_saved_dataframe" function or indexed by
+            ("fips", "date")
+        df_new: pd.DataFrame object with new statistics indexed by
+            ("fips", "date") with decoded string fips code and
+            datetime64[ns] date
+
+        Returns:
+        -------
+        df_delta: pd.DataFrame object indexed by ("fips", "date") sorted by
+            ("fips", "date") with "change" column (one of DELTA_CHANGES)
+            and the columns of df_new, with the new values for inserted and
+            updated records and the previous values for deleted records
+        """
+        df_previous = self.set_stats_index(df_previous)
+        changed_fips = self.get_changed_fips(df_previous, df_new)
+        df_previous = df_previous[df_previous.index.get_level_values("fips")
+                                  .isin(changed_fips)]
+        df_new = df_new[df_new.index.get_level_values("fips")
+                        .isin(changed_fips)]
+        is_inserted = ~df_new.index.isin(df_previous.index)
+        is_deleted = ~df_previous.index.isin(df_new.index)
+        df_new_common = df_new[~is_inserted]
+        df_previous_common = df_previous[~is_deleted]\
+            .reindex(df_new_common.index)
+        new_values = df_new_common[DELTA_COMPARED_COLUMNS].values\
+            .astype("float64")
+        previous_values = df_previous_common[DELTA_COMPARED_COLUMNS].values\
+            .astype("float64")
+        is_equal = ((new_values == previous_values)
+                    | (np.isnan(new_values) & np.isnan(previous_values)))
+        is_updated = ~is_equal.all(axis=1)
+        df_delta = pd.concat(
+            [df_new[is_inserted].assign(change="insert"),
+             df_new_common[is_updated].assign(change="update"),
+             df_previous[is_deleted].reindex(columns=df_new.columns)
+             .assign(change="delete")])
+        df_delta = df_delta[["change"] + list(df_new.columns)]
+        return df_delta.sort_index(kind="mergesort")
@@ -0,0 +1,250 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from .exceptions import InputError
+
+# Size of the blocks used to stream downloads to the cache
+DOWNLOAD_BLOCK_SIZE = 1 << 20
+
+
+def is_url(file_path: str) -> bool:
+    """
+    Function to check if given path is a http(s) url
+
+    Parameters:
+    ----------
+    file_path: str, path/url of a file
+
+    Returns:
+    -------
+    bool: True if file_path is a http(s) url
+    """
+    return file_path.startswith("http://") or file_path.startswith("https://")
+
+
+class DownloadCache(object):
+    """
+    This class is a local content addressed cache for remote source files
+
+    Explanation:
+        Downloaded files are stored in "objects" directory named by the
+        sha256 hash of their content, and every url has an entry in
+        "index" directory (named by the sha256 hash of the url) with the
+        content hash and the ETag/Last-Modified headers of the response.
+        When an url is requested again, a conditional request is sent with
+        these headers and the cached content is reused if the server
+        replies "304 Not Modified". Files are never evicted by "get"
+        function, since the files it returned to other threads or worker
+        processes sharing the cache may still be in use, "evict" function
+        is called between runs instead
+
+    Attributes:
+        cache_dir: str, path of the cache directory
+        offline: bool, True: never access the network, only use the cache
+        max_size_bytes: int, optional, maximum total size of cached files
+        max_age_seconds: int, optional, maximum age of cached files
+    """
+
+    def __init__(self, cache_dir: str, offline: bool = False,
+                 max_size_bytes: int = None, max_age_seconds: int = None):
+        """
+        The constructor for DownloadCache class
+
+        Parameters:
+        ----------
+        cache_dir: str, path of the cache directory, created if missing
+        offline: bool, True: never access the network, only use the cache
+        max_size_bytes: int, optional, maximum total size of cached files,
+            least recently used files are evicted first
+        max_age_seconds: int, optional, cached files fetched before this
+            age are evicted
+        """
+        self.cache_dir = cache_dir
+        self.offline = offline
+        self.max_size_bytes = max_size_bytes
+        self.max_age_seconds = max_age_seconds
+        self.objects_dir = os.path.join(cache_dir, "objects")
+        self.index_dir = os.path.join(cache_dir, "index")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.index_dir, exist_ok=True)
+
+    def index_path(self, url: str) -> str:
+        """
+        Function to get the path of the index entry for given url
+        """
+        url_hash = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.index_dir, f"{url_hash}.json")
+
+    def object_path(self, content_hash: str) -> str:
+        """
+        Function to get the path of the cached file for given content hash
+        """
+        return os.path.join(self.objects_dir, content_hash)
+
+    def read_entry(self, url: str) -> dict:
+        """
+        Function to read the index entry for given url
+
+        Returns:
+        -------
+        entry: dict with keys "url", "content_hash", "etag",
+            "last_modified", "size", "fetched_at", "used_at", or None if
+            the url is not cached
+        """
+        index_path = self.index_path(url)
+        if not os.path.exists(index_path):
+            return None
+        with open(index_path) as f:
+            entry = json.load(f)
+        if not os.path.exists(self.object_path(entry["content_hash"])):
+            return None
+        return entry
+
+    def write_entry(self, entry: dict):
+        """
+        Function to write the index entry of an url
+        """
+        # -> Every writer has its own temporary file, the entry of an url
+        # can be written by several threads or processes at the same time
+        index_path = self.index_path(entry["url"])
+        fd, tmp_path = tempfile.mkstemp(dir=self.index_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, index_path)
+
+    def download(self, url: str, entry: dict = None) -> dict:
+        """
+        Function to download given url to the cache, using a conditional
+        request if the url is already cached
+
+        Parameters:
+        ----------
+        url: str, http(s) url of the file
+        entry: dict, optional, current index entry of the url
+
+        Returns:
+        -------
+        entry: dict, updated index entry of the url
+        """
+        request = urllib.request.Request(url)
+        if entry is not None:
+            if entry.get("etag"):
+                request.add_header("If-None-Match", entry["etag"])
+            if entry.get("last_modified"):
+                request.add_header("If-Modified-Since",
+                                   entry["last_modified"])
+        try:
+            response = urllib.request.urlopen(request)
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and entry is not None:
+                entry["fetched_at"] = time.time()
+                return entry
+            raise
+        # -> Streaming the response to a temporary file and computing the
+        # content hash on the way, the file is then renamed to its hash
+        sha256 = hashlib.sha256()
+        size = 0
+        with response:
+            fd, tmp_path = tempfile.mkstemp(dir=self.objects_dir,
+                                            suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                for block in iter(lambda: response.read(DOWNLOAD_BLOCK_SIZE),
+                                  b""):
+                    sha256.update(block)
+                    size += len(block)
+                    f.write(block)
+            headers = response.headers
+        content_hash = sha256.hexdigest()
+        os.replace(tmp_path, self.object_path(content_hash))
+        return {"url": url,
+                "content_hash": content_hash,
+                "etag": headers.get("ETag"),
+                "last_modified": headers.get("Last-Modified"),
+                "size": size,
+                "fetched_at": time.time()}
+
+    def get(self, file_path: str) -> str:
+        """
+        Function to get a local path for given path/url, remote files are
+        downloaded to the cache or revalidated if already cached
+
+        Parameters:
+        ----------
+        file_path: str, path/url of a file
+
+        Returns:
+        -------
+        file_path: str, local path of the file, given path is returned as
+            it is if it is not an url
+        """
+        if not is_url(file_path):
+            return file_path
+        entry = self.read_entry(file_path)
+        if self.offline:
+            if entry is None:
+                raise InputError(file_path,
+                                 f"File {file_path} is not available in "
+                                 f"cache {self.cache_dir} in offline mode")
+        else:
+            entry = self.download(file_path, entry)
+        entry["used_at"] = time.time()
+        self.write_entry(entry)
+        return self.object_path(entry["content_hash"])
+
+    def evict(self):
+        """
+        Function to evict cached files older than "max_age_seconds" and
+        then least recently used files until the total size is below
+        "max_size_bytes"
+
+        Explanation: Must only be called when no file returned by "get"
+        function is still used, for example at the end of a run. In
+        offline mode files can not be fetched again, so they are not
+        evicted by age
+        """
+        entries = []
+        for name in os.listdir(self.index_dir):
+            if not name.endswith(".json"):
+                continue
+            with open(os.path.join(self.index_dir, name)) as f:
+                entries.append(json.load(f))
+        now = time.time()
+        evicted = []
+        if self.max_age_seconds is not None and not self.offline:
+            is_expired = [now - e["fetched_at"] > self.max_age_seconds
+                          for e in entries]
+            evicted = [e for e, expired in zip(entries, is_expired)
+                       if expired]
+            entries = [e for e, expired in zip(entries, is_expired)
+                       if not expired]
+        if self.max_size_bytes is not None:
+            entries.sort(key=lambda e: e.get("used_at", e["fetched_at"]),
+                         reverse=True)
+            total_size = 0
+            kept = []
+            for e in entries:
+                total_size += e["size"]
+                if total_size > self.max_size_bytes and kept:
+                    evicted.append(e)
+                else:
+                    kept.append(e)
+            entries = kept
+        # -> Objects are shared between urls with the same content, so an
+        # object is only removed if no kept entry refers to it
+        kept_hashes = set(e["content_hash"] for e in entries)
+        # -> Files can already be removed by another thread or process
+        # evicting the same entries
+        for e in evicted:
+            paths = [self.index_path(e["url"])]
+            if e["content_hash"] not in kept_hashes:
+                paths.append(self.object_path(e["content_hash"]))
+            for path in paths:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,42 @@
+# Geographic Exceptions of New York Times COVID-19 Data, see
+# https://github.com/nytimes/covid-19-data#geographic-exceptions
+#
+# Every area reported by New York Times without fips code is assigned a
+# synthetic fips code, which is not used by any county of its state. The
+# population of the synthetic fips code is either the sum of the population
+# estimates of its component counties or a fixed population estimate when
+# the area is not a county in Population Estimate Data 2019
+# -> "county", "state": area as reported in New York Times COVID-19 Data
+# -> "fips": synthetic 5 digit fips code
+# -> "component_fips": fips codes whose population estimates are summed,
+# the population is missing (NaN) unless all of them are in the population
+# data
+# -> "population": fixed population estimate, used without component_fips
+# -> "overlapping_fips": counties overlapping the area, their cases and
+# deaths exclude the area but their population estimates include it. The
+# split of the area population by county is not in Population Estimate
+# Data 2019, so these counties keep their full population estimates (their
+# per capita values are understated) and the population of the area is
+# not added again to the state and national rollups, see
+# "generate_rollups" function of NewYorkTimesCovid19Data class
+GEOGRAPHIC_EXCEPTIONS = [
+    # New York City: New York, Kings, Queens, Bronx and Richmond counties,
+    # which are not reported separately
+    {"county": "New York City", "state": "New York", "fips": "36998",
+     "component_fips": ["36061", "36047", "36081", "36005", "36085"],
+     "population": None, "overlapping_fips": []},
+    # Kansas City, Mo.: 2019 population estimate of the city, overlapping
+    # Cass, Clay, Jackson and Platte counties
+    {"county": "Kansas City", "state": "Missouri", "fips": "29998",
+     "component_fips": [], "population": 495327,
+     "overlapping_fips": ["29037", "29047", "29095", "29165"]},
+    # Joplin, Mo.: 2019 population estimate of the city, overlapping Jasper
+    # and Newton counties
+    {"county": "Joplin", "state": "Missouri", "fips": "29997",
+     "component_fips": [], "population": 50925,
+     "overlapping_fips": ["29097", "29145"]},
+]
+
+# State of which deaths are not reported at the county (municipio) level,
+# the missing deaths of its counties are set to 0 instead of dropping them
+STATES_WITHOUT_COUNTY_DEATHS = ["Puerto Rico"]
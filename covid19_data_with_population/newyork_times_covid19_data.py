@@ -1,11 +1,95 @@
+import multiprocessing
+
+import numpy as np
 import pandas as pd
 
 from .dataset import DataSet
+from .download_cache import DownloadCache
 from .exceptions import InputError
+from .geographic_exceptions import GEOGRAPHIC_EXCEPTIONS, \
+    STATES_WITHOUT_COUNTY_DEATHS
+from .population_estimate_data_2019 import PopulationEstimateData2019
+from .sanity_check_report import SanityCheckReport
 
 NEWYORK_TIMES_COVID19_DATA_REQUIRED_COLUMNS = ["fips", "date", "cases",
                                                "deaths", "county", "state"]
 
+# Engines available for generating statistics on combined dataframe
+# -> "vectorized": single global sort with grouped cumulative sums
+# -> "groupby": original per fips code groupby.apply implementation
+STATS_ENGINES = ["vectorized", "groupby"]
+
+# Columns of the per fips code state saved by the incremental mode
+STATS_STATE_COLUMNS = ["fips", "date", "cumulative_cases_to_date",
+                       "cumulative_deaths_to_date"]
+
+# Schema used to parse the csv file, see "read_csv_with_schema" function
+# of DataSet class. "cases" and "deaths" are float because of missing
+# values, they are typecast to integer after dropping missing values
+# -> "county" and "state" are only used for the records without fips code
+# by "update_df_with_geographic_exceptions" function, they are parsed as
+# categorical to keep a single copy of every name
+NEWYORK_TIMES_COVID19_DATA_SCHEMA = {"fips": "string",
+                                     "date": "datetime64[ns]",
+                                     "cases": "float64",
+                                     "deaths": "float64",
+                                     "county": "category",
+                                     "state": "category"}
+
+# Schema used to parse the csv file in compact representation, the
+# integer columns use nullable types because of missing values
+NEWYORK_TIMES_COVID19_DATA_COMPACT_DTYPES = {"fips": "Int32",
+                                             "date": "datetime64[ns]",
+                                             "cases": "Int32",
+                                             "deaths": "Int32",
+                                             "county": "category",
+                                             "state": "category"}
+
+# Input of the worker processes generating statistics on fips code shards,
+# set before the worker processes are forked so that the combined
+# dataframe is shared with them instead of being pickled for every shard
+SHARDED_STATS_INPUT = {}
+
+
+def generate_stats_for_shard(shard_id: int) -> pd.DataFrame:
+    """
+    Function executed by worker processes to generate statistics for the
+    records of one fips code shard of SHARDED_STATS_INPUT
+
+    Parameters:
+    ----------
+    shard_id: int, id of the shard
+
+    Returns:
+    -------
+    df: pd.DataFrame object with generated statistics for the shard
+    """
+    dataset = SHARDED_STATS_INPUT["dataset"]
+    df = SHARDED_STATS_INPUT["df"]
+    df = df[SHARDED_STATS_INPUT["shard_ids"] == shard_id]
+    return dataset.generate_stats(df, SHARDED_STATS_INPUT["engine"])
+
+
+def generate_stats_for_shard_records(df: pd.DataFrame, engine: str,
+                                     compact: bool) -> pd.DataFrame:
+    """
+    Function executed by worker processes to generate statistics for the
+    records of one fips code shard sent to them, when the worker processes
+    are not forked and do not inherit SHARDED_STATS_INPUT
+
+    Parameters:
+    ----------
+    df: pd.DataFrame object with the combined records of the shard
+    engine: str, one of STATS_ENGINES
+    compact: bool, True: df has the compact representation
+
+    Returns:
+    -------
+    df: pd.DataFrame object with generated statistics for the shard
+    """
+    return NewYorkTimesCovid19Data(None, compact=compact).generate_stats(
+        df, engine)
+
 
 class NewYorkTimesCovid19Data(DataSet):
     """
@@ -20,7 +104,9 @@ class NewYorkTimesCovid19Data(DataSet):
             fips, date, county, state, cases, deaths
     """
 
-    def __init__(self, csv_file_path: str):
+    def __init__(self, csv_file_path: str, chunksize: int = None,
+                 compact: bool = False, download_cache: DownloadCache = None,
+                 csv_engine: str = "c", lazy: bool = False):
         """
         The constructor for NewYorkTimesCovid19Data class
 
@@ -30,15 +116,131 @@ class NewYorkTimesCovid19Data(DataSet):
             For example default path used is:
             "https://raw.githubusercontent.com/nytimes/covid-19-data/
             master/us-counties.csv"
+            or a file-like object (stream) with the csv content, or None
+            if the records are set by "from_dataframe" or "from_arrow"
+            function
+        chunksize: int, optional, number of records per chunk. If provided
+            the csv file is not loaded in memory, instead it is streamed
+            in chunks by "read_preprocessed_chunks" function, which also
+            validates its columns
+        compact: bool, True: use compact representation, "fips" is parsed
+            as int32, "cases" and "deaths" as int32 and "date" is encoded
+            as int32 day offset. The compact columns are decoded back by
+            "decode_compact_stats" function before saving the output
+        download_cache: DownloadCache object, optional, if provided remote
+            csv file is read from the local download cache
+        csv_engine: str, one of CSV_PARSER_ENGINES of DataSet class,
+            parser engine of the csv file
+        lazy: bool, True: only validate the columns of the csv file, the
+            records are not loaded, for example when the preprocessed
+            records are read from a stage checkpoint
+        """
+        csv_file_path = self.get_local_file_path(csv_file_path,
+                                                 download_cache)
+        self.csv_file_path = csv_file_path
+        self.chunksize = chunksize
+        self.compact = compact
+        self.csv_engine = csv_engine
+        if csv_file_path is None:
+            self.df = None
+        elif lazy and isinstance(csv_file_path, str):
+            # -> Only validate the columns on the header line, the records
+            # are not read
+            self.validate_csv_columns(
+                csv_file_path, NEWYORK_TIMES_COVID19_DATA_REQUIRED_COLUMNS)
+            self.df = None
+        elif chunksize is None and not lazy:
+            self.df = self.read_csv(csv_file_path)
+        else:
+            # -> The records are read later in chunks by
+            # "read_preprocessed_chunks" function, which validates the
+            # columns, so the source is only opened once
+            self.df = None
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, compact: bool = False):
+        """
+        Function to create a NewYorkTimesCovid19Data object from New York
+        Times COVID-19 Data already loaded in memory
+
+        Explanation: Only the columns of the schema are used, the columns
+        already having the type of the schema are shared with df and not
+        copied, see "conform_to_schema" function of DataSet class. df is
+        not modified by this function or by "preprocess" function
+
+        Parameters:
+        ----------
+        df: pd.DataFrame object with at least "fips" (str), "date",
+            "cases", "deaths", "county" and "state" columns
+        compact: bool, True: use compact representation
+
+        Returns:
+        -------
+        newyork_times_covid19_data: NewYorkTimesCovid19Data object
         """
-        # -> Using dtype as object to avoid data type format change due to
-        # auto inferring the data type
-        self.df = pd.read_csv(csv_file_path, dtype=object)
-        for c in NEWYORK_TIMES_COVID19_DATA_REQUIRED_COLUMNS:
-            if c not in self.df.columns:
-                raise InputError(NewYorkTimesCovid19Data(csv_file_path),
-                                 f"Column {c} of type string not found in source \
-                        dataset {csv_file_path}")
+        newyork_times_covid19_data = cls(None, compact=compact)
+        newyork_times_covid19_data.df = \
+            newyork_times_covid19_data.conform_to_schema(
+                df, newyork_times_covid19_data.get_schema(),
+                NEWYORK_TIMES_COVID19_DATA_REQUIRED_COLUMNS)
+        return newyork_times_covid19_data
+
+    @classmethod
+    def from_arrow(cls, table, compact: bool = False):
+        """
+        Function to create a NewYorkTimesCovid19Data object from New York
+        Times COVID-19 Data in a pyarrow Table
+
+        Explanation: Only the columns of the schema are converted to
+        pandas, see "arrow_table_to_dataframe" function of DataSet class
+
+        Parameters:
+        ----------
+        table: pyarrow.Table object with the columns of "from_dataframe"
+            function
+        compact: bool, True: use compact representation
+
+        Returns:
+        -------
+        newyork_times_covid19_data: NewYorkTimesCovid19Data object
+        """
+        newyork_times_covid19_data = cls(None, compact=compact)
+        newyork_times_covid19_data.df = \
+            newyork_times_covid19_data.arrow_table_to_dataframe(
+                table, newyork_times_covid19_data.get_schema(),
+                NEWYORK_TIMES_COVID19_DATA_REQUIRED_COLUMNS)
+        return newyork_times_covid19_data
+
+    def get_schema(self) -> dict:
+        """
+        Function to get the schema of the records,
+        NEWYORK_TIMES_COVID19_DATA_SCHEMA or
+        NEWYORK_TIMES_COVID19_DATA_COMPACT_DTYPES in compact representation
+        """
+        if self.compact:
+            return NEWYORK_TIMES_COVID19_DATA_COMPACT_DTYPES
+        return NEWYORK_TIMES_COVID19_DATA_SCHEMA
+
+    def read_csv(self, csv_file_path: str, chunksize: int = None):
+        """
+        Function to read only the required columns of New York Times
+        COVID-19 Data with NEWYORK_TIMES_COVID19_DATA_SCHEMA, or with
+        NEWYORK_TIMES_COVID19_DATA_COMPACT_DTYPES in compact representation
+
+        Parameters:
+        ----------
+        csv_file_path: str, path/url for New York Times COVID-19 Data
+        chunksize: int, optional, number of records per chunk
+
+        Returns:
+        -------
+        df: pd.DataFrame object, or iterator of pd.DataFrame objects if
+            chunksize is provided
+        """
+        return self.read_csv_with_schema(
+            csv_file_path, self.get_schema(),
+            NEWYORK_TIMES_COVID19_DATA_REQUIRED_COLUMNS,
+            chunksize=chunksize, engine=self.csv_engine)
 
     def update_df_with_geographic_exceptions(self, df: pd.DataFrame)\
             -> pd.DataFrame:
@@ -50,11 +252,21 @@ class NewYorkTimesCovid19Data(DataSet):
         ----------
         df: pd.Datafame object with New York Times COVID-19 Data
 
+        Explanation:
+            The rules are defined in GEOGRAPHIC_EXCEPTIONS and
+            STATES_WITHOUT_COUNTY_DEATHS tables and applied with vectorized
+            operations on the records without fips code:
+            - areas reported without fips code (New York City, Kansas City,
+              Joplin) are assigned their synthetic fips code, the matching
+              population is added to population data by
+              "add_geographic_exceptions" function of
+              PopulationEstimateData2019 class
+            - missing deaths of the counties of Puerto Rico are set to 0
+
         Returns:
         df: pd.DataFrame object with updated with Geographic Exceptions logic
 
         """
-        #### This is a function placeholder for future implementation ########
         # Geographic Exceptions cases:
         # 1. New York: All cases for the five boroughs of New York City
         # (New York, Kings, Queens, Bronx and Richmond counties) are
@@ -117,7 +329,53 @@ class NewYorkTimesCovid19Data(DataSet):
         # does not report deaths at the municipio level.
         # :: deaths not populated
         # county:Unknown,state: <52 different state values>::6886records
-        return df
+        # -> Alameda County population already includes Berkeley, and the
+        # cruise ship and USS Theodore Roosevelt cases are neglected, so
+        # only cases 1, 2, 3 and 7 require an update, see
+        # "get_geographic_exception_columns" function
+        fips, deaths = self.get_geographic_exception_columns(df)
+        if fips is df["fips"] and deaths is df["deaths"]:
+            return df
+        return df.assign(fips=fips, deaths=deaths)
+
+    def get_geographic_exception_columns(self, df: pd.DataFrame) -> tuple:
+        """
+        Function to get the "fips" and "deaths" columns updated with the
+        rules of "update_df_with_geographic_exceptions" function, without
+        copying the other columns
+
+        Parameters:
+        ----------
+        df: pd.Datafame object with New York Times COVID-19 Data, not
+            modified
+
+        Returns:
+        -------
+        fips: pd.Series object, df["fips"] itself if no record is updated,
+            otherwise an updated copy
+        deaths: pd.Series object, df["deaths"] itself if no record is
+            updated, otherwise an updated copy
+        """
+        fips = df["fips"]
+        deaths = df["deaths"]
+        is_missing_fips = df["fips"].isna()
+        df_missing_fips = df.loc[is_missing_fips, ["county", "state"]]
+        area = (df_missing_fips["county"].astype(str) + "|"
+                + df_missing_fips["state"].astype(str))
+        synthetic_fips = area.map({f"{e['county']}|{e['state']}": e["fips"]
+                                   for e in GEOGRAPHIC_EXCEPTIONS})
+        synthetic_fips = synthetic_fips.dropna()
+        if not synthetic_fips.empty:
+            if self.compact:
+                synthetic_fips = synthetic_fips.astype("int32")
+            fips = fips.copy()
+            fips.loc[synthetic_fips.index] = synthetic_fips.values
+        is_missing_deaths = (deaths.isna() & ~is_missing_fips
+                             & df["state"].isin(STATES_WITHOUT_COUNTY_DEATHS))
+        if is_missing_deaths.any():
+            deaths = deaths.copy()
+            deaths.loc[is_missing_deaths] = 0
+        return fips, deaths
 
     def preprocess_missing_values(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -145,8 +403,13 @@ class NewYorkTimesCovid19Data(DataSet):
             df: pd.DataFrame with the above logic applied for missing values
 
         """
-        df = df.dropna(subset=["fips", "date", "cases", "deaths"])
-        return df
+        # -> The records are only copied if some of them are dropped
+        is_missing = np.zeros(len(df), dtype=bool)
+        for c in ["fips", "date", "cases", "deaths"]:
+            is_missing |= df[c].isna().values
+        if not is_missing.any():
+            return df
+        return df[~is_missing]
 
     def preprocess_typecast_columns(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -159,11 +422,11 @@ class NewYorkTimesCovid19Data(DataSet):
         Parameters:
         ----------
         df: pd.DataFrame object having all the required 
-            columns: 
+            columns as parsed with NEWYORK_TIMES_COVID19_DATA_SCHEMA: 
                 "fips":string
-                "cases": string
-                "deaths": string
-                "date": string
+                "cases": float
+                "deaths": float
+                "date": datetime64[ns]
         Return:
         ------
         df: pd.DataFrame object with updated data type for 
@@ -172,10 +435,30 @@ class NewYorkTimesCovid19Data(DataSet):
                 "cases": integer
                 "deaths": integer
                 "date": datetime64[ns]
+            or in compact representation:
+                "fips": int32
+                "cases": int32
+                "deaths": int32
+                "date": int32, day offset from COMPACT_DATE_EPOCH
         """
-        df = df.astype(dtype={"cases": int, "deaths": int,
-                              "date": "datetime64[ns]"})
-        return df
+        # -> Only the columns having another type are converted, the new
+        # dataframe shares the other columns with df
+        if self.compact:
+            # -> Compact representation is already parsed with nullable
+            # types, missing values are dropped at this point
+            dtypes = {"fips": "int32", "cases": "int32", "deaths": "int32"}
+        else:
+            dtypes = {"cases": "int64", "deaths": "int64",
+                      "date": "datetime64[ns]"}
+        columns = {}
+        for c in df.columns:
+            values = df[c]
+            if c in dtypes and values.dtype != dtypes[c]:
+                values = values.astype(dtypes[c])
+            columns[c] = values
+        if self.compact:
+            columns["date"] = self.encode_dates(columns["date"])
+        return pd.DataFrame(columns, copy=False)
 
     def preprocess(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -187,14 +470,14 @@ class NewYorkTimesCovid19Data(DataSet):
 
         Parameters:
         ----------
-        df: pd.Datafame object with New York Times COVID-19 Data having
-            columns:
+        df: pd.Datafame object with New York Times COVID-19 Data as read by
+            "read_csv" function having columns:
                 fips: string
-                date: string
-                county: string
-                state: string
-                cases: string
-                deaths: string 
+                date: datetime64[ns]
+                county: category
+                state: category
+                cases: float
+                deaths: float
         Returns:
         -------
         df: pd.Datafame object with preprocessed New York Times COVID-19 
@@ -207,13 +490,41 @@ class NewYorkTimesCovid19Data(DataSet):
                 deaths: integer 
         """
         # Apply the geographic exceptions mentioned on the github repository
-        df = self.update_df_with_geographic_exceptions(self.df)
-        feature_list = ["fips", "date", "cases", "deaths"]
-        df = self.feature_selection(df, feature_list)
+        # -> Only the updated "fips" and "deaths" columns are copied, and
+        # the selected columns are shared with df instead of copied by
+        # "feature_selection" function, df is not modified
+        fips, deaths = self.get_geographic_exception_columns(df)
+        df = pd.DataFrame({"fips": fips, "date": df["date"],
+                           "cases": df["cases"], "deaths": deaths},
+                          copy=False)
         df = self.preprocess_missing_values(df)
         df = self.preprocess_typecast_columns(df)
         return df
 
+    def read_preprocessed_chunks(self):
+        """
+        Function to stream the New York Times COVID-19 Data in chunks of
+        "chunksize" records and apply the "preprocess" function on each
+        chunk
+
+        Explanation: Only one chunk of raw records is in memory at a time,
+        so the peak memory is bounded by the chunk size instead of the
+        file size
+
+        Yields:
+        ------
+        df: pd.Datafame object with preprocessed chunk of New York Times
+            COVID-19 Data having columns:
+                fips: string
+                date: datetime64[ns]
+                cases: integer
+                deaths: integer
+        """
+        chunks = self.read_csv(self.csv_file_path,
+                               chunksize=self.chunksize or 100000)
+        for df in chunks:
+            yield self.preprocess(df)
+
     def combine_with_population_data(self, df_covid19: pd.DataFrame,
                                      df_population: pd.DataFrame) -> pd.DataFrame:
         """
@@ -221,8 +532,10 @@ class NewYorkTimesCovid19Data(DataSet):
         left join on "fips" column
 
         Explanation: We are applying the left join because we need 
-        latest population estimate data from df_population. The combined 
-        dataframe can later be used for generating the stats
+        the population estimate of the year of every record from
+        df_population. The combined dataframe can later be used for
+        generating the stats. The left join is applied with
+        "combine_with_population_lookup" function
 
         Parameter:
         ---------
@@ -233,10 +546,10 @@ class NewYorkTimesCovid19Data(DataSet):
                 "cases": integer
                 "deaths": integer
 
-        df_population: pd.DataFrame object with Population Estimate 
-            Data 2019 having columns:
+        df_population: pd.DataFrame object with preprocessed Population
+            Estimate Data 2019 having columns:
                 "fips": string
-                "POPESTIMATE2019": integer
+                "POPESTIMATE<year>": integer
         Returns:
         -------
         df_combined: pd.DataFrame object with combined data having 
@@ -245,11 +558,51 @@ class NewYorkTimesCovid19Data(DataSet):
                 "date": datetime64[ns]
                 "cases": integer
                 "deaths": integer
-                "POPESTIMATE2019": integer
+                "POPESTIMATE": integer
+        """
+        population_lookup = PopulationEstimateData2019(
+            None).generate_population_lookup(df_population)
+        return self.combine_with_population_lookup(df_covid19,
+                                                   population_lookup)
+
+    def combine_with_population_lookup(self, df_covid19: pd.DataFrame,
+                                       population_lookup: np.ndarray) \
+            -> pd.DataFrame:
+        """
+        Function to combine covid19 data with population data using a
+        dense population lookup array indexed by year and integer fips
+        code
+
+        Explanation: The population estimate of the year of the date of
+        every record is gathered from the lookup array, which gives the
+        same result as a left join on "fips" column and year without
+        hashing the string fips codes. Years out of the years of the
+        lookup get the estimate of the first or last year. Records with
+        fips code missing in population data get NaN population
+
+        Parameter:
+        ---------
+        df_covid: pd.DataFrame object with processed New York Times
+            COVID-19 Data as in "combine_with_population_data" function
+        population_lookup: np.ndarray object generated by
+            "generate_population_lookup" function of
+            PopulationEstimateData2019 class, or a lookup indexed only by
+            integer fips code which is used for every year
+
+        Returns:
+        -------
+        df_combined: pd.DataFrame object with combined data as in
+            "combine_with_population_data" function, "POPESTIMATE" is the
+            population estimate of the year of the record
         """
-        df_combined = df_covid19.merge(df_population, on="fips", how="left")
-        feature_list = ["fips", "date", "cases", "deaths", "POPESTIMATE2019"]
-        return self.feature_selection(df_combined, feature_list)
+        # -> The columns of df_covid19 are shared with the combined
+        # dataframe, only the population column is allocated
+        return pd.DataFrame(
+            {"fips": df_covid19["fips"], "date": df_covid19["date"],
+             "cases": df_covid19["cases"], "deaths": df_covid19["deaths"],
+             "POPESTIMATE": self.gather_from_fips_lookup(
+                 df_covid19["fips"], population_lookup,
+                 df_covid19["date"])}, copy=False)
 
     def generate_stats_for_each_fips_code(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -271,7 +624,7 @@ class NewYorkTimesCovid19Data(DataSet):
                 "date": datetime64[ns]
                 "cases": integer
                 "deaths": integer
-                "POPESTIMATE2019": integer
+                "POPESTIMATE": integer
         Returns:
         ----------
         df: pd.DataFrame object with generated stats on the data filtered 
@@ -292,7 +645,7 @@ class NewYorkTimesCovid19Data(DataSet):
         # calculate cumulative deaths to date
         df["cumulative_deaths_to_date"] = df["deaths"].cumsum()
         # calculate updated population to date
-        df["population"] = (df["POPESTIMATE2019"]
+        df["population"] = (df["POPESTIMATE"]
                             - df["cumulative_deaths_to_date"])
         # rename columns
         df.rename(columns={"cases": "daily_cases",
@@ -304,7 +657,79 @@ class NewYorkTimesCovid19Data(DataSet):
         df = self.feature_selection(df, feature_list)
         return df
 
-    def generate_stats(self, df: pd.DataFrame) -> pd.DataFrame:
+    def generate_stats_vectorized(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Function to generate statistics defined in
+        "generate_stats_for_each_fips_code" function for all the fips
+        codes at once, without calling a python function per fips code
+
+        Explanation:
+            The records are ordered once by ("fips", "date") with a stable
+            sort of the integer codes of the fips codes and dates, and the
+            cumulative sums are computed with one cumsum over all the
+            ordered records minus the cumulative sum before the first
+            record of every fips code. Only the ordered columns of the
+            output are allocated, the combined dataframe is neither sorted
+            nor copied. The output is identical to the "groupby" engine of
+            "generate_stats" function
+
+        Parameters:
+        ----------
+        df: pd.DataFrame object with combined data having
+            columns:
+                "fips": string
+                "date": datetime64[ns]
+                "cases": integer
+                "deaths": integer
+                "POPESTIMATE": integer
+
+        Returns:
+        -------
+        df: pd.DataFrame object indexed by ("fips", "date") having
+            following columns:
+                "population":integer
+                "daily_cases":integer
+                "daily_deaths":integer
+                "cumulative_cases_to_date":integer
+                "cumulative_deaths_to_date":integer
+        """
+        fips_codes, fips_uniques = pd.factorize(df["fips"], sort=True)
+        date_codes, date_uniques = pd.factorize(df["date"], sort=True)
+        # -> lexsort is stable, so the order of the records within the same
+        # ("fips", "date") group is kept
+        order = np.lexsort((date_codes, fips_codes))
+        fips_codes = fips_codes[order]
+        is_first = np.ones(len(order), dtype=bool)
+        is_first[1:] = fips_codes[1:] != fips_codes[:-1]
+        first_positions = np.flatnonzero(is_first)
+        group_ids = np.cumsum(is_first) - 1
+
+        def grouped_cumsum(values: np.ndarray) -> np.ndarray:
+            # -> Using int64 for cumulative sums to avoid overflow of
+            # compact int32 daily values
+            cumulative = np.cumsum(values, dtype="int64")
+            before_first = cumulative[first_positions] \
+                - values[first_positions]
+            return cumulative - before_first[group_ids]
+
+        daily_cases = df["cases"].values[order]
+        daily_deaths = df["deaths"].values[order]
+        cumulative_deaths = grouped_cumsum(daily_deaths)
+        df_stats = pd.DataFrame({
+            "population": df["POPESTIMATE"].values[order]
+            - cumulative_deaths,
+            "daily_cases": daily_cases,
+            "daily_deaths": daily_deaths,
+            "cumulative_cases_to_date": grouped_cumsum(daily_cases),
+            "cumulative_deaths_to_date": cumulative_deaths}, copy=False)
+        df_stats.index = pd.MultiIndex(
+            levels=[fips_uniques, date_uniques],
+            codes=[fips_codes, date_codes[order]], names=["fips", "date"],
+            verify_integrity=False)
+        return df_stats
+
+    def generate_stats(self, df: pd.DataFrame,
+                       engine: str = "vectorized") -> pd.DataFrame:
         """
         Function to generate statistics defined in 
         "generate_stats_for_each_fips_code" function for each
@@ -318,7 +743,11 @@ class NewYorkTimesCovid19Data(DataSet):
                 "date": datetime64[ns]
                 "cases": integer
                 "deaths": integer
-                "POPESTIMATE2019": integer
+                "POPESTIMATE": integer
+        engine: str, one of STATS_ENGINES
+            "vectorized": use "generate_stats_vectorized" function
+            "groupby": apply "generate_stats_for_each_fips_code" function
+                on each fips code
 
         Returns:
         -------
@@ -332,6 +761,12 @@ class NewYorkTimesCovid19Data(DataSet):
                 "cumulative_cases_to_date":integer
                 "cumulative_deaths_to_date":integer
         """
+        if engine not in STATS_ENGINES:
+            raise InputError(engine,
+                             f"Stats engine {engine} is not one of "
+                             f"{STATS_ENGINES}")
+        if engine == "vectorized":
+            return self.generate_stats_vectorized(df)
         df = df.groupby("fips").apply(lambda df_tmp:
                                       self.generate_stats_for_each_fips_code(df_tmp))
         feature_list = ["population", "daily_cases",
@@ -340,39 +775,483 @@ class NewYorkTimesCovid19Data(DataSet):
         df = self.feature_selection(df, feature_list)
         return df
 
-    def sanity_check_prepared_data(self, df_prepared):
+    def generate_rollups(self, df_stats: pd.DataFrame) -> dict:
+        """
+        Function to generate state and national rollups of the statistics
+        generated by "generate_stats" function
+
+        Explanation:
+            The state code is the first two digits of the fips code (same
+            as "STATE" column of Population Estimate Data 2019), computed
+            as integer fips code // 1000. Dates are factorized to integer
+            codes, and every column is summed per (state code, date code)
+            and per date code with np.bincount on the integer keys, without
+            sorting or grouping strings. Null population values (fips codes
+            without population estimate) are summed as 0. Records without
+            fips code ("Unknown" counties) are not part of the statistics
+            and so not part of the rollups. The areas of
+            GEOGRAPHIC_EXCEPTIONS are counted once:
+            - the population of an area with "overlapping_fips" (Kansas
+              City, Joplin) is already in the population of the counties
+              overlapping it, so it is summed as 0, its cases and deaths
+              are summed as they are not in the counts of these counties
+            - the records of the "component_fips" of an area (New York City
+              counties) are not summed if the area has records, as the area
+              already has their cases, deaths and population
+
+        Parameters:
+        ----------
+        df_stats: pd.DataFrame object indexed by ("fips", "date") as
+            returned by "generate_stats" function
+
+        Returns:
+        -------
+        rollups: dict with one pd.DataFrame object per ROLLUP_LEVELS having
+            the same columns as df_stats:
+                "state": indexed by ("state", "date"), state as 2 digit
+                    string
+                "national": indexed by "date"
+        """
+        columns = ["population", "daily_cases", "daily_deaths",
+                   "cumulative_cases_to_date", "cumulative_deaths_to_date"]
+        fips = self.fips_to_int(
+            pd.Series(df_stats.index.get_level_values("fips")))
+        dates = df_stats.index.get_level_values("date")
+        # -> Synthetic fips codes are compared as integers, so the same
+        # masks are used for string and compact fips codes
+        area_fips = [int(e["fips"]) for e in GEOGRAPHIC_EXCEPTIONS
+                     if e["overlapping_fips"]]
+        component_fips = [int(f) for e in GEOGRAPHIC_EXCEPTIONS
+                          if (fips == int(e["fips"])).any()
+                          for f in e["component_fips"]]
+        is_kept = ~np.isin(fips, component_fips)
+        if is_kept.all():
+            is_kept = slice(None)
+        fips = fips[is_kept]
+        is_area_population = np.isin(fips, area_fips)
+        states = fips // 1000
+        date_codes, dates = pd.factorize(dates[is_kept], sort=True)
+        if self.compact:
+            dates = self.decode_dates(dates)
+        number_of_dates = len(dates)
+        # -> State codes are below 100, so keys are dense and the bins of
+        # np.bincount stay small
+        keys = states.astype("int64") * number_of_dates + date_codes
+        number_of_keys = 100 * number_of_dates
+        state_counts = np.bincount(keys, minlength=number_of_keys)
+        is_state_key = np.flatnonzero(state_counts)
+        national_counts = np.bincount(date_codes, minlength=number_of_dates)
+        is_national_key = np.flatnonzero(national_counts)
+        state_sums = {}
+        national_sums = {}
+        for c in columns:
+            values = np.nan_to_num(
+                df_stats[c].values[is_kept].astype("float64"))
+            if c == "population":
+                values[is_area_population] = 0
+            state_sums[c] = np.bincount(
+                keys, weights=values, minlength=number_of_keys)[is_state_key]
+            national_sums[c] = np.bincount(
+                date_codes, weights=values,
+                minlength=number_of_dates)[is_national_key]
+            if c != "population":
+                state_sums[c] = state_sums[c].astype("int64")
+                national_sums[c] = national_sums[c].astype("int64")
+        df_state = pd.DataFrame(state_sums, columns=columns)
+        df_state.index = pd.MultiIndex.from_arrays(
+            [pd.Index(np.char.zfill(
+                (is_state_key // number_of_dates).astype(str), 2),
+                dtype=object),
+             dates[is_state_key % number_of_dates]],
+            names=["state", "date"])
+        df_national = pd.DataFrame(national_sums, columns=columns)
+        df_national.index = pd.Index(dates[is_national_key], name="date")
+        return {"state": df_state, "national": df_national}
+
+    def generate_stats_in_parallel(self, df: pd.DataFrame,
+                                   engine: str = "vectorized",
+                                   workers: int = 2) -> pd.DataFrame:
+        """
+        Function to generate statistics with "generate_stats" function on
+        fips code shards in a pool of worker processes
+
+        Explanation:
+            Every fips code is independent, so the records are split in
+            "workers" shards by the hash of their fips code. With fork start
+            method the combined dataframe is inherited by the worker
+            processes and only the shard id is sent to them. On platforms
+            without fork start method the records of every shard are sent
+            to spawned worker processes instead. The shard results are
+            concatenated and ordered by fips code, so the output is
+            identical to "generate_stats" function
+
+        Parameters:
+        ----------
+        df: pd.DataFrame object with combined data as in "generate_stats"
+            function
+        engine: str, one of STATS_ENGINES
+        workers: int, number of worker processes and shards
+
+        Returns:
+        -------
+        df: pd.DataFrame object with generated statistics as in
+            "generate_stats" function
+        """
+        shard_ids = (pd.util.hash_pandas_object(df["fips"], index=False)
+                     % workers).values
+        if "fork" in multiprocessing.get_all_start_methods():
+            SHARDED_STATS_INPUT.update({"dataset": self, "engine": engine,
+                                        "df": df, "shard_ids": shard_ids})
+            try:
+                with multiprocessing.get_context("fork").Pool(
+                        workers) as pool:
+                    df_shards = pool.map(generate_stats_for_shard,
+                                         range(workers))
+            finally:
+                SHARDED_STATS_INPUT.clear()
+        else:
+            with multiprocessing.get_context("spawn").Pool(workers) as pool:
+                df_shards = pool.starmap(
+                    generate_stats_for_shard_records,
+                    [(df[shard_ids == shard_id], engine, self.compact)
+                     for shard_id in range(workers)])
+        # -> Shards have distinct fips codes and are sorted by
+        # ("fips", "date"), so a stable sort on fips code gives the same
+        # order as a single process run
+        df = pd.concat(df_shards)
+        return df.sort_index(level="fips", sort_remaining=False,
+                             kind="mergesort")
+
+    def generate_stats_state(self, df_stats: pd.DataFrame,
+                             df_state: pd.DataFrame = None) -> pd.DataFrame:
+        """
+        Function to generate the last cumulative state for each fips code
+        from the generated statistics
+
+        Explanation: The state is used by the incremental mode to extend
+        the cumulative columns on the next run without recomputing them
+        from the whole history. If a previous state is provided, fips
+        codes which are not present in df_stats keep their previous state
+
+        Parameters:
+        ----------
+        df_stats: pd.DataFrame object indexed by ("fips", "date") and
+            sorted by ("fips", "date") as returned by "generate_stats"
+        df_state: pd.DataFrame object with previous state having columns
+            STATS_STATE_COLUMNS, optional
+
+        Returns:
+        -------
+        df_state: pd.DataFrame object having one record per fips code with
+            columns:
+                "fips": string
+                "date": datetime64[ns], last date processed
+                "cumulative_cases_to_date": integer
+                "cumulative_deaths_to_date": integer
+        """
+        df_last = df_stats.groupby(level="fips", sort=False).tail(1)
+        df_last = df_last.reset_index()[STATS_STATE_COLUMNS]
+        if df_state is not None:
+            df_last = pd.concat([df_state[STATS_STATE_COLUMNS], df_last])\
+                .drop_duplicates(subset="fips", keep="last")
+        return df_last.sort_values(by="fips").reset_index(drop=True)
+
+    def read_stats_state(self, csv_file_path: str) -> pd.DataFrame:
+        """
+        Function to read the state saved by "generate_stats_state" function
+
+        Parameters:
+        ----------
+        csv_file_path: str, path of the state csv file
+
+        Returns:
+        -------
+        df_state: pd.DataFrame object with columns STATS_STATE_COLUMNS
+        """
+        df_state = pd.read_csv(csv_file_path,
+                               dtype={"fips": object},
+                               parse_dates=["date"])
+        for c in STATS_STATE_COLUMNS:
+            if c not in df_state.columns:
+                raise InputError(csv_file_path,
+                                 f"Column {c} not found in stats state "
+                                 f"{csv_file_path}")
+        if self.compact:
+            df_state["fips"] = df_state["fips"].astype("int32")
+            df_state["date"] = self.encode_dates(df_state["date"])
+        return df_state
+
+    def decode_compact_stats(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Function to decode "fips" and "date" of a dataframe generated in
+        compact representation back to 5 digit string fips code and
+        datetime64[ns] date, to save it in the same format as default
+        representation. The dataframe is returned as it is if compact
+        representation is not used
+
+        Parameters:
+        ----------
+        df: pd.DataFrame object with "fips" and "date" as columns or as
+            index levels, for example generated stats or stats state
+
+        Returns:
+        -------
+        df: pd.DataFrame object with decoded "fips" and "date"
+        """
+        if not self.compact:
+            return df
+        if "fips" in df.columns:
+            return df.assign(fips=self.decode_fips(df["fips"]),
+                             date=self.decode_dates(df["date"]))
+        df = df.copy(deep=False)
+        # -> Only the unique values of the index levels are decoded, the
+        # codes of the index are shared, decoding keeps the order of the
+        # values so the index stays sorted
+        levels = dict(zip(df.index.names, df.index.levels))
+        df.index = df.index.set_levels(
+            [self.decode_fips(levels["fips"]),
+             self.decode_dates(levels["date"])],
+            level=["fips", "date"], verify_integrity=False)
+        return df
+
+    def select_new_records(self, df: pd.DataFrame,
+                           df_state: pd.DataFrame) -> pd.DataFrame:
+        """
+        Function to select the records with a date later than the last
+        date saved in df_state for their fips code, records with a fips
+        code missing in df_state are always selected
+
+        Parameters:
+        ----------
+        df: pd.DataFrame object having columns "fips" and "date"
+        df_state: pd.DataFrame object with columns STATS_STATE_COLUMNS
+
+        Returns:
+        -------
+        df: pd.DataFrame object with the selected records
+        """
+        last_date = df["fips"].map(df_state.set_index("fips")["date"])
+        return df[last_date.isna() | (df["date"] > last_date)]
+
+    def extend_stats_from_state(self, df: pd.DataFrame,
+                                df_state: pd.DataFrame = None) \
+            -> pd.DataFrame:
+        """
+        Function to generate statistics for records following the state
+        saved in df_state, by extending the saved cumulative values
+
+        Explanation:
+            The statistics are generated for given records only, then the
+            cumulative columns and population are extended from the saved
+            cumulative values, so the result is the same as the matching
+            records of a full "generate_stats" run. All the records must
+            be later than the last date saved for their fips code
+
+        Parameters:
+        ----------
+        df: pd.DataFrame object with combined data having
+            columns:
+                "fips": string
+                "date": datetime64[ns]
+                "cases": integer
+                "deaths": integer
+                "POPESTIMATE": integer
+        df_state: pd.DataFrame object with columns STATS_STATE_COLUMNS,
+            optional, if not provided stats start from zero
+
+        Returns:
+        -------
+        df: pd.DataFrame object indexed by ("fips", "date") with generated
+            statistics having the same columns as "generate_stats" function
+        """
+        df_stats = self.generate_stats_vectorized(df)
+        if df_state is None:
+            df_state = pd.DataFrame({
+                "fips": pd.Series(dtype=object),
+                "date": pd.Series(dtype="int32" if self.compact
+                                  else "datetime64[ns]"),
+                "cumulative_cases_to_date": pd.Series(dtype=int),
+                "cumulative_deaths_to_date": pd.Series(dtype=int)})
+        df_state = df_state.set_index("fips")
+        df_offset = df_state.reindex(df_stats.index.get_level_values("fips"))
+        is_not_later = (df_stats.index.get_level_values("date").values
+                        <= df_offset["date"].values)
+        if is_not_later.any():
+            raise InputError(df_stats.index[is_not_later],
+                             "Records are not later than the last date "
+                             "processed for their fips code, input data "
+                             "must be sorted by date")
+        cases_offset = df_offset["cumulative_cases_to_date"]\
+            .fillna(0).astype(int).values
+        deaths_offset = df_offset["cumulative_deaths_to_date"]\
+            .fillna(0).astype(int).values
+        df_stats["cumulative_cases_to_date"] += cases_offset
+        df_stats["cumulative_deaths_to_date"] += deaths_offset
+        # -> As in a full run, population is float only if some records
+        # have no population estimate, so appended records keep the format
+        # of a full run
+        df_stats["population"] = df_stats["population"] - deaths_offset
+        return df_stats
+
+    def generate_stats_from_chunks(self, chunks,
+                                   population_lookup: np.ndarray,
+                                   df_state: pd.DataFrame = None):
+        """
+        Function to generate statistics on a stream of preprocessed New
+        York Times COVID-19 Data chunks, keeping a running cumulative state
+        per fips code between chunks
+
+        Explanation: The statistics of every chunk are sorted by fips code
+        and date, but they are yielded in chunk order, so the records of a
+        fips code are spread over the chunks. Sorting the whole output
+        gives the records of "generate_stats" function. Population is float
+        in every chunk, as in "generate_stats" function when some records
+        have no population estimate (records without fips code in New
+        York Times COVID-19 Data), so every chunk is written in the same
+        format
+
+        Parameters:
+        ----------
+        chunks: iterable of pd.DataFrame objects as yielded by
+            "read_preprocessed_chunks" function, sorted by date
+        population_lookup: np.ndarray object generated by
+            "generate_population_lookup" function of
+            PopulationEstimateData2019 class
+        df_state: pd.DataFrame object with columns STATS_STATE_COLUMNS,
+            optional, if provided only records later than this state are
+            processed, as in "generate_incremental_stats" function
+
+        Yields:
+        ------
+        df: pd.DataFrame object indexed by ("fips", "date") with generated
+            statistics for each chunk
+        df_state: pd.DataFrame object with the running state after the chunk
+        """
+        df_initial_state = df_state
+        for df in chunks:
+            if df_initial_state is not None:
+                df = self.select_new_records(df, df_initial_state)
+            df_combined = self.combine_with_population_lookup(
+                df, population_lookup)
+            df_stats = self.extend_stats_from_state(df_combined, df_state)
+            df_stats["population"] = df_stats["population"].astype(float)
+            df_state = self.generate_stats_state(df_stats, df_state)
+            yield df_stats, df_state
+
+    def generate_incremental_stats(self, df: pd.DataFrame,
+                                   df_state: pd.DataFrame) -> pd.DataFrame:
+        """
+        Function to generate statistics only for the records published
+        after the last processed date of each fips code
+
+        Explanation:
+            Records are selected by "select_new_records" function and
+            statistics are generated for them by "extend_stats_from_state"
+            function
+
+        Parameters:
+        ----------
+        df: pd.DataFrame object with combined data having
+            columns:
+                "fips": string
+                "date": datetime64[ns]
+                "cases": integer
+                "deaths": integer
+                "POPESTIMATE": integer
+        df_state: pd.DataFrame object with columns STATS_STATE_COLUMNS as
+            returned by "generate_stats_state" function
+
+        Returns:
+        -------
+        df: pd.DataFrame object indexed by ("fips", "date") with generated
+            statistics for new records only, having the same columns as
+            "generate_stats" function
+        """
+        df = self.select_new_records(df, df_state)
+        return self.extend_stats_from_state(df, df_state)
+
+    def sanity_check_prepared_data(self, df_prepared: pd.DataFrame,
+                                   expected_fips: np.ndarray = None) \
+            -> SanityCheckReport:
         """
         Function to test the prepared dataframe
 
+        Explanation:
+            All the checks are vectorized and do not copy the prepared
+            dataframe. The monotonic check compares every record with the
+            previous record of the same fips code, the records are only
+            reordered (with a stable sort on fips code) if the records of a
+            fips code are not contiguous, for example in incremental output
+
+        Parameters:
+        ----------
+        df_prepared: pd.DataFrame object indexed by ("fips", "date") with
+            generated statistics as returned by "generate_stats" function
+        expected_fips: np.ndarray object with the fips codes expected in
+            df_prepared, optional, by default the fips codes of the
+            original data. An incremental run only generates the records
+            of the fips codes with new records
+
+        Returns:
+        -------
+        report: SanityCheckReport object with the result of the checks
         """
         print("Applying Sanity check on the output dataframe::")
         # 1. Check all the expected columns are available in the dataframe
         desired_columns = ["fips", "date", "population", "daily_cases",
                            "daily_deaths", "cumulative_cases_to_date",
                            "cumulative_deaths_to_date"]
-        df_prepared = df_prepared.reset_index()
+        columns = {c: df_prepared[c] for c in df_prepared.columns}
+        for level in df_prepared.index.names:
+            if level is not None:
+                columns[level] = df_prepared.index.get_level_values(level)
         for c in desired_columns:
-            if c not in df_prepared.columns:
+            if c not in columns:
                 raise Exception(
                     f"Desired Column{c} is not present in processed dataframe")
+        null_counts = {c: int(pd.isna(columns[c]).sum())
+                       for c in desired_columns}
+        fips_codes, fips_uniques = pd.factorize(columns["fips"])
 
         # 2. Check if all the fips available in final dataframe as compare to original data.
-        fips_in_original_data = self.df.fips.dropna().unique()
-        print("Missing fips code as compare to original dataset",
-              set(fips_in_original_data)-set(df_prepared.fips.unique()))
+        missing_fips = None
+        if expected_fips is None and self.df is not None:
+            expected_fips = self.df["fips"].dropna().unique()
+        if expected_fips is not None:
+            fips_in_original_data = expected_fips
+            if self.compact:
+                fips_in_original_data = self.decode_fips(fips_in_original_data)
+            missing_fips = sorted(set(fips_in_original_data)
+                                  - set(fips_uniques))
         # 3. Check for all the fips value the data is available except for the counties for which population
         #    data is missing, (69110', '69120', '78010', '78020', '78030')
-        print("fips code related to null value of population",
-              df_prepared[df_prepared.population.isna()].fips.unique())
-        print("fips code related to null value of daily_cases",
-              df_prepared[df_prepared.daily_cases.isna()].fips.unique())
-        print("fips code related to null value of daily_deaths",
-              df_prepared[df_prepared.daily_deaths.isna()].fips.unique())
+        fips_with_null_values = {}
+        for c in ["population", "daily_cases", "daily_deaths"]:
+            is_null = pd.isna(columns[c])
+            if hasattr(is_null, "values"):
+                is_null = is_null.values
+            fips_with_null_values[c] = sorted(
+                fips_uniques[np.unique(fips_codes[is_null])])
         # 4. Check for all "fips" value the date column should be increasing order with the cumulative
         #    values(cumulative_cases_to_date, cumulative_deaths_to_date) are also in non-decreasing order
-        df_fips_status = df_prepared.groupby("fips")\
-            .apply(lambda df_tmp: (df_tmp.date.is_monotonic
-                                   and df_tmp.cumulative_cases_to_date.is_monotonic
-                                   and df_tmp.cumulative_deaths_to_date.is_monotonic))
-        print("fips values for which columns:['date','cumulative_cases_to_date','cumulative_deaths_to_date'] is not monotonic",
-              df_fips_status[df_fips_status == False].index)
+        monotonic_columns = [np.asarray(columns[c]) for c in
+                             ["date", "cumulative_cases_to_date",
+                              "cumulative_deaths_to_date"]]
+        # -> Records of a fips code must be contiguous to compare every
+        # record with the previous one, factorized codes increase with the
+        # first appearance of every fips code
+        if len(fips_codes) > 1 and (np.diff(fips_codes) < 0).any():
+            order = np.argsort(fips_codes, kind="mergesort")
+            fips_codes = fips_codes[order]
+            monotonic_columns = [values[order] for values in monotonic_columns]
+        is_same_fips = fips_codes[1:] == fips_codes[:-1]
+        is_decreasing = np.zeros(len(is_same_fips), dtype=bool)
+        for values in monotonic_columns:
+            is_decreasing |= values[1:] < values[:-1]
+        non_monotonic_fips = sorted(fips_uniques[np.unique(
+            fips_codes[1:][is_same_fips & is_decreasing])])
+        report = SanityCheckReport(len(df_prepared), null_counts,
+                                   missing_fips, fips_with_null_values,
+                                   non_monotonic_fips)
+        print(report)
+        return report
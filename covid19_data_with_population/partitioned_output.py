@@ -0,0 +1,278 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from .dataset import DataSet, OUTPUT_FORMAT_EXTENSIONS
+from .exceptions import InputError
+
+# Name of the manifest file in the partitioned output directory
+PARTITION_MANIFEST_FILE_NAME = "manifest.json"
+
+
+class PartitionedOutput(DataSet):
+    """
+    This class is to save the generated statistics as a directory of
+    partitions by state and month, and to read them back selectively
+
+    Explanation:
+        Records are saved in <output_dir>/state=XX/month=YYYY-MM/part<ext>
+        where XX is the first two digits of the fips code and the format is
+        one of OUTPUT_FORMAT_EXTENSIONS. The manifest <output_dir>/
+        manifest.json has the number of records and the min/max date of
+        every partition, so readers can select partitions without listing
+        or opening the files. "update" function only rewrites the
+        partitions having new records, which is used by incremental runs
+
+    Attributes:
+        output_dir: str, path of the partitioned output directory
+        output_format: str, one of OUTPUT_FORMAT_EXTENSIONS keys
+    """
+
+    def __init__(self, output_dir: str, output_format: str = None):
+        """
+        The constructor for PartitionedOutput class
+
+        Parameters:
+        ----------
+        output_dir: str, path of the partitioned output directory
+        output_format: str, optional, one of OUTPUT_FORMAT_EXTENSIONS keys,
+            format of the existing manifest, or "csv" for a new directory,
+            if not provided
+        """
+        self.output_dir = output_dir
+        self.manifest_path = os.path.join(output_dir,
+                                          PARTITION_MANIFEST_FILE_NAME)
+        manifest = self.read_manifest()
+        if output_format is None:
+            output_format = manifest.get("output_format", "csv")
+        if output_format not in OUTPUT_FORMAT_EXTENSIONS:
+            raise InputError(output_format,
+                             f"Output format {output_format} is not one of "
+                             f"{list(OUTPUT_FORMAT_EXTENSIONS)}")
+        self.output_format = output_format
+
+    def read_manifest(self) -> dict:
+        """
+        Function to read the manifest of the partitioned output directory
+
+        Returns:
+        -------
+        manifest: dict with "output_format" and "partitions", a dict of
+            partition name ("state=XX/month=YYYY-MM") to dict with "path",
+            "state", "month", "number_of_records", "min_date" and
+            "max_date", empty dict if there is no manifest
+        """
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def write_manifest(self, partitions: dict):
+        """
+        Function to write the manifest of the partitioned output directory
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        manifest = {"output_format": self.output_format,
+                    "partitions": dict(sorted(partitions.items()))}
+        with open(f"{self.manifest_path}.tmp", "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(f"{self.manifest_path}.tmp", self.manifest_path)
+
+    def split_partitions(self, df: pd.DataFrame):
+        """
+        Function to split the statistics by state and month
+
+        Explanation: The partition key is computed on integers, as
+        integer fips code // 1000 and month number of the date, and the
+        records are split with one stable sort on the key
+
+        Parameters:
+        ----------
+        df: pd.DataFrame object indexed by ("fips", "date") with decoded
+            string fips code and datetime64[ns] date
+
+        Yields:
+        ------
+        name: str, partition name "state=XX/month=YYYY-MM"
+        df: pd.DataFrame object with the records of the partition
+        """
+        if len(df) == 0:
+            return
+        states = self.fips_to_int(
+            pd.Series(df.index.get_level_values("fips"))) // 1000
+        months = df.index.get_level_values("date").values\
+            .astype("datetime64[M]")
+        keys = states.astype("int64") * 100000 + months.astype("int64")
+        order = np.argsort(keys, kind="mergesort")
+        keys = keys[order]
+        is_first = np.ones(len(keys), dtype=bool)
+        is_first[1:] = keys[1:] != keys[:-1]
+        starts = np.flatnonzero(is_first)
+        ends = np.append(starts[1:], len(keys))
+        for start, end in zip(starts, ends):
+            i = order[start]
+            name = f"state={states[i]:02d}/month={str(months[i])}"
+            yield name, df.iloc[order[start:end]]
+
+    def save_partition(self, name: str, df: pd.DataFrame) -> dict:
+        """
+        Function to save the records of a partition, the file is written
+        to a temporary path and renamed so readers never see a partial file
+
+        Parameters:
+        ----------
+        name: str, partition name "state=XX/month=YYYY-MM"
+        df: pd.DataFrame object indexed by ("fips", "date")
+
+        Returns:
+        -------
+        entry: dict, manifest entry of the partition
+        """
+        extension = OUTPUT_FORMAT_EXTENSIONS[self.output_format]
+        path = os.path.join(name, f"part{extension}")
+        file_path = os.path.join(self.output_dir, path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        if not df.index.is_monotonic_increasing:
+            df = df.sort_index()
+        self.save_dataframe(df, file_path, self.output_format)
+        dates = df.index.get_level_values("date")
+        state, month = [part.split("=")[1] for part in name.split("/")]
+        return {"path": path,
+                "state": state,
+                "month": month,
+                "number_of_records": len(df),
+                "min_date": str(dates.min().date()),
+                "max_date": str(dates.max().date())}
+
+    def read_partition(self, entry: dict) -> pd.DataFrame:
+        """
+        Function to read the records of a partition
+
+        Returns:
+        -------
+        df: pd.DataFrame object indexed by ("fips", "date")
+        """
+        df = self.read_saved_dataframe(
+            os.path.join(self.output_dir, entry["path"]), self.output_format)
+        return df.set_index(["fips", "date"])
+
+    def write(self, df: pd.DataFrame):
+        """
+        Function to save all the statistics, the partitions of a previous
+        output which are not in df are removed
+
+        Parameters:
+        ----------
+        df: pd.DataFrame object indexed by ("fips", "date") with decoded
+            string fips code and datetime64[ns] date
+        """
+        old_partitions = self.read_manifest().get("partitions", {})
+        partitions = {}
+        for name, df_partition in self.split_partitions(df):
+            partitions[name] = self.save_partition(name, df_partition)
+        self.write_manifest(partitions)
+        for name, entry in old_partitions.items():
+            if name not in partitions:
+                shutil.rmtree(os.path.join(self.output_dir, name),
+                              ignore_errors=True)
+            elif entry["path"] != partitions[name]["path"]:
+                # -> Partition saved in another format by a previous output
+                os.remove(os.path.join(self.output_dir, entry["path"]))
+
+    def update(self, df: pd.DataFrame) -> list:
+        """
+        Function to add new statistics, only the partitions having new
+        records are read, merged and rewritten. Records of an existing
+        ("fips", "date") are replaced by the new records. The existing
+        partitions must have been saved in output_format
+
+        Parameters:
+        ----------
+        df: pd.DataFrame object indexed by ("fips", "date") with decoded
+            string fips code and datetime64[ns] date
+
+        Returns:
+        -------
+        names: list of str, names of the rewritten partitions
+        """
+        manifest = self.read_manifest()
+        existing_format = manifest.get("output_format", self.output_format)
+        if existing_format != self.output_format:
+            raise InputError(self.output_format,
+                             f"Partitioned output {self.output_dir} is saved "
+                             f"as {existing_format}, it can not be updated "
+                             f"as {self.output_format}")
+        partitions = manifest.get("partitions", {})
+        names = []
+        for name, df_partition in self.split_partitions(df):
+            if name in partitions:
+                df_partition = pd.concat(
+                    [self.read_partition(partitions[name]), df_partition])
+                df_partition = df_partition[
+                    ~df_partition.index.duplicated(keep="last")]
+            partitions[name] = self.save_partition(name, df_partition)
+            names.append(name)
+        self.write_manifest(partitions)
+        return names
+
+    def select_partitions(self, states: list = None, start_date: str = None,
+                          end_date: str = None) -> list:
+        """
+        Function to select the partitions having records of given states
+        between two dates, using only the manifest
+
+        Parameters:
+        ----------
+        states: list of str, optional, 2 digit state codes
+        start_date: str, optional, first date (included) as YYYY-MM-DD
+        end_date: str, optional, last date (included) as YYYY-MM-DD
+
+        Returns:
+        -------
+        entries: list of dict, manifest entries of the selected partitions
+        """
+        entries = []
+        for entry in self.read_manifest().get("partitions", {}).values():
+            if states is not None and entry["state"] not in states:
+                continue
+            if start_date is not None and entry["max_date"] < start_date:
+                continue
+            if end_date is not None and entry["min_date"] > end_date:
+                continue
+            entries.append(entry)
+        return entries
+
+    def read(self, states: list = None, start_date: str = None,
+             end_date: str = None) -> pd.DataFrame:
+        """
+        Function to read the statistics of given states between two dates,
+        only the selected partitions are read
+
+        Parameters:
+        ----------
+        states: list of str, optional, 2 digit state codes
+        start_date: str, optional, first date (included) as YYYY-MM-DD
+        end_date: str, optional, last date (included) as YYYY-MM-DD
+
+        Returns:
+        -------
+        df: pd.DataFrame object indexed by ("fips", "date") sorted by
+            ("fips", "date")
+        """
+        entries = self.select_partitions(states, start_date, end_date)
+        if not entries:
+            return pd.DataFrame(
+                index=pd.MultiIndex.from_arrays(
+                    [pd.Index([], dtype=object),
+                     pd.DatetimeIndex([])], names=["fips", "date"]))
+        df = pd.concat([self.read_partition(entry) for entry in entries])
+        dates = df.index.get_level_values("date")
+        is_selected = np.ones(len(df), dtype=bool)
+        if start_date is not None:
+            is_selected &= dates >= pd.Timestamp(start_date)
+        if end_date is not None:
+            is_selected &= dates <= pd.Timestamp(end_date)
+        return df[is_selected].sort_index()
@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+
+from .download_cache import DownloadCache
+from .exceptions import InputError
+from .newyork_times_covid19_data import NewYorkTimesCovid19Data
+from .population_estimate_data_2019 import PopulationEstimateData2019
+
+
+def get_dataset(dataset_class, source, compact: bool, csv_engine: str,
+                download_cache: DownloadCache):
+    """
+    Function to create a dataset object from any supported source
+
+    Parameters:
+    ----------
+    dataset_class: NewYorkTimesCovid19Data or PopulationEstimateData2019
+    source: dataset_class object (returned as it is), pd.DataFrame object,
+        pyarrow.Table object, str path/url or file-like object of the csv
+        file
+    compact: bool, True: use compact representation
+    csv_engine: str, one of CSV_PARSER_ENGINES of DataSet class
+    download_cache: DownloadCache object, optional
+
+    Returns:
+    -------
+    dataset: dataset_class object
+    is_owned: bool, True if the object is created by this function, so its
+        records can be released once they are preprocessed
+    """
+    if isinstance(source, dataset_class):
+        return source, False
+    if isinstance(source, pd.DataFrame):
+        return dataset_class.from_dataframe(source, compact), True
+    if isinstance(source, str) or hasattr(source, "read"):
+        return dataset_class(source, compact=compact,
+                             download_cache=download_cache,
+                             csv_engine=csv_engine), True
+    return dataset_class.from_arrow(source, compact), True
+
+
+def run_pipeline(covid19_data, population_data, compact: bool = False,
+                 stats_engine: str = "vectorized", workers: int = 1,
+                 csv_engine: str = "c",
+                 download_cache: DownloadCache = None) -> pd.DataFrame:
+    """
+    Function to generate the statistics of New York Times COVID-19 Data
+    with Population Estimate Data 2019 in the current process, without
+    reading or writing intermediate files
+
+    Explanation:
+        The steps are the steps of the command line pipeline, with the
+        following copy contract:
+            from_dataframe / from_arrow: only the schema columns are used,
+                columns already having the schema type are shared with the
+                input (pyarrow columns are converted once, each to its own
+                array), other columns are converted
+            preprocess: the input records are not modified, "fips" and
+                "deaths" are copied only if geographic exceptions update
+                them, the records are copied once if records with missing
+                values are dropped, "cases"/"deaths" are converted to
+                integer
+            combine_with_population_lookup: the columns are shared with
+                the preprocessed records, only the population column is
+                allocated
+            generate_stats (vectorized): the combined records are neither
+                sorted nor copied, only the output columns in
+                ("fips", "date") order are allocated
+        Sharing columns without copy requires pandas >= 1.3, older
+        versions copy the columns when building a dataframe. The records
+        read by this function from a path or stream are released once
+        they are preprocessed, and every intermediate dataframe is released
+        as soon as the next step is done, so the peak memory is about the
+        input records plus the output statistics, see
+        benchmarks/library_api.py
+
+    Parameters:
+    ----------
+    covid19_data: New York Times COVID-19 Data as NewYorkTimesCovid19Data
+        object, pd.DataFrame object, pyarrow.Table object, str path/url or
+        file-like object of the csv file
+    population_data: Population Estimate Data 2019 as
+        PopulationEstimateData2019 object, pd.DataFrame object,
+        pyarrow.Table object, str path/url or file-like object of the csv
+        file, or a non-empty list of them for several vintage files, or
+        np.ndarray population lookup generated by
+        "generate_population_lookup" function
+    compact: bool, True: use compact representation, ignored for dataset
+        objects which have their own representation
+    stats_engine: str, one of STATS_ENGINES
+    workers: int, number of worker processes generating the statistics
+    csv_engine: str, one of CSV_PARSER_ENGINES, parser engine of csv files
+    download_cache: DownloadCache object, optional, cache of remote files
+
+    Returns:
+    -------
+    df: pd.DataFrame object indexed by ("fips", "date") with 5 digit
+        string fips code and datetime64[ns] date having the columns of
+        "generate_stats" function of NewYorkTimesCovid19Data class
+    """
+    newyork_times_covid19_data, is_owned = get_dataset(
+        NewYorkTimesCovid19Data, covid19_data, compact, csv_engine,
+        download_cache)
+    if isinstance(population_data, np.ndarray):
+        population_lookup = population_data
+    else:
+        if not isinstance(population_data, list):
+            population_data = [population_data]
+        if not population_data:
+            raise InputError(population_data,
+                             "At least one Population Estimate Data source "
+                             "is required")
+        population_tables = []
+        for source in population_data:
+            population_estimate_data_2019, _ = get_dataset(
+                PopulationEstimateData2019, source,
+                newyork_times_covid19_data.compact, csv_engine,
+                download_cache)
+            population_tables.append(
+                population_estimate_data_2019.generate_population_table(
+                    population_estimate_data_2019.preprocess(
+                        population_estimate_data_2019.df)))
+        population_lookup = \
+            PopulationEstimateData2019.generate_population_table_lookup(
+                PopulationEstimateData2019.combine_population_tables(
+                    population_tables))
+        del population_estimate_data_2019, population_tables
+    df = newyork_times_covid19_data.preprocess(newyork_times_covid19_data.df)
+    if is_owned:
+        newyork_times_covid19_data.df = None
+    df = newyork_times_covid19_data.combine_with_population_lookup(
+        df, population_lookup)
+    if workers > 1:
+        df = newyork_times_covid19_data.generate_stats_in_parallel(
+            df, stats_engine, workers)
+    else:
+        df = newyork_times_covid19_data.generate_stats(df, stats_engine)
+    return newyork_times_covid19_data.decode_compact_stats(df)
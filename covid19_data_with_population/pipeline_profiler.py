@@ -0,0 +1,167 @@
+import contextlib
+import cProfile
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+
+# Peak traced memory of the stages being recorded with tracemalloc, from
+# the outermost stage to the innermost one. tracemalloc traces the whole
+# process, so this stack is shared by all the profilers of the process
+TRACED_STAGE_PEAKS = []
+
+# Number of stages being recorded with cProfile in the process, only one
+# cProfile capture can be enabled at a time
+PROFILED_STAGES = []
+
+
+def get_peak_rss_bytes() -> int:
+    """
+    Function to get the peak resident set size of the current process
+
+    Returns:
+    -------
+    peak_rss: int, peak resident set size in bytes
+    """
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # -> ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+    if sys.platform == "darwin":
+        return peak_rss
+    return peak_rss * 1024
+
+
+class PipelineProfiler(object):
+    """
+    This class is to record timing and memory of every pipeline stage
+
+    Explanation:
+        For every stage the profiler records wall time, CPU time, peak
+        resident set size at the end of the stage and its increase during
+        the stage, and the number of records in and out of the stage.
+        Optionally it records the peak traced memory with tracemalloc and
+        a cProfile capture of the stage. Stages can be nested, also across
+        profilers (for example the stages of every batch entry within the
+        "run_batch" stage): tracemalloc is only started and stopped by the
+        outermost traced stage, and a nested stage saves the peak of its
+        outer stage before resetting the peak with tracemalloc.reset_peak,
+        so every stage gets its own peak (with Python < 3.9, which has no
+        tracemalloc.reset_peak, the peak of a nested stage includes the
+        peak of its outer stage before it). Only the outermost stage is
+        captured by cProfile, the nested stages are part of its capture
+
+    Attributes:
+        stages: list of dict, one record per completed stage
+        trace_memory: bool, True: record tracemalloc peak of every stage
+        cprofile_dir: str, optional, directory of cProfile captures
+    """
+
+    def __init__(self, trace_memory: bool = False, cprofile_dir: str = None):
+        """
+        The constructor for PipelineProfiler class
+
+        Parameters:
+        ----------
+        trace_memory: bool, True: record tracemalloc peak of every stage,
+            this slows down allocations
+        cprofile_dir: str, optional, if provided a cProfile capture of
+            every stage is saved as <cprofile_dir>/<stage>-<index>.prof,
+            index is the position of the stage in "stages"
+        """
+        self.stages = []
+        self.trace_memory = trace_memory
+        self.cprofile_dir = cprofile_dir
+        self.start_time = time.time()
+        if cprofile_dir is not None:
+            os.makedirs(cprofile_dir, exist_ok=True)
+
+    @contextlib.contextmanager
+    def stage(self, name: str, rows_in: int = None):
+        """
+        Function to record a pipeline stage executed in the with block
+
+        Parameters:
+        ----------
+        name: str, name of the stage
+        rows_in: int, optional, number of records in input of the stage
+
+        Yields:
+        ------
+        record: dict, record of the stage, "rows_out" can be set in the
+            with block
+        """
+        record = {"stage": name, "rows_in": rows_in, "rows_out": None}
+        is_tracing_started = False
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                is_tracing_started = True
+            elif TRACED_STAGE_PEAKS and hasattr(tracemalloc, "reset_peak"):
+                TRACED_STAGE_PEAKS[-1] = max(
+                    TRACED_STAGE_PEAKS[-1], tracemalloc.get_traced_memory()[1])
+                tracemalloc.reset_peak()
+            TRACED_STAGE_PEAKS.append(0)
+        profile = None
+        if self.cprofile_dir is not None and not PROFILED_STAGES:
+            profile = cProfile.Profile()
+            PROFILED_STAGES.append(name)
+        peak_rss_before = get_peak_rss_bytes()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield record
+        finally:
+            if profile is not None:
+                profile.disable()
+                PROFILED_STAGES.pop()
+            record["wall_seconds"] = time.perf_counter() - wall_start
+            record["cpu_seconds"] = time.process_time() - cpu_start
+            record["peak_rss_bytes"] = get_peak_rss_bytes()
+            record["peak_rss_increase_bytes"] = (record["peak_rss_bytes"]
+                                                 - peak_rss_before)
+            if self.trace_memory:
+                record["tracemalloc_peak_bytes"] = max(
+                    TRACED_STAGE_PEAKS.pop(),
+                    tracemalloc.get_traced_memory()[1])
+                if TRACED_STAGE_PEAKS:
+                    TRACED_STAGE_PEAKS[-1] = max(
+                        TRACED_STAGE_PEAKS[-1],
+                        record["tracemalloc_peak_bytes"])
+                if is_tracing_started:
+                    tracemalloc.stop()
+            if profile is not None:
+                # -> Stage names are repeated, for example one
+                # "ingest_population" stage per vintage file
+                record["cprofile_path"] = os.path.join(
+                    self.cprofile_dir, f"{name}-{len(self.stages)}.prof")
+                profile.dump_stats(record["cprofile_path"])
+            self.stages.append(record)
+
+    def report(self) -> dict:
+        """
+        Function to generate the run report
+
+        Returns:
+        -------
+        report: dict with run start time, total wall time, peak resident
+            set size and the list of stage records
+        """
+        return {"started_at": self.start_time,
+                "total_wall_seconds": sum(r["wall_seconds"]
+                                          for r in self.stages),
+                "peak_rss_bytes": get_peak_rss_bytes(),
+                "stages": self.stages}
+
+    def save_report(self, file_path: str):
+        """
+        Function to save the run report as json file
+
+        Parameters:
+        ----------
+        file_path: str, path of the json report
+        """
+        with open(file_path, "w") as f:
+            json.dump(self.report(), f, indent=2)
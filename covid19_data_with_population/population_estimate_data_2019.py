@@ -1,26 +1,60 @@
+import numpy as np
 import pandas as pd
 
-from .dataset import DataSet
+from .dataset import DataSet, FIPS_LOOKUP_FIRST_YEAR, \
+    FIPS_LOOKUP_SENTINEL, FIPS_LOOKUP_SIZE
+from .download_cache import DownloadCache
 from .exceptions import InputError
+from .geographic_exceptions import GEOGRAPHIC_EXCEPTIONS
 
-POPULATION_ESTIMATE_DATA_REQUIRED_COLUMNS = ["STATE", "COUNTY",
-                                             "POPESTIMATE2019"]
+POPULATION_ESTIMATE_DATA_REQUIRED_COLUMNS = ["STATE", "COUNTY"]
+
+# Years of the "POPESTIMATE<year>" columns parsed from a vintage file, a
+# vintage file has the columns of some of these years, for example
+# co-est2019-alldata.csv has 2010 to 2019 and co-est2023-alldata.csv has
+# 2020 to 2023
+POPULATION_ESTIMATE_YEARS = list(range(FIPS_LOOKUP_FIRST_YEAR, 2031))
+
+# Schema used to parse the csv file, see "read_csv_with_schema" function of
+# DataSet class, only these columns of the ~160 columns are parsed
+POPULATION_ESTIMATE_DATA_SCHEMA = {
+    "STATE": "string",
+    "COUNTY": "string",
+    **{f"POPESTIMATE{year}": "int64" for year in POPULATION_ESTIMATE_YEARS}}
+
+# Schema used to parse the csv file in compact representation
+POPULATION_ESTIMATE_DATA_COMPACT_DTYPES = {
+    "STATE": "int32",
+    "COUNTY": "int32",
+    **{f"POPESTIMATE{year}": "int32" for year in POPULATION_ESTIMATE_YEARS}}
 
 
 class PopulationEstimateData2019(DataSet):
     """
     This class is for processing Population Estimate Data 2019 
 
+    Explanation:
+        The population estimate of every year of the file is used, and
+        other vintage files (for example co-est2023-alldata.csv for 2020
+        to 2023) are read with the same class. Their long (fips, year)
+        population tables are combined by "combine_population_tables"
+        function, and every record of New York Times COVID-19 Data gets the
+        population estimate of the year of its date, or of the nearest
+        year with an estimate, see "generate_population_lookup" function
+
     Attributes:
         csv_file_path: str, path/url for Population Estimate Data 2019 
             For example default path used is:
             "https://www2.census.gov/programs-surveys/popest/datasets/
             2010-2019/counties/totals/co-est2019-alldata.csv"
             The csv file should have atleast following columns:
-            "STATE", "COUNTY","STNAME","CTYNAME","POPESTIMATE2019"
+            "STATE", "COUNTY","STNAME","CTYNAME" and "POPESTIMATE<year>"
+            columns
     """
 
-    def __init__(self, csv_file_path):
+    def __init__(self, csv_file_path, compact: bool = False,
+                 download_cache: DownloadCache = None,
+                 csv_engine: str = "c"):
         """
         The constructor for PopulationEstimateData2019 class
 
@@ -31,25 +65,125 @@ class PopulationEstimateData2019(DataSet):
             "https://www2.census.gov/programs-surveys/popest/datasets/
             2010-2019/counties/totals/co-est2019-alldata.csv"
             The csv file should have atleast following columns:
-            "STATE", "COUNTY","STNAME","CTYNAME","POPESTIMATE2019"
+            "STATE", "COUNTY","STNAME","CTYNAME" and at least one
+            "POPESTIMATE<year>" column of POPULATION_ESTIMATE_YEARS
+            It can also be a file-like object (stream) with the csv
+            content, or None if the records are set by "from_dataframe" or
+            "from_arrow" function
+        compact: bool, True: use compact representation, only the required
+            columns are parsed as int32 and "fips" is generated as int32
+        download_cache: DownloadCache object, optional, if provided remote
+            csv file is read from the local download cache
+        csv_engine: str, one of CSV_PARSER_ENGINES of DataSet class,
+            parser engine of the csv file
         """
-        # -> Using dtype as object to avoid data type format change due to
-        # auto inferring the data type
+        csv_file_path = self.get_local_file_path(csv_file_path,
+                                                 download_cache)
+        self.compact = compact
+        if csv_file_path is None:
+            self.df = None
+            return
         # -> Using encoding as "ISO-8859-1" because of source file is
         # present in "ISO-8859-1" encoding
-        self.df = pd.read_csv(csv_file_path,
-                              dtype=object,
-                              encoding="ISO-8859-1")
-        for c in POPULATION_ESTIMATE_DATA_REQUIRED_COLUMNS:
-            if c not in self.df.columns:
-                raise InputError(PopulationEstimateData2019(csv_file_path),
-                                 f"Column {c} of type string not found in source \
-                        dataset {csv_file_path}")
+        self.df = self.read_csv_with_schema(
+            csv_file_path, self.get_schema(),
+            POPULATION_ESTIMATE_DATA_REQUIRED_COLUMNS, encoding="ISO-8859-1",
+            engine=csv_engine)
+        self.get_population_columns(self.df)
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, compact: bool = False):
+        """
+        Function to create a PopulationEstimateData2019 object from
+        Population Estimate Data 2019 already loaded in memory
+
+        Explanation: Only the columns of the schema are used, the columns
+        already having the type of the schema are shared with df and not
+        copied, see "conform_to_schema" function of DataSet class. df is
+        not modified by this function or by "preprocess" function
+
+        Parameters:
+        ----------
+        df: pd.DataFrame object with at least "STATE" and "COUNTY" (str,
+            or integer in compact representation) and one
+            "POPESTIMATE<year>" column
+        compact: bool, True: use compact representation
+
+        Returns:
+        -------
+        population_estimate_data_2019: PopulationEstimateData2019 object
+        """
+        population_estimate_data_2019 = cls(None, compact)
+        population_estimate_data_2019.df = \
+            population_estimate_data_2019.conform_to_schema(
+                df, population_estimate_data_2019.get_schema(),
+                POPULATION_ESTIMATE_DATA_REQUIRED_COLUMNS)
+        population_estimate_data_2019.get_population_columns(
+            population_estimate_data_2019.df)
+        return population_estimate_data_2019
+
+    @classmethod
+    def from_arrow(cls, table, compact: bool = False):
+        """
+        Function to create a PopulationEstimateData2019 object from
+        Population Estimate Data 2019 in a pyarrow Table, see
+        "from_dataframe" function
+
+        Parameters:
+        ----------
+        table: pyarrow.Table object
+        compact: bool, True: use compact representation
+
+        Returns:
+        -------
+        population_estimate_data_2019: PopulationEstimateData2019 object
+        """
+        population_estimate_data_2019 = cls(None, compact)
+        population_estimate_data_2019.df = \
+            population_estimate_data_2019.arrow_table_to_dataframe(
+                table, population_estimate_data_2019.get_schema(),
+                POPULATION_ESTIMATE_DATA_REQUIRED_COLUMNS)
+        population_estimate_data_2019.get_population_columns(
+            population_estimate_data_2019.df)
+        return population_estimate_data_2019
+
+    def get_schema(self) -> dict:
+        """
+        Function to get the schema of the records,
+        POPULATION_ESTIMATE_DATA_SCHEMA or
+        POPULATION_ESTIMATE_DATA_COMPACT_DTYPES in compact representation
+        """
+        if self.compact:
+            return POPULATION_ESTIMATE_DATA_COMPACT_DTYPES
+        return POPULATION_ESTIMATE_DATA_SCHEMA
+
+    def get_population_columns(self, df: pd.DataFrame) -> list:
+        """
+        Function to get the "POPESTIMATE<year>" columns of the records
+
+        Parameters:
+        ----------
+        df: pd.DataFrame object having Population Estimate Data 2019
+
+        Returns:
+        -------
+        columns: list of str, population estimate columns in year order
+        """
+        columns = [f"POPESTIMATE{year}" for year in POPULATION_ESTIMATE_YEARS
+                   if f"POPESTIMATE{year}" in df.columns]
+        if not columns:
+            raise InputError(list(df.columns),
+                             f"No POPESTIMATE<year> column of years "
+                             f"{POPULATION_ESTIMATE_YEARS[0]} to "
+                             f"{POPULATION_ESTIMATE_YEARS[-1]} found in "
+                             f"Population Estimate Data")
+        return columns
 
     def generate_fips_code(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Function to create fips column by combining "STATE" and "COUNTY" 
-        columns
+        columns. In compact representation the fips code is generated as
+        integer STATE * 1000 + COUNTY
 
         Parameters:
         ----------
@@ -57,22 +191,25 @@ class PopulationEstimateData2019(DataSet):
             columns:
                 "STATE":string
                 "COUNTY":string
-                "POPESTIMATE2019":string
+                "POPESTIMATE<year>":integer
 
         Returns:
-        df: pd.DataFrame object having Population Estimate Data 2019 with 
-            an extra column having fips code
+        df: new pd.DataFrame object, df is not modified, having Population
+            Estimate Data 2019 with an extra column having fips code
                 "STATE":string
                 "COUNTY":string
-                "POPESTIMATE2019":string
+                "POPESTIMATE<year>":integer
                 "fips": string
         """
-        df["fips"] = df["STATE"].str.strip() + df["COUNTY"].str.strip()
-        return df
+        if self.compact:
+            return df.assign(fips=df["STATE"] * 1000 + df["COUNTY"])
+        return df.assign(fips=df["STATE"].str.strip()
+                         + df["COUNTY"].str.strip())
 
     def typecast_columns(self, df: pd.DataFrame) -> pd.DataFrame:
         """
-        Function to typecast columns for Population Estimate Data 2019
+        Function to typecast columns for Population Estimate Data 2019,
+        in compact representation "POPESTIMATE<year>" and "fips" are int32
 
         Parameters:
         ----------
@@ -80,7 +217,7 @@ class PopulationEstimateData2019(DataSet):
             columns:
                 "STATE":string
                 "COUNTY":string
-                "POPESTIMATE2019":string
+                "POPESTIMATE<year>":string
                 "fips":string
 
         Returns:
@@ -89,10 +226,14 @@ class PopulationEstimateData2019(DataSet):
             columns:
                 "STATE":string
                 "COUNTY":string
-                "POPESTIMATE2019":integer
+                "POPESTIMATE<year>":integer
                 "fips":string
         """
-        df = df.astype(dtype={"POPESTIMATE2019": "int"})
+        columns = self.get_population_columns(df)
+        if self.compact:
+            return df.astype(dtype={"fips": "int32",
+                                    **{c: "int32" for c in columns}})
+        df = df.astype(dtype={c: "int" for c in columns})
         return df
 
     def preprocess(self, df: pd.DataFrame) -> pd.DataFrame:
@@ -102,7 +243,8 @@ class PopulationEstimateData2019(DataSet):
         Explanation:
             generate fips code: combine "STATE" and "COUNTY" columns
                 to generate fips code
-            typecast POPESTIMATE2019: typecast "POPESTIMATE2019" as integer
+            typecast POPESTIMATE<year>: typecast "POPESTIMATE<year>" as
+                integer
 
         Parameters:
         ----------
@@ -110,7 +252,7 @@ class PopulationEstimateData2019(DataSet):
             columns:
                 "STATE":string
                 "COUNTY":string
-                "POPESTIMATE2019":string
+                "POPESTIMATE<year>":integer
 
         Returns:
         -------
@@ -118,9 +260,223 @@ class PopulationEstimateData2019(DataSet):
             columns:
                 "STATE":string
                 "COUNTY":string
-                "POPESTIMATE2019":integer
+                "POPESTIMATE<year>":integer
                 "fips":string
         """
         df = self.generate_fips_code(df)
         df = self.typecast_columns(df)
+        df = self.add_geographic_exceptions(df)
         return df
+
+    def add_geographic_exceptions(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Function to add the population of the synthetic fips codes of
+        GEOGRAPHIC_EXCEPTIONS, see "update_df_with_geographic_exceptions"
+        function of NewYorkTimesCovid19Data class
+
+        Explanation: The population of a synthetic fips code is the sum of
+        the population of its component fips codes, or its fixed
+        population if it has no component fips codes, for every
+        "POPESTIMATE<year>" column. No record is added when a component
+        fips code is missing, so the synthetic fips code gets NaN
+        population like other fips codes without population estimate
+        instead of the population of a part of its area
+
+        Parameters:
+        ----------
+        df: pd.DataFrame object having preprocessed Population Estimate
+            Data 2019 with columns:
+                "POPESTIMATE<year>":integer
+                "fips":string
+
+        Returns:
+        -------
+        df: pd.DataFrame object with an extra record for every synthetic
+            fips code of GEOGRAPHIC_EXCEPTIONS
+        """
+        columns = self.get_population_columns(df)
+        population = df.groupby("fips")[columns].sum()
+        if self.compact:
+            population.index = self.decode_fips(population.index)
+        records = []
+        for e in GEOGRAPHIC_EXCEPTIONS:
+            if e["component_fips"]:
+                if not pd.Index(e["component_fips"]).isin(
+                        population.index).all():
+                    continue
+                values = population.reindex(e["component_fips"]).sum()
+            else:
+                values = {c: e["population"] for c in columns}
+            records.append({"fips": e["fips"],
+                            **{c: values[c] for c in columns}})
+        df_exceptions = pd.DataFrame(records, columns=["fips"] + columns)
+        df_exceptions = df_exceptions.astype(
+            {c: df[c].dtype for c in ["fips"] + columns})
+        return pd.concat([df, df_exceptions], ignore_index=True, sort=False)
+
+    def generate_population_table(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Function to generate the long population table of preprocessed
+        Population Estimate Data, with one record per fips code and year
+
+        Parameters:
+        ----------
+        df: pd.DataFrame object having preprocessed Population Estimate
+            Data with columns:
+                "POPESTIMATE<year>":integer
+                "fips":string
+
+        Returns:
+        -------
+        df_table: pd.DataFrame object with columns:
+                "fips": string, or int32 in compact representation
+                "year": integer
+                "population": integer
+                "vintage": integer, last year of the file, see
+                    "combine_population_tables" function
+        """
+        columns = self.get_population_columns(df)
+        years = [int(c[len("POPESTIMATE"):]) for c in columns]
+        return pd.DataFrame(
+            {"fips": np.tile(df["fips"].values, len(columns)),
+             "year": np.repeat(years, len(df)),
+             "population": np.concatenate([df[c].values for c in columns]),
+             "vintage": max(years)})
+
+    @staticmethod
+    def combine_population_tables(tables: list) -> pd.DataFrame:
+        """
+        Function to combine the population tables of several vintage
+        files, a year estimated by several vintages gets the estimate of
+        the latest vintage, as later vintages revise the earlier years
+
+        Parameters:
+        ----------
+        tables: list of pd.DataFrame objects generated by
+            "generate_population_table" function
+
+        Returns:
+        -------
+        df_table: pd.DataFrame object with one record per fips code and
+            year, with the columns of "generate_population_table" function
+        """
+        df_table = pd.concat(tables, ignore_index=True)
+        df_table = df_table.sort_values("vintage", kind="mergesort")
+        return df_table.drop_duplicates(["fips", "year"], keep="last")
+
+    def generate_population_lookup(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Function to generate a dense population lookup array indexed by
+        year and integer fips code from preprocessed Population Estimate
+        Data 2019, see "generate_population_table_lookup" function
+
+        Parameters:
+        ----------
+        df: pd.DataFrame object having preprocessed Population Estimate
+            Data 2019 with columns:
+                "POPESTIMATE<year>":integer
+                "fips":string
+
+        Returns:
+        -------
+        lookup: np.ndarray object of shape (number of years,
+            FIPS_LOOKUP_SIZE)
+        """
+        return self.generate_population_table_lookup(
+            self.generate_population_table(df))
+
+    @classmethod
+    def generate_population_table_lookup(cls, df_table: pd.DataFrame) \
+            -> np.ndarray:
+        """
+        Function to generate a dense population lookup array indexed by
+        year and integer fips code from a long population table
+
+        Explanation: Row i of the lookup array has the population estimate
+        of year FIPS_LOOKUP_FIRST_YEAR + i of every fips code, up to the
+        last year of the table. A year without estimate for a fips code
+        gets the estimate of the nearest year with an estimate (the
+        earlier year if both are as near), and later years get the last
+        estimate when the lookup is used, so every record is joined to the
+        nearest available vintage. The lookup array replaces the join on
+        fips code and year by a single vectorized gather, see
+        "combine_with_population_lookup" function of
+        NewYorkTimesCovid19Data class. fips codes without population
+        estimate are set to FIPS_LOOKUP_SENTINEL
+
+        Parameters:
+        ----------
+        df_table: pd.DataFrame object generated by
+            "generate_population_table" or "combine_population_tables"
+            function
+
+        Returns:
+        -------
+        lookup: np.ndarray object of shape (number of years,
+            FIPS_LOOKUP_SIZE) with the data type of "population" column
+        """
+        df_table = df_table[df_table["year"] >= FIPS_LOOKUP_FIRST_YEAR]
+        rows = df_table["year"].values - FIPS_LOOKUP_FIRST_YEAR
+        number_of_years = int(rows.max()) + 1
+        lookup = np.full((number_of_years, FIPS_LOOKUP_SIZE),
+                         FIPS_LOOKUP_SENTINEL,
+                         dtype=df_table["population"].dtype)
+        lookup[rows, cls.fips_to_int(df_table["fips"])] = \
+            df_table["population"].values
+        # -> Row of the previous and of the next year with an estimate of
+        # every year, as running maximum/minimum of the rows having an
+        # estimate, only for the fips codes having an estimate
+        fips = np.flatnonzero((lookup != FIPS_LOOKUP_SENTINEL).any(axis=0))
+        fips_lookup = lookup[:, fips]
+        row_numbers = np.arange(number_of_years)[:, np.newaxis]
+        has_estimate = fips_lookup != FIPS_LOOKUP_SENTINEL
+        previous_rows = np.maximum.accumulate(
+            np.where(has_estimate, row_numbers, -1), axis=0)
+        next_rows = np.minimum.accumulate(
+            np.where(has_estimate, row_numbers, number_of_years)[::-1],
+            axis=0)[::-1]
+        use_next = ((previous_rows < 0)
+                    | ((next_rows < number_of_years)
+                       & (next_rows - row_numbers
+                          < row_numbers - previous_rows)))
+        nearest_rows = np.where(use_next, next_rows, previous_rows)
+        lookup[:, fips] = np.take_along_axis(fips_lookup, nearest_rows,
+                                             axis=0)
+        return lookup
+
+    def save_population_lookup(self, lookup: np.ndarray, file_path: str):
+        """
+        Function to save the population lookup array as .npy file, so it
+        can be reused across runs without parsing the Census csv file
+
+        Parameters:
+        ----------
+        lookup: np.ndarray object generated by "generate_population_lookup"
+        file_path: str, path of the .npy file
+        """
+        with open(file_path, "wb") as f:
+            np.save(f, lookup)
+
+    @staticmethod
+    def read_population_lookup(file_path: str) -> np.ndarray:
+        """
+        Function to read the population lookup array saved by
+        "save_population_lookup" function, it does not require the Census
+        csv file to be read
+
+        Parameters:
+        ----------
+        file_path: str, path of the .npy file
+
+        Returns:
+        -------
+        lookup: np.ndarray object of shape (FIPS_LOOKUP_SIZE,) or (number
+            of years, FIPS_LOOKUP_SIZE)
+        """
+        lookup = np.load(file_path)
+        if lookup.ndim not in [1, 2] or lookup.shape[-1] != FIPS_LOOKUP_SIZE:
+            raise InputError(file_path,
+                             f"Population lookup {file_path} should have "
+                             f"shape ({FIPS_LOOKUP_SIZE},) or (number of "
+                             f"years, {FIPS_LOOKUP_SIZE})")
+        return lookup
@@ -0,0 +1,347 @@
+import argparse
+import json
+import math
+import os
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from .binary_store import BINARY_STORE_EXTENSION, StatsBinaryStore
+from .dataset import DataSet
+from .exceptions import InputError
+
+# Columns of the prepared statistics returned by the query service
+STATS_COLUMNS = ["population", "daily_cases", "daily_deaths",
+                 "cumulative_cases_to_date", "cumulative_deaths_to_date"]
+
+
+class StatsIndex(object):
+    """
+    This class is an in memory index of the prepared statistics sorted by
+    ("fips", "date")
+
+    Explanation:
+        Records are stored as numpy column arrays sorted by fips code and
+        date. Every fips code has an offset range in these arrays, and the
+        dates of a fips code are searched with binary search, so point and
+        range queries do not scan the records
+
+    Attributes:
+        file_path: str, path of the prepared output file
+        loaded_at: float, time of loading of the file
+        number_of_records: int, number of records in the index
+    """
+
+    def __init__(self, file_path: str):
+        """
+        The constructor for StatsIndex class
+
+        Parameters:
+        ----------
+        file_path: str, path of the prepared output file in any format
+            supported by "save_dataframe" function of DataSet class, or of
+            a binary store file (BINARY_STORE_EXTENSION)
+        """
+        if file_path.endswith(BINARY_STORE_EXTENSION):
+            self.load_binary_store(file_path)
+        else:
+            self.load_saved_dataframe(file_path)
+        self.file_path = file_path
+        self.loaded_at = time.time()
+        self.number_of_records = len(self.dates)
+
+    def load_saved_dataframe(self, file_path: str):
+        """
+        Function to load the column arrays and the offsets of every fips
+        code from a file saved by "save_dataframe" function of DataSet class
+        """
+        df = DataSet().read_saved_dataframe(file_path)
+        for c in ["fips", "date"] + STATS_COLUMNS:
+            if c not in df.columns:
+                raise InputError(file_path,
+                                 f"Column {c} not found in prepared data "
+                                 f"{file_path}")
+        df = df.sort_values(by=["fips", "date"], kind="mergesort")
+        fips = df["fips"].values
+        self.dates = df["date"].values.astype("datetime64[D]")
+        self.columns = {c: df[c].values for c in STATS_COLUMNS}
+        # -> Offsets of every fips code in the sorted column arrays
+        is_first = np.ones(len(fips), dtype=bool)
+        is_first[1:] = fips[1:] != fips[:-1]
+        starts = np.flatnonzero(is_first)
+        ends = np.append(starts[1:], len(fips))
+        self.offsets = {f: (s, e) for f, s, e in zip(fips[starts], starts,
+                                                     ends)}
+
+    def load_binary_store(self, file_path: str):
+        """
+        Function to load the column arrays and the offsets of every fips
+        code from a binary store file, the arrays are views of the memory
+        mapped file and only the offsets of fips codes with records are
+        read from the offset table
+        """
+        store = StatsBinaryStore(file_path)
+        for c in STATS_COLUMNS:
+            if c not in store.columns:
+                raise InputError(file_path,
+                                 f"Column {c} not found in prepared data "
+                                 f"{file_path}")
+        self.dates = store.get_array("date")
+        self.columns = {c: store.get_array(c) for c in STATS_COLUMNS}
+        self.offsets = {f: store.get_fips_range(f)
+                        for f in store.get_fips_codes()}
+
+    def query(self, fips: str, start_date: str = None,
+              end_date: str = None) -> list:
+        """
+        Function to get the records of a fips code between two dates
+
+        Parameters:
+        ----------
+        fips: str, 5 digit fips code
+        start_date: str, optional, first date (included) as YYYY-MM-DD
+        end_date: str, optional, last date (included) as YYYY-MM-DD
+
+        Returns:
+        -------
+        records: list of dict with "fips", "date" and STATS_COLUMNS keys
+        """
+        if fips not in self.offsets:
+            return []
+        start, end = self.offsets[fips]
+        dates = self.dates[start:end]
+        if start_date is not None:
+            start += int(np.searchsorted(
+                dates, np.datetime64(start_date, "D"), side="left"))
+        if end_date is not None:
+            end = self.offsets[fips][0] + int(np.searchsorted(
+                dates, np.datetime64(end_date, "D"), side="right"))
+        records = []
+        for i in range(start, end):
+            record = {"fips": fips,
+                      "date": str(self.dates[i].astype("datetime64[D]"))}
+            for c in STATS_COLUMNS:
+                value = self.columns[c][i].item()
+                if isinstance(value, float) and math.isnan(value):
+                    value = None
+                record[c] = value
+            records.append(record)
+        return records
+
+
+class StatsQueryService(object):
+    """
+    This class serves queries over the prepared statistics and reloads
+    the index when the prepared output file changes
+
+    Explanation:
+        The current index is replaced by a new index only after the new
+        index is completely loaded. Requests keep a reference to the index
+        they started with, so in flight requests are not dropped during a
+        reload
+
+    Attributes:
+        file_path: str, path of the prepared output file
+        index: StatsIndex object, current index
+    """
+
+    def __init__(self, file_path: str):
+        """
+        The constructor for StatsQueryService class
+
+        Parameters:
+        ----------
+        file_path: str, path of the prepared output file
+        """
+        self.file_path = file_path
+        self.file_signature = self.get_file_signature()
+        self.index = StatsIndex(file_path)
+
+    def get_file_signature(self) -> tuple:
+        """
+        Function to get the modification time and size of the prepared
+        output file, None if the file does not exist
+        """
+        try:
+            stat = os.stat(self.file_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload_if_changed(self) -> bool:
+        """
+        Function to reload the index if the prepared output file changed
+
+        Explanation: Outputs are replaced atomically by the pipeline,
+        except the csv records appended by an incremental run. If the file
+        changes while it is loaded, or fails to load, the current index is
+        kept and the file is checked again at the next call
+
+        Returns:
+        -------
+        bool: True if the index is reloaded
+        """
+        file_signature = self.get_file_signature()
+        if file_signature is None or file_signature == self.file_signature:
+            return False
+        try:
+            index = StatsIndex(self.file_path)
+        except Exception as e:
+            print(f"Failed to reload prepared data: {e}")
+            return False
+        if self.get_file_signature() != file_signature:
+            print(f"Prepared data {self.file_path} changed while it was "
+                  f"loaded, reload is retried")
+            return False
+        self.index = index
+        self.file_signature = file_signature
+        print(f"Reloaded prepared data from {self.file_path}: "
+              f"{index.number_of_records} records")
+        return True
+
+    def watch(self, interval_seconds: float):
+        """
+        Function to check the prepared output file for changes every
+        interval_seconds, executed in a daemon thread
+        """
+        while True:
+            time.sleep(interval_seconds)
+            self.reload_if_changed()
+
+    def query(self, fips_list: list, start_date: str = None,
+              end_date: str = None) -> dict:
+        """
+        Function to get the records of several fips codes between two dates
+
+        Parameters:
+        ----------
+        fips_list: list of str, 5 digit fips codes
+        start_date: str, optional, first date (included) as YYYY-MM-DD
+        end_date: str, optional, last date (included) as YYYY-MM-DD
+
+        Returns:
+        -------
+        response: dict with "records" and "loaded_at" of the index used
+        """
+        index = self.index
+        records = []
+        for fips in fips_list:
+            records.extend(index.query(fips, start_date, end_date))
+        return {"records": records, "loaded_at": index.loaded_at}
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    """
+    This class is a HTTP server handling every request in a thread
+    """
+    daemon_threads = True
+
+
+def create_request_handler(service: StatsQueryService):
+    """
+    Function to create the HTTP request handler class of the service
+
+    Explanation:
+        GET /stats?fips=01001,01003&date=2020-04-01 : point query
+        GET /stats?fips=01001&start=2020-04-01&end=2020-04-30 : range query
+        GET /health : number of records and loading time of the index
+
+    Parameters:
+    ----------
+    service: StatsQueryService object
+
+    Returns:
+    -------
+    handler: BaseHTTPRequestHandler subclass
+    """
+
+    class StatsRequestHandler(BaseHTTPRequestHandler):
+
+        def send_json(self, status: int, body: dict):
+            content = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            if url.path == "/health":
+                index = service.index
+                self.send_json(200, {"file_path": index.file_path,
+                                     "number_of_records":
+                                         index.number_of_records,
+                                     "loaded_at": index.loaded_at})
+                return
+            if url.path != "/stats" or "fips" not in params:
+                self.send_json(404, {"error": "use /stats?fips=<fips>"})
+                return
+            start_date = params.get("date", params.get("start"))
+            end_date = params.get("date", params.get("end"))
+            try:
+                response = service.query(params["fips"].split(","),
+                                         start_date, end_date)
+            except ValueError as e:
+                self.send_json(400, {"error": str(e)})
+                return
+            self.send_json(200, response)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StatsRequestHandler
+
+
+def main(argv: list = None):
+    """
+    Function to serve queries over the prepared statistics file
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m covid19_data_with_population serve",
+        description="Serve point, range and multi fips queries over the "
+                    "prepared Covid19 data with population")
+
+    parser.add_argument('--output_file_path',
+                        type=str,
+                        default="./aggregated_covid19_data_with_population.csv",
+                        help="Path of prepared output file to serve")
+
+    parser.add_argument('--host',
+                        type=str,
+                        default="0.0.0.0",
+                        help="Host of the HTTP server")
+
+    parser.add_argument('--port',
+                        type=int,
+                        default=8080,
+                        help="Port of the HTTP server")
+
+    parser.add_argument('--reload_interval_seconds',
+                        type=float,
+                        default=10.0,
+                        help="Interval of checking the prepared output file "
+                             "for changes")
+
+    args = parser.parse_args(argv)
+    service = StatsQueryService(args.output_file_path)
+    print(f"Loaded prepared data from {args.output_file_path}: "
+          f"{service.index.number_of_records} records")
+    watcher = threading.Thread(target=service.watch,
+                               args=(args.reload_interval_seconds,),
+                               daemon=True)
+    watcher.start()
+    server = ThreadingHTTPServer((args.host, args.port),
+                                 create_request_handler(service))
+    print(f"Serving on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,66 @@
+class SanityCheckReport(object):
+    """
+    This class is the result of sanity check on the prepared dataframe
+
+    Attributes:
+        number_of_records: int, number of records in prepared dataframe
+        null_counts: dict, number of null values of every column
+        missing_fips: list of str, fips codes of original data missing in
+            prepared dataframe, None if original data is not available
+        fips_with_null_values: dict, for "population", "daily_cases" and
+            "daily_deaths", list of fips codes having null values
+        non_monotonic_fips: list of str, fips codes for which "date",
+            "cumulative_cases_to_date" or "cumulative_deaths_to_date" is
+            not in non-decreasing order
+    """
+
+    def __init__(self, number_of_records: int, null_counts: dict,
+                 missing_fips: list, fips_with_null_values: dict,
+                 non_monotonic_fips: list):
+        """
+        The constructor for SanityCheckReport class
+        """
+        self.number_of_records = number_of_records
+        self.null_counts = null_counts
+        self.missing_fips = missing_fips
+        self.fips_with_null_values = fips_with_null_values
+        self.non_monotonic_fips = non_monotonic_fips
+
+    def is_valid(self) -> bool:
+        """
+        Function to check if the prepared dataframe passed the checks,
+        null population values are expected for fips codes missing in
+        Population Estimate Data 2019 and are not considered as failure
+
+        Returns:
+        -------
+        bool: True if no fips code is missing, there are no null daily
+            values and all the fips codes are monotonic
+        """
+        return (not self.missing_fips
+                and not self.fips_with_null_values["daily_cases"]
+                and not self.fips_with_null_values["daily_deaths"]
+                and not self.non_monotonic_fips)
+
+    def to_dict(self) -> dict:
+        """
+        Function to convert the report to a json serializable dict
+        """
+        return {"number_of_records": self.number_of_records,
+                "null_counts": self.null_counts,
+                "missing_fips": self.missing_fips,
+                "fips_with_null_values": self.fips_with_null_values,
+                "non_monotonic_fips": self.non_monotonic_fips,
+                "is_valid": self.is_valid()}
+
+    def __str__(self) -> str:
+        return "\n".join([
+            f"Number of records: {self.number_of_records}",
+            f"Null values per column: {self.null_counts}",
+            f"Missing fips code as compare to original dataset "
+            f"{self.missing_fips}"]
+            + [f"fips code related to null value of {c} {fips}"
+               for c, fips in self.fips_with_null_values.items()]
+            + ["fips values for which columns:['date',"
+               "'cumulative_cases_to_date','cumulative_deaths_to_date'] is "
+               f"not monotonic {self.non_monotonic_fips}"])
@@ -0,0 +1,204 @@
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from .dataset import DataSet, FIPS_LOOKUP_FIRST_YEAR, FIPS_LOOKUP_SENTINEL
+
+# Pipeline backends selectable with --engine
+# -> "pandas": in memory dataframes
+# -> "sqlite": out of core, joins and cumulative sums in an on-disk SQLite
+# database, see SqliteBackend class
+PIPELINE_ENGINES = ["pandas", "sqlite"]
+
+# Size of the SQLite page cache in KB, the memory used by SQLite is bounded
+# by this cache and temporary b-trees are written to disk
+SQLITE_CACHE_SIZE_KB = 64 * 1024
+
+# Number of records per chunk loaded in SQLite when no chunksize is given
+SQLITE_LOAD_CHUNKSIZE = 100000
+
+# Number of records fetched from SQLite per output batch
+SQLITE_FETCH_SIZE = 100000
+
+# Generated statistics in fips code and date order, same definitions as
+# "generate_stats_for_each_fips_code" function of NewYorkTimesCovid19Data
+# class. rowid keeps the input order of records of the same date
+SQLITE_STATS_QUERY = """
+    SELECT c.fips, c.day,
+           p.population - SUM(c.deaths) OVER w,
+           c.cases, c.deaths,
+           SUM(c.cases) OVER w, SUM(c.deaths) OVER w
+    FROM covid19 AS c
+         LEFT JOIN population AS p ON p.fips = c.fips AND p.year = c.year
+    WINDOW w AS (PARTITION BY c.fips ORDER BY c.day, c.rowid
+                 ROWS UNBOUNDED PRECEDING)
+    ORDER BY c.fips, c.day, c.rowid
+"""
+
+
+class SqliteBackend(DataSet):
+    """
+    This class is an out of core backend of the pipeline, it generates the
+    same statistics as "generate_stats" function of NewYorkTimesCovid19Data
+    class without holding the records in memory
+
+    Explanation:
+        Preprocessed New York Times COVID-19 Data chunks and the population
+        lookup are bulk loaded in a SQLite database file, with integer fips
+        codes and day offsets, and with the year of the population lookup
+        row of every record. The fips and year join and the cumulative sums are
+        computed by SQLite with window functions over an index on
+        ("fips", "day"), and the statistics are streamed out in batches in
+        fips code and date order. SQLite window functions require SQLite
+        3.25 or later
+
+    Attributes:
+        database_path: str, path of the SQLite database file
+        connection: sqlite3.Connection object
+        number_of_population_years: int, number of years of the loaded
+            population lookup
+    """
+
+    def __init__(self, database_path: str):
+        """
+        The constructor for SqliteBackend class
+
+        Parameters:
+        ----------
+        database_path: str, path of the SQLite database file, an existing
+            file is replaced
+        """
+        self.database_path = database_path
+        self.number_of_population_years = 1
+        if os.path.exists(database_path):
+            os.remove(database_path)
+        self.connection = sqlite3.connect(database_path)
+        self.connection.execute(
+            f"PRAGMA cache_size = -{SQLITE_CACHE_SIZE_KB}")
+        self.connection.execute("PRAGMA temp_store = FILE")
+        # -> The database is a scratch file rebuilt on every run, so there
+        # is no need for a journal or for syncing to disk
+        self.connection.execute("PRAGMA journal_mode = OFF")
+        self.connection.execute("PRAGMA synchronous = OFF")
+        self.connection.execute("CREATE TABLE population "
+                                "(fips INTEGER NOT NULL, "
+                                "year INTEGER NOT NULL, "
+                                "population INTEGER NOT NULL, "
+                                "PRIMARY KEY (fips, year))")
+        self.connection.execute("CREATE TABLE covid19 "
+                                "(fips INTEGER NOT NULL, "
+                                "day INTEGER NOT NULL, "
+                                "year INTEGER NOT NULL, "
+                                "cases INTEGER NOT NULL, "
+                                "deaths INTEGER NOT NULL)")
+
+    def load_population_lookup(self, population_lookup: np.ndarray):
+        """
+        Function to bulk load the population lookup array, it must be
+        loaded before the New York Times COVID-19 Data chunks
+
+        Parameters:
+        ----------
+        population_lookup: np.ndarray object generated by
+            "generate_population_lookup" function of
+            PopulationEstimateData2019 class, or a lookup indexed only by
+            integer fips code which is used for every year
+        """
+        population_lookup = np.atleast_2d(population_lookup)
+        self.number_of_population_years = len(population_lookup)
+        rows, fips = np.nonzero(population_lookup != FIPS_LOOKUP_SENTINEL)
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO population VALUES (?, ?, ?)",
+                zip(fips.tolist(), (rows + FIPS_LOOKUP_FIRST_YEAR).tolist(),
+                    population_lookup[rows, fips].tolist()))
+
+    def load_covid19_chunks(self, chunks) -> int:
+        """
+        Function to bulk load preprocessed New York Times COVID-19 Data
+        chunks, the ("fips", "day") index is created after loading
+
+        Parameters:
+        ----------
+        chunks: iterable of pd.DataFrame objects as yielded by
+            "read_preprocessed_chunks" function of NewYorkTimesCovid19Data
+            class, in default or compact representation
+
+        Returns:
+        -------
+        number_of_records: int, number of loaded records
+        """
+        number_of_records = 0
+        for df in chunks:
+            dates = df["date"]
+            if not pd.api.types.is_integer_dtype(dates.dtype):
+                dates = self.encode_dates(dates)
+            # -> Year of the population lookup row of every record, dates
+            # out of the years of the lookup get the first or last year
+            years = np.broadcast_to(
+                self.get_lookup_rows(dates, self.number_of_population_years)
+                + FIPS_LOOKUP_FIRST_YEAR, len(df))
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT INTO covid19 VALUES (?, ?, ?, ?, ?)",
+                    zip(self.fips_to_int(df["fips"]).tolist(),
+                        dates.values.tolist(), years.tolist(),
+                        df["cases"].values.tolist(),
+                        df["deaths"].values.tolist()))
+            number_of_records += len(df)
+        with self.connection:
+            self.connection.execute(
+                "CREATE INDEX covid19_fips_day ON covid19 (fips, day)")
+        return number_of_records
+
+    def generate_stats(self):
+        """
+        Function to generate the statistics of the loaded records in
+        batches of SQLITE_FETCH_SIZE records
+
+        Explanation: As with the pandas engine, population is float if
+        any record has a fips code without population estimate, otherwise
+        integer
+
+        Yields:
+        ------
+        df: pd.DataFrame object indexed by ("fips", "date") with 5 digit
+            string fips code and datetime64[ns] date, having the same
+            columns as "generate_stats" function of NewYorkTimesCovid19Data
+            class
+        """
+        columns = ["population", "daily_cases", "daily_deaths",
+                   "cumulative_cases_to_date", "cumulative_deaths_to_date"]
+        has_missing_population = self.connection.execute(
+            "SELECT EXISTS (SELECT 1 FROM covid19 AS c "
+            "LEFT JOIN population AS p "
+            "ON p.fips = c.fips AND p.year = c.year "
+            "WHERE p.population IS NULL)").fetchone()[0]
+        cursor = self.connection.execute(SQLITE_STATS_QUERY)
+        while True:
+            rows = cursor.fetchmany(SQLITE_FETCH_SIZE)
+            if not rows:
+                break
+            df = pd.DataFrame.from_records(
+                rows, columns=["fips", "date"] + columns)
+            if has_missing_population:
+                df["population"] = df["population"].astype(float)
+            df.index = pd.MultiIndex.from_arrays(
+                [self.decode_fips(df["fips"].values),
+                 self.decode_dates(df["date"].values)],
+                names=["fips", "date"])
+            yield df[columns]
+
+    def close(self, remove: bool = True):
+        """
+        Function to close the database connection
+
+        Parameters:
+        ----------
+        remove: bool, True: remove the database file
+        """
+        self.connection.close()
+        if remove and os.path.exists(self.database_path):
+            os.remove(self.database_path)
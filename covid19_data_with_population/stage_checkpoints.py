@@ -0,0 +1,259 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+from . import dataset, geographic_exceptions, newyork_times_covid19_data, \
+    population_estimate_data_2019
+from .download_cache import DOWNLOAD_BLOCK_SIZE, is_url
+
+# Stages of the pipeline with a checkpoint, in pipeline order, with the
+# stages they depend on. A forced stage also forces the stages depending on
+# it
+CHECKPOINT_STAGES = {"preprocess_population": [],
+                     "preprocess_covid19": [],
+                     "combine_with_population": ["preprocess_population",
+                                                 "preprocess_covid19"]}
+
+# Modules whose source code is part of the checkpoint keys, so checkpoints
+# are not reused after the code generating them changed
+CHECKPOINT_CODE_MODULES = [dataset, geographic_exceptions,
+                           newyork_times_covid19_data,
+                           population_estimate_data_2019]
+
+# Extension of the checkpoint files
+CHECKPOINT_EXTENSION = ".pkl"
+
+
+class StageCheckpointCache(object):
+    """
+    This class is a local cache of the intermediate results of the pipeline
+    stages
+
+    Explanation:
+        Every checkpoint is saved as <cache_dir>/<stage>-<key>.pkl where key
+        is the sha256 hash of the stage parameters, of the fingerprints of
+        the source files (resolved path, size and modification time) and
+        of the source code of CHECKPOINT_CODE_MODULES. The key of a stage
+        includes the keys of the stages it depends on, so a change of an
+        input or of a parameter only invalidates the stages downstream of
+        it. Results are pickled, which keeps the exact data types of the
+        dataframes (categorical, nullable integer) and is read at disk
+        speed. The modification time of a checkpoint is updated when it is
+        used, and the least recently used checkpoints are evicted when the
+        total size exceeds max_size_bytes
+
+    Attributes:
+        cache_dir: str, path of the checkpoint directory
+        max_size_bytes: int, optional, maximum total size of checkpoints
+        force_stages: set of str, stages recomputed even if a checkpoint
+            exists
+    """
+
+    def __init__(self, cache_dir: str, max_size_bytes: int = None,
+                 force_stages: list = None):
+        """
+        The constructor for StageCheckpointCache class
+
+        Parameters:
+        ----------
+        cache_dir: str, path of the checkpoint directory, created if missing
+        max_size_bytes: int, optional, maximum total size of checkpoints,
+            least recently used checkpoints are evicted first
+        force_stages: list of str, optional, CHECKPOINT_STAGES keys of the
+            stages to recompute, the stages depending on them are also
+            recomputed
+        """
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_bytes
+        self.force_stages = set(force_stages or [])
+        for stage in CHECKPOINT_STAGES:
+            if self.force_stages.intersection(CHECKPOINT_STAGES[stage]):
+                self.force_stages.add(stage)
+        os.makedirs(cache_dir, exist_ok=True)
+        self.evict()
+
+    @staticmethod
+    def fingerprint_file(file_path: str) -> dict:
+        """
+        Function to get the fingerprint of a local source file, None for
+        an url as its content is not known before downloading it
+
+        Returns:
+        -------
+        fingerprint: dict with "path", "size" and "mtime_ns", or None
+        """
+        if is_url(file_path):
+            return None
+        stat = os.stat(file_path)
+        return {"path": os.path.realpath(file_path),
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns}
+
+    @staticmethod
+    def fingerprint_code() -> str:
+        """
+        Function to get the sha256 hash of the source code of
+        CHECKPOINT_CODE_MODULES
+        """
+        sha256 = hashlib.sha256()
+        for module in CHECKPOINT_CODE_MODULES:
+            with open(module.__file__, "rb") as f:
+                for block in iter(lambda: f.read(DOWNLOAD_BLOCK_SIZE), b""):
+                    sha256.update(block)
+        return sha256.hexdigest()
+
+    def get_key(self, stage: str, parameters: dict) -> str:
+        """
+        Function to get the checkpoint key of a stage
+
+        Parameters:
+        ----------
+        stage: str, one of CHECKPOINT_STAGES keys
+        parameters: dict, json serializable parameters and input
+            fingerprints of the stage
+
+        Returns:
+        -------
+        key: str, sha256 hash, None if a parameter is None (the stage can
+            not be checkpointed)
+        """
+        if any(value is None for value in parameters.values()):
+            return None
+        content = json.dumps({"stage": stage, "parameters": parameters},
+                             sort_keys=True)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def get_stage_keys(self, covid19_csv_path: str,
+                       population_csv_path: str, compact: bool,
+                       population_vintage_csv_paths: list = None,
+                       population_lookup_path: str = None) -> dict:
+        """
+        Function to get the checkpoint keys of all CHECKPOINT_STAGES
+
+        Explanation: If the .npy population lookup file exists it is read
+        instead of the population csv files, so it is fingerprinted in the
+        key of "preprocess_population" (and of the stages using it)
+
+        Parameters:
+        ----------
+        covid19_csv_path: str, local path of New York Times COVID-19 Data
+        population_csv_path: str, local path of Population Estimate Data
+            2019
+        compact: bool, True: compact representation is used
+        population_vintage_csv_paths: list of str, optional, local paths of
+            other Population Estimate Data vintage files
+        population_lookup_path: str, optional, path of .npy population
+            lookup array
+
+        Returns:
+        -------
+        keys: dict, stage name to key
+        """
+        code = self.fingerprint_code()
+        vintage_fingerprints = [self.fingerprint_file(csv_path) for csv_path
+                                in population_vintage_csv_paths or []]
+        if None in vintage_fingerprints:
+            vintage_fingerprints = None
+        population_parameters = {
+            "population_csv": self.fingerprint_file(population_csv_path),
+            "population_vintage_csvs": vintage_fingerprints,
+            "compact": compact, "code": code}
+        if (population_lookup_path is not None
+                and os.path.exists(population_lookup_path)):
+            population_parameters["population_lookup"] = \
+                self.fingerprint_file(population_lookup_path)
+        keys = {"preprocess_population": self.get_key(
+                    "preprocess_population", population_parameters),
+                "preprocess_covid19": self.get_key(
+                    "preprocess_covid19",
+                    {"covid19_csv": self.fingerprint_file(covid19_csv_path),
+                     "compact": compact, "code": code})}
+        keys["combine_with_population"] = self.get_key(
+            "combine_with_population",
+            {stage: keys[stage]
+             for stage in CHECKPOINT_STAGES["combine_with_population"]})
+        return keys
+
+    def checkpoint_path(self, stage: str, key: str) -> str:
+        """
+        Function to get the path of the checkpoint of a stage for given key
+        """
+        return os.path.join(self.cache_dir,
+                            f"{stage}-{key}{CHECKPOINT_EXTENSION}")
+
+    def load(self, stage: str, key: str):
+        """
+        Function to load the checkpoint of a stage
+
+        Parameters:
+        ----------
+        stage: str, one of CHECKPOINT_STAGES keys
+        key: str, key returned by "get_key" function
+
+        Returns:
+        -------
+        value: saved result of the stage, None if there is no checkpoint
+            for the key or if the stage is forced
+        """
+        if key is None or stage in self.force_stages:
+            return None
+        checkpoint_path = self.checkpoint_path(stage, key)
+        try:
+            with open(checkpoint_path, "rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        os.utime(checkpoint_path)
+        return value
+
+    def save(self, stage: str, key: str, value):
+        """
+        Function to save the result of a stage as checkpoint, the file is
+        written to a temporary path and renamed so concurrent runs never
+        read a partial checkpoint
+
+        Parameters:
+        ----------
+        stage: str, one of CHECKPOINT_STAGES keys
+        key: str, key returned by "get_key" function, nothing is saved if
+            None
+        value: result of the stage, pd.DataFrame or np.ndarray object
+        """
+        if key is None:
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.checkpoint_path(stage, key))
+        self.evict()
+
+    def evict(self):
+        """
+        Function to evict the least recently used checkpoints until the
+        total size is below "max_size_bytes", the most recently used
+        checkpoint is always kept
+        """
+        if self.max_size_bytes is None:
+            return
+        checkpoints = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(CHECKPOINT_EXTENSION):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                continue
+            checkpoints.append((stat.st_mtime, stat.st_size, name))
+        total_size = 0
+        for i, (_, size, name) in enumerate(sorted(checkpoints,
+                                                   reverse=True)):
+            total_size += size
+            if total_size > self.max_size_bytes and i > 0:
+                # -> Files can already be removed by another run evicting
+                # the same checkpoints
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,197 @@
+import numpy as np
+import pandas as pd
+
+from .exceptions import InputError
+
+# Default rolling windows in days of the daily averages
+DEFAULT_ROLLING_WINDOWS = [7, 14]
+
+# Default number of people of the per capita rates (per 100k people)
+DEFAULT_PER_CAPITA_BASE = 100000
+
+# Default period in days of the growth ratios (week over week)
+DEFAULT_GROWTH_PERIOD = 7
+
+
+class StatsMetrics(object):
+    """
+    This class is to generate rolling window, per capita and growth metrics
+    on the statistics generated by "generate_stats" function of
+    NewYorkTimesCovid19Data class
+
+    Explanation:
+        The metrics are computed from differences of the cumulative columns
+        instead of a rolling operation per fips code. The records are
+        sorted once by ("fips", "date") and, for every record, the last
+        record of the same fips code at least N days older is found with a
+        single binary search over (fips code, day) keys. The sum of daily
+        values over the last N days is then the difference of the
+        cumulative values of these two records. Windows are calendar days,
+        so gaps in the reported dates are handled, and windows starting
+        before the first record of a fips code are null
+
+    Attributes:
+        rolling_windows: list of int, rolling windows in days
+        per_capita_base: int, number of people of the per capita rates
+        growth_period: int, period in days of the growth ratios
+    """
+
+    def __init__(self, rolling_windows: list = None,
+                 per_capita_base: int = DEFAULT_PER_CAPITA_BASE,
+                 growth_period: int = DEFAULT_GROWTH_PERIOD):
+        """
+        The constructor for StatsMetrics class
+
+        Parameters:
+        ----------
+        rolling_windows: list of int, optional, rolling windows in days of
+            the daily averages, DEFAULT_ROLLING_WINDOWS if not provided
+        per_capita_base: int, number of people of the per capita rates
+        growth_period: int, period in days of the growth ratios, 0 to
+            disable the growth ratios
+        """
+        if rolling_windows is None:
+            rolling_windows = DEFAULT_ROLLING_WINDOWS
+        for days in list(rolling_windows) + [per_capita_base]:
+            if days <= 0:
+                raise InputError(days,
+                                 f"Rolling windows and per capita base must "
+                                 f"be positive, got {days}")
+        if growth_period < 0:
+            raise InputError(growth_period,
+                             f"Growth period must not be negative, got "
+                             f"{growth_period}")
+        self.rolling_windows = sorted(set(rolling_windows))
+        self.per_capita_base = per_capita_base
+        self.growth_period = growth_period
+
+    def get_metric_columns(self) -> list:
+        """
+        Function to get the names of the generated metric columns
+
+        Returns:
+        -------
+        columns: list of str, for example with default parameters
+            "daily_cases_avg_7d", "daily_cases_avg_7d_per_100k",
+            "daily_deaths_avg_7d", ..., "cumulative_cases_per_100k",
+            "cumulative_deaths_per_100k", "cases_growth_7d",
+            "deaths_growth_7d"
+        """
+        per_capita = self.get_per_capita_suffix()
+        columns = []
+        for days in self.rolling_windows:
+            columns += [f"daily_cases_avg_{days}d",
+                        f"daily_cases_avg_{days}d_{per_capita}",
+                        f"daily_deaths_avg_{days}d",
+                        f"daily_deaths_avg_{days}d_{per_capita}"]
+        columns += [f"cumulative_cases_{per_capita}",
+                    f"cumulative_deaths_{per_capita}"]
+        if self.growth_period:
+            columns += [f"cases_growth_{self.growth_period}d",
+                        f"deaths_growth_{self.growth_period}d"]
+        return columns
+
+    def get_per_capita_suffix(self) -> str:
+        """
+        Function to get the suffix of per capita columns, for example
+        "per_100k" for 100000 people
+        """
+        if self.per_capita_base % 1000 == 0:
+            return f"per_{self.per_capita_base // 1000}k"
+        return f"per_{self.per_capita_base}"
+
+    @staticmethod
+    def get_days(dates) -> np.ndarray:
+        """
+        Function to convert dates to integer days, compact day offsets are
+        returned as they are
+
+        Parameters:
+        ----------
+        dates: array like object with datetime64 dates or integer days
+
+        Returns:
+        -------
+        days: np.ndarray object with int64 days
+        """
+        dates = np.asarray(dates)
+        if np.issubdtype(dates.dtype, np.integer):
+            return dates.astype("int64")
+        return dates.astype("datetime64[D]").astype("int64")
+
+    def generate_metrics(self, df_stats: pd.DataFrame) -> pd.DataFrame:
+        """
+        Function to add the metric columns to generated statistics
+
+        Parameters:
+        ----------
+        df_stats: pd.DataFrame object indexed by ("fips", "date") as
+            returned by "generate_stats" function, with columns:
+                "population":integer
+                "cumulative_cases_to_date":integer
+                "cumulative_deaths_to_date":integer
+
+        Returns:
+        -------
+        df_stats: pd.DataFrame object sorted by ("fips", "date") with
+            statistics and metric columns ("get_metric_columns" function),
+            metric columns are float and null when not defined
+        """
+        if not df_stats.index.is_monotonic_increasing:
+            df_stats = df_stats.sort_index(kind="mergesort")
+        fips_codes = pd.factorize(df_stats.index.get_level_values("fips"),
+                                  sort=True)[0]
+        days = self.get_days(df_stats.index.get_level_values("date"))
+        if len(days) == 0:
+            return df_stats.assign(**{c: pd.Series(dtype=float)
+                                      for c in self.get_metric_columns()})
+        # -> Keys are increasing since the records are sorted by fips code
+        # and date, the key span of a fips code is larger than any lag so
+        # that a lagged key never reaches the previous fips code
+        max_lag = max(self.rolling_windows + [2 * self.growth_period])
+        span = days.max() - days.min() + max_lag + 1
+        keys = fips_codes.astype("int64") * span + (days - days.min())
+        is_first = np.ones(len(keys), dtype=bool)
+        is_first[1:] = fips_codes[1:] != fips_codes[:-1]
+        first_positions = np.flatnonzero(is_first)
+        group_start = first_positions[np.cumsum(is_first) - 1]
+        # -> Position of the last record of the same fips code at least
+        # "lag" days older than every record, -1 if there is none
+        lagged_positions = {}
+        for lag in set(self.rolling_windows + [self.growth_period,
+                                               2 * self.growth_period]):
+            positions = np.searchsorted(keys, keys - lag, side="right") - 1
+            positions[positions < group_start] = -1
+            lagged_positions[lag] = positions
+
+        def lagged(values: np.ndarray, lag: int) -> np.ndarray:
+            positions = lagged_positions[lag]
+            return np.where(positions >= 0, values[positions], np.nan)
+
+        population = df_stats["population"].values.astype(float)
+        population[population <= 0] = np.nan
+        per_capita = self.get_per_capita_suffix()
+        metrics = {}
+        cumulative = {"cases": df_stats["cumulative_cases_to_date"]
+                      .values.astype(float),
+                      "deaths": df_stats["cumulative_deaths_to_date"]
+                      .values.astype(float)}
+        for days in self.rolling_windows:
+            for name, values in cumulative.items():
+                average = (values - lagged(values, days)) / days
+                metrics[f"daily_{name}_avg_{days}d"] = average
+                metrics[f"daily_{name}_avg_{days}d_{per_capita}"] = \
+                    average / population * self.per_capita_base
+        for name, values in cumulative.items():
+            metrics[f"cumulative_{name}_{per_capita}"] = \
+                values / population * self.per_capita_base
+        if self.growth_period:
+            period = self.growth_period
+            for name, values in cumulative.items():
+                current = values - lagged(values, period)
+                previous = lagged(values, period) - lagged(values, 2 * period)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    growth = current / previous
+                growth[previous == 0] = np.nan
+                metrics[f"{name}_growth_{period}d"] = growth
+        return df_stats.assign(**metrics)
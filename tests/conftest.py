@@ -0,0 +1,84 @@
+import hashlib
+import http.server
+import socketserver
+import threading
+
+import pytest
+
+from benchmarks.synthetic_data import generate_covid19_csv, \
+    generate_fips_codes, generate_population_csv
+
+
+class StandInServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    """
+    This class is a threaded HTTP server (http.server.ThreadingHTTPServer
+    is only available from Python 3.7)
+    """
+    daemon_threads = True
+
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    """
+    This class serves the files of the stand-in server with an ETag header
+    and replies "304 Not Modified" to matching conditional requests
+    """
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append({"path": self.path,
+                                "if_none_match":
+                                    self.headers.get("If-None-Match")})
+        if self.path not in server.files:
+            self.send_error(404)
+            return
+        content = server.files[self.path]
+        etag = f'"{hashlib.sha256(content).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_server():
+    """
+    Fixture of a local HTTP stand-in for the remote source files, files
+    are served from its "files" dict (path to bytes) and every request is
+    recorded in its "requests" list, "url" gives the url of a path
+    """
+    server = StandInServer(("127.0.0.1", 0), StandInHandler)
+    server.files = {}
+    server.requests = []
+    server.url = lambda path: f"http://127.0.0.1:{server.server_port}{path}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def source_files(tmp_path):
+    """
+    Fixture of small synthetic us-counties.csv and co-est2019-alldata.csv
+    files, see benchmarks/synthetic_data.py
+
+    Returns:
+    -------
+    paths: dict with "covid19_csv_path" and "population_csv_path"
+    """
+    fips = generate_fips_codes(120)
+    paths = {"covid19_csv_path": str(tmp_path / "us-counties.csv"),
+             "population_csv_path": str(tmp_path / "co-est2019-alldata.csv")}
+    generate_population_csv(paths["population_csv_path"], fips)
+    generate_covid19_csv(paths["covid19_csv_path"], fips, 40)
+    return paths
@@ -0,0 +1,64 @@
+import json
+import sys
+
+import pytest
+
+from covid19_data_with_population.__main__ import main
+
+
+def run_main(monkeypatch, *args: str):
+    """
+    Function to run the command line pipeline with given arguments
+    """
+    monkeypatch.setattr(sys, "argv", ["covid19_data_with_population"]
+                        + list(args))
+    main()
+
+
+def read_bytes(file_path: str) -> bytes:
+    with open(file_path, "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("use_http_server", [False, True])
+def test_batch_pool_matches_single_runs(monkeypatch, tmp_path, source_files,
+                                        http_server, use_http_server: bool):
+    # -> Two inputs, the second one only has the first records of the first
+    covid19_csv_paths = [source_files["covid19_csv_path"],
+                         str(tmp_path / "us-counties-first.csv")]
+    with open(covid19_csv_paths[0], "rb") as f:
+        lines = f.read().splitlines(keepends=True)
+    with open(covid19_csv_paths[1], "wb") as f:
+        f.write(b"".join(lines[:len(lines) // 3]))
+    population_args = ["--population_csv_path",
+                       source_files["population_csv_path"]]
+    expected_outputs = []
+    for i, covid19_csv_path in enumerate(covid19_csv_paths):
+        output_file_path = str(tmp_path / f"single-{i}.csv")
+        run_main(monkeypatch, "--covid19_csv_path", covid19_csv_path,
+                 "--output_file_path", output_file_path, *population_args)
+        expected_outputs.append(read_bytes(output_file_path))
+    if use_http_server:
+        for i, covid19_csv_path in enumerate(covid19_csv_paths):
+            http_server.files[f"/input-{i}.csv"] = read_bytes(
+                covid19_csv_path)
+        covid19_csv_paths = [http_server.url(f"/input-{i}.csv")
+                             for i in range(len(covid19_csv_paths))]
+    entries = [{"covid19_csv_path": covid19_csv_path,
+                "output_file_path": f"batch-{i}.csv"}
+               for i, covid19_csv_path in enumerate(covid19_csv_paths)]
+    manifest_path = str(tmp_path / "manifest.json")
+    with open(manifest_path, "w") as f:
+        json.dump(entries, f)
+    args = ["--manifest_path", manifest_path, "--batch_workers", "2",
+            *population_args]
+    if use_http_server:
+        args += ["--cache_dir", str(tmp_path / "cache")]
+    run_main(monkeypatch, *args)
+    for i, expected_output in enumerate(expected_outputs):
+        assert read_bytes(str(tmp_path / f"batch-{i}.csv")) \
+            == expected_output
+    if use_http_server:
+        # -> Every input is downloaded once by the worker processing it
+        assert sorted(r["path"] for r in http_server.requests) \
+            == ["/input-0.csv", "/input-1.csv"]
@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+from covid19_data_with_population.binary_store import StatsBinaryStore
+
+
+def test_write_with_long_column_names(tmp_path):
+    index = pd.MultiIndex.from_arrays(
+        [["01001", "01001", "06001"],
+         pd.to_datetime(["2020-03-01", "2020-03-02", "2020-03-01"])],
+        names=["fips", "date"])
+    # -> The header of these columns is larger than 256 bytes per array
+    columns = [f"{'long_metric_name_' * 20}{i}" for i in range(12)]
+    df = pd.DataFrame({c: np.arange(3, dtype="int64") * i
+                       for i, c in enumerate(columns)}, index=index)
+    df["population"] = [55869.0, 55868.0, np.nan]
+    file_path = str(tmp_path / "stats.bin")
+    StatsBinaryStore.write(df, file_path)
+    binary_store = StatsBinaryStore(file_path)
+    assert binary_store.columns == columns + ["population"]
+    pd.testing.assert_frame_equal(binary_store.to_dataframe(), df)
+    assert binary_store.get_fips_dataframe("06001")[columns[1]].tolist() \
+        == [2]
+    for array in binary_store.header["arrays"].values():
+        assert array["offset"] % 64 == 0
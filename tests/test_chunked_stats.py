@@ -0,0 +1,68 @@
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from covid19_data_with_population.__main__ import main
+from covid19_data_with_population.dataset import FIPS_LOOKUP_SENTINEL
+from covid19_data_with_population.newyork_times_covid19_data import \
+    NewYorkTimesCovid19Data
+
+
+def run_main(monkeypatch, *args: str):
+    """
+    Function to run the command line pipeline with given arguments
+    """
+    monkeypatch.setattr(sys, "argv", ["covid19_data_with_population"]
+                        + list(args))
+    main()
+
+
+def read_lines(file_path: str) -> list:
+    with open(file_path, "rb") as f:
+        return f.read().splitlines(keepends=True)
+
+
+@pytest.mark.parametrize("compact", [False, True])
+@pytest.mark.parametrize("chunksize", [500, 100000])
+def test_chunked_output_matches_in_memory_output(monkeypatch, tmp_path,
+                                                 source_files, compact: bool,
+                                                 chunksize: int):
+    output_lines = {}
+    for mode in ["in_memory", "chunked"]:
+        output_file_path = str(tmp_path / f"out-{mode}.csv")
+        args = ["--covid19_csv_path", source_files["covid19_csv_path"],
+                "--population_csv_path", source_files["population_csv_path"],
+                "--output_file_path", output_file_path]
+        if compact:
+            args.append("--compact")
+        if mode == "chunked":
+            args += ["--chunksize", str(chunksize)]
+        run_main(monkeypatch, *args)
+        output_lines[mode] = read_lines(output_file_path)
+    # -> The chunked output has the same header and records in chunk order
+    assert output_lines["chunked"][0] == output_lines["in_memory"][0]
+    assert sorted(output_lines["chunked"][1:]) \
+        == sorted(output_lines["in_memory"][1:])
+    if chunksize > len(output_lines["in_memory"]):
+        assert output_lines["chunked"] == output_lines["in_memory"]
+
+
+def test_chunks_have_float_population():
+    # -> Only the second chunk has a record without population estimate
+    population_lookup = np.full(100000, FIPS_LOOKUP_SENTINEL, dtype="int64")
+    population_lookup[1001] = 55869
+    chunks = [pd.DataFrame({"fips": ["01001"],
+                            "date": pd.to_datetime(["2020-03-01"]),
+                            "cases": [1], "deaths": [0]}),
+              pd.DataFrame({"fips": ["01001", "99999"],
+                            "date": pd.to_datetime(["2020-03-02"] * 2),
+                            "cases": [2, 3], "deaths": [1, 0]})]
+    df_stats_chunks = list(NewYorkTimesCovid19Data(
+        "us-counties.csv", chunksize=2).generate_stats_from_chunks(
+        chunks, population_lookup))
+    for df_stats, _ in df_stats_chunks:
+        assert df_stats["population"].dtype == "float64"
+    assert df_stats_chunks[0][0]["population"].tolist() == [55869.0]
+    assert df_stats_chunks[1][0]["population"].tolist()[0] == 55868.0
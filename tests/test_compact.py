@@ -0,0 +1,85 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from covid19_data_with_population.__main__ import main
+from covid19_data_with_population.newyork_times_covid19_data import \
+    NewYorkTimesCovid19Data
+from covid19_data_with_population.population_estimate_data_2019 import \
+    PopulationEstimateData2019
+
+
+def run_main(monkeypatch, *args: str):
+    """
+    Function to run the command line pipeline with given arguments
+    """
+    monkeypatch.setattr(sys, "argv", ["covid19_data_with_population"]
+                        + list(args))
+    main()
+
+
+def read_bytes(file_path: str) -> bytes:
+    with open(file_path, "rb") as f:
+        return f.read()
+
+
+def test_encode_and_decode_round_trip():
+    newyork_times_covid19_data = NewYorkTimesCovid19Data(None, compact=True)
+    dates = pd.Series(pd.to_datetime(["1969-12-31", "2020-03-01",
+                                      "2020-02-29", "2038-01-20"]),
+                      name="date")
+    days = newyork_times_covid19_data.encode_dates(dates)
+    assert days.dtype == "int32"
+    assert days.tolist() == [-1, 18322, 18321, 24856]
+    pd.testing.assert_index_equal(
+        newyork_times_covid19_data.decode_dates(days),
+        pd.DatetimeIndex(dates.values))
+    fips = ["01001", "06001", "72153", "00000"]
+    pd.testing.assert_index_equal(
+        newyork_times_covid19_data.decode_fips(
+            np.array([int(f) for f in fips], dtype="int32")),
+        pd.Index(fips, dtype=object))
+
+
+def test_compact_stats_match_default_stats(source_files):
+    df_stats = {}
+    for compact in [False, True]:
+        newyork_times_covid19_data = NewYorkTimesCovid19Data(
+            source_files["covid19_csv_path"], compact=compact)
+        population_estimate_data_2019 = PopulationEstimateData2019(
+            source_files["population_csv_path"], compact=compact)
+        population_lookup = \
+            population_estimate_data_2019.generate_population_lookup(
+                population_estimate_data_2019.preprocess(
+                    population_estimate_data_2019.df))
+        df = newyork_times_covid19_data.preprocess(
+            newyork_times_covid19_data.df)
+        if compact:
+            assert df["fips"].dtype == "int32"
+            assert df["date"].dtype == "int32"
+        df = newyork_times_covid19_data.combine_with_population_lookup(
+            df, population_lookup)
+        df = newyork_times_covid19_data.generate_stats(df)
+        df_stats[compact] = newyork_times_covid19_data.decode_compact_stats(
+            df)
+    pd.testing.assert_frame_equal(df_stats[True], df_stats[False],
+                                  check_dtype=False)
+
+
+def test_compact_output_matches_default_output(monkeypatch, tmp_path,
+                                               source_files):
+    outputs = {}
+    for compact in [False, True]:
+        output_file_path = str(tmp_path / f"out-{compact}.csv")
+        args = ["--covid19_csv_path", source_files["covid19_csv_path"],
+                "--population_csv_path", source_files["population_csv_path"],
+                "--output_file_path", output_file_path, "--incremental"]
+        if compact:
+            args.append("--compact")
+        run_main(monkeypatch, *args)
+        outputs[compact] = read_bytes(output_file_path)
+        outputs[f"state-{compact}"] = read_bytes(
+            f"{output_file_path}.state.csv")
+    assert outputs[True] == outputs[False]
+    assert outputs["state-True"] == outputs["state-False"]
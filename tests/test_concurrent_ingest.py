@@ -0,0 +1,83 @@
+import json
+import sys
+
+import pytest
+
+from covid19_data_with_population.__main__ import main
+
+
+def run_main(monkeypatch, *args: str):
+    """
+    Function to run the command line pipeline with given arguments
+    """
+    monkeypatch.setattr(sys, "argv", ["covid19_data_with_population"]
+                        + list(args))
+    main()
+
+
+def read_bytes(file_path: str) -> bytes:
+    with open(file_path, "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_concurrent_ingest_matches_sequential_ingest(monkeypatch, tmp_path,
+                                                     source_files,
+                                                     compact: bool):
+    outputs = {}
+    for concurrent_ingest in [False, True]:
+        output_file_path = str(tmp_path / f"out-{concurrent_ingest}.csv")
+        report_path = str(tmp_path / f"report-{concurrent_ingest}.json")
+        args = ["--covid19_csv_path", source_files["covid19_csv_path"],
+                "--population_csv_path", source_files["population_csv_path"],
+                "--output_file_path", output_file_path,
+                "--profile_report", report_path]
+        if compact:
+            args.append("--compact")
+        if concurrent_ingest:
+            args.append("--concurrent_ingest")
+        run_main(monkeypatch, *args)
+        outputs[concurrent_ingest] = read_bytes(output_file_path)
+        with open(report_path) as f:
+            stages = [s["stage"] for s in json.load(f)["stages"]]
+        # -> The stages of the population worker thread are reported
+        for stage in ["ingest_population", "preprocess_population",
+                      "ingest_covid19", "combine_with_population"]:
+            assert stage in stages
+    assert outputs[True] == outputs[False]
+
+
+@pytest.mark.parametrize("use_cache", [False, True])
+def test_concurrent_ingest_from_http_server(monkeypatch, tmp_path,
+                                            source_files, http_server,
+                                            use_cache: bool):
+    for name in ["covid19_csv_path", "population_csv_path"]:
+        http_server.files[f"/{name}.csv"] = read_bytes(source_files[name])
+    local_output_file_path = str(tmp_path / "out-local.csv")
+    run_main(monkeypatch,
+             "--covid19_csv_path", source_files["covid19_csv_path"],
+             "--population_csv_path", source_files["population_csv_path"],
+             "--output_file_path", local_output_file_path)
+    output_file_path = str(tmp_path / "out-http.csv")
+    args = ["--covid19_csv_path", http_server.url("/covid19_csv_path.csv"),
+            "--population_csv_path",
+            http_server.url("/population_csv_path.csv"),
+            "--output_file_path", output_file_path, "--concurrent_ingest"]
+    if use_cache:
+        args += ["--cache_dir", str(tmp_path / "cache")]
+    run_main(monkeypatch, *args)
+    assert read_bytes(output_file_path) == read_bytes(local_output_file_path)
+    # -> Every source is downloaded exactly once
+    assert sorted(r["path"] for r in http_server.requests) \
+        == ["/covid19_csv_path.csv", "/population_csv_path.csv"]
+    assert all(r["if_none_match"] is None for r in http_server.requests)
+    if use_cache:
+        # -> A second run only revalidates every cached source once
+        del http_server.requests[:]
+        run_main(monkeypatch, *args)
+        assert read_bytes(output_file_path) \
+            == read_bytes(local_output_file_path)
+        assert sorted(r["path"] for r in http_server.requests) \
+            == ["/covid19_csv_path.csv", "/population_csv_path.csv"]
+        assert all(r["if_none_match"] is not None
+                   for r in http_server.requests)
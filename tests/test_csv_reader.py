@@ -0,0 +1,94 @@
+import io
+
+import pandas as pd
+import pytest
+
+from covid19_data_with_population.dataset import DataSet
+from covid19_data_with_population.exceptions import InputError
+from covid19_data_with_population.newyork_times_covid19_data import \
+    NEWYORK_TIMES_COVID19_DATA_REQUIRED_COLUMNS, \
+    NEWYORK_TIMES_COVID19_DATA_SCHEMA, NewYorkTimesCovid19Data
+from covid19_data_with_population.population_estimate_data_2019 import \
+    PopulationEstimateData2019
+
+COVID19_CSV = (b"date,county,state,fips,cases,deaths,confirmed_cases\n"
+               b"2020-03-01,Autauga,Alabama,01001,1,0,1\n"
+               b"2020-03-01,New York City,New York,,5,\n"
+               b"2020-03-02,Autauga,Alabama,01001,2,1,2\n")
+
+
+def read_covid19_csv(csv_file_path, **kwargs):
+    return DataSet().read_csv_with_schema(
+        csv_file_path, NEWYORK_TIMES_COVID19_DATA_SCHEMA,
+        NEWYORK_TIMES_COVID19_DATA_REQUIRED_COLUMNS, **kwargs)
+
+
+def test_read_csv_with_schema_types_and_pruned_columns(tmp_path):
+    csv_file_path = str(tmp_path / "us-counties.csv")
+    with open(csv_file_path, "wb") as f:
+        f.write(COVID19_CSV)
+    df = read_covid19_csv(csv_file_path)
+    assert list(df.columns) == ["date", "county", "state", "fips", "cases",
+                                "deaths"]
+    assert df["fips"].tolist()[::2] == ["01001", "01001"]
+    assert pd.isna(df["fips"][1])
+    assert df["date"].dtype == "datetime64[ns]"
+    assert df["state"].dtype == "category"
+    assert df["deaths"].dtype == "float64"
+    # -> A stream and chunks have the same records and types
+    pd.testing.assert_frame_equal(read_covid19_csv(io.BytesIO(COVID19_CSV)),
+                                  df)
+    chunks = list(read_covid19_csv(csv_file_path, chunksize=2))
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    pd.testing.assert_frame_equal(
+        pd.concat(chunks, ignore_index=True).astype({"county": object,
+                                                     "state": object}),
+        df.astype({"county": object, "state": object}))
+
+
+def test_read_csv_with_missing_required_column(tmp_path):
+    csv_file_path = str(tmp_path / "us-counties.csv")
+    with open(csv_file_path, "w") as f:
+        f.write("date,county,state,cases,deaths\n2020-03-01,A,B,1,0\n")
+    with pytest.raises(InputError):
+        read_covid19_csv(csv_file_path)
+    with pytest.raises(InputError):
+        DataSet().validate_csv_columns(
+            csv_file_path, NEWYORK_TIMES_COVID19_DATA_REQUIRED_COLUMNS)
+    with pytest.raises(InputError):
+        next(read_covid19_csv(csv_file_path, chunksize=10))
+
+
+@pytest.mark.parametrize("csv_engine", ["c", "pyarrow"])
+def test_read_url_once(http_server, source_files, csv_engine: str):
+    if csv_engine == "pyarrow":
+        pytest.importorskip("pyarrow")
+    for name in ["covid19_csv_path", "population_csv_path"]:
+        with open(source_files[name], "rb") as f:
+            http_server.files[f"/{name}.csv"] = f.read()
+    newyork_times_covid19_data = NewYorkTimesCovid19Data(
+        http_server.url("/covid19_csv_path.csv"), csv_engine=csv_engine)
+    population_estimate_data_2019 = PopulationEstimateData2019(
+        http_server.url("/population_csv_path.csv"), csv_engine=csv_engine)
+    pd.testing.assert_frame_equal(
+        newyork_times_covid19_data.df,
+        NewYorkTimesCovid19Data(source_files["covid19_csv_path"]).df)
+    pd.testing.assert_frame_equal(
+        population_estimate_data_2019.df,
+        PopulationEstimateData2019(source_files["population_csv_path"]).df)
+    assert sorted(r["path"] for r in http_server.requests) \
+        == ["/covid19_csv_path.csv", "/population_csv_path.csv"]
+
+
+def test_read_url_in_chunks_once(http_server, source_files):
+    with open(source_files["covid19_csv_path"], "rb") as f:
+        http_server.files["/us-counties.csv"] = f.read()
+    newyork_times_covid19_data = NewYorkTimesCovid19Data(
+        http_server.url("/us-counties.csv"), chunksize=1000)
+    df = pd.concat(newyork_times_covid19_data.read_preprocessed_chunks(),
+                   ignore_index=True)
+    local_covid19_data = NewYorkTimesCovid19Data(
+        source_files["covid19_csv_path"])
+    df_local = local_covid19_data.preprocess(local_covid19_data.df)
+    pd.testing.assert_frame_equal(df, df_local.reset_index(drop=True))
+    assert [r["path"] for r in http_server.requests] == ["/us-counties.csv"]
@@ -0,0 +1,95 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from covid19_data_with_population.__main__ import main
+from covid19_data_with_population.delta_output import \
+    DELTA_COMPARED_COLUMNS, StatsDelta
+
+
+def run_main(monkeypatch, *args: str):
+    """
+    Function to run the command line pipeline with given arguments
+    """
+    monkeypatch.setattr(sys, "argv", ["covid19_data_with_population"]
+                        + list(args))
+    main()
+
+
+def get_stats(records: list) -> pd.DataFrame:
+    """
+    Function to get statistics indexed by ("fips", "date") from a list of
+    (fips, date, daily_cases) records
+    """
+    fips, dates, daily_cases = zip(*records)
+    index = pd.MultiIndex.from_arrays([list(fips), pd.to_datetime(dates)],
+                                      names=["fips", "date"])
+    daily_cases = np.array(daily_cases, dtype="int64")
+    return pd.DataFrame({"population": [1000.0] * len(records),
+                         "daily_cases": daily_cases,
+                         "daily_deaths": daily_cases // 2,
+                         "cumulative_cases_to_date": daily_cases * 10,
+                         "cumulative_deaths_to_date": daily_cases * 5},
+                        index=index)
+
+
+def test_delta_of_added_changed_and_removed_fips():
+    df_previous = get_stats([("01001", "2020-03-01", 1),
+                             ("01001", "2020-03-02", 2),
+                             ("06001", "2020-03-01", 3),
+                             ("06001", "2020-03-02", 4),
+                             ("36061", "2020-03-01", 5)])
+    df_new = get_stats([("01001", "2020-03-01", 1),
+                        ("01001", "2020-03-02", 2),
+                        ("06001", "2020-03-01", 3),
+                        ("06001", "2020-03-03", 6),
+                        ("06001", "2020-03-02", 7),
+                        ("53033", "2020-03-01", 8)])
+    df_delta = StatsDelta().generate_delta(df_previous, df_new)
+    assert list(df_delta.columns) == ["change"] + list(df_new.columns)
+    assert [(fips, str(date.date()), change) for (fips, date), change
+            in df_delta["change"].items()] == [
+        ("06001", "2020-03-02", "update"),
+        ("06001", "2020-03-03", "insert"),
+        ("36061", "2020-03-01", "delete"),
+        ("53033", "2020-03-01", "insert")]
+    # -> New values of inserted and updated records, previous values of
+    # deleted records
+    assert df_delta["daily_cases"].tolist() == [7, 6, 5, 8]
+
+
+def test_delta_of_saved_statistics_without_changes(tmp_path):
+    df_new = get_stats([("01001", "2020-03-01", 1),
+                        ("06001", "2020-03-01", 3)])
+    df_new.loc[("06001", pd.Timestamp("2020-03-01")), "population"] = np.nan
+    file_path = str(tmp_path / "stats.csv")
+    stats_delta = StatsDelta()
+    stats_delta.save_dataframe(df_new, file_path)
+    # -> Values read back from the csv file are equal to the generated values
+    df_delta = stats_delta.generate_delta(
+        stats_delta.read_saved_dataframe(file_path), df_new)
+    assert len(df_delta) == 0
+
+
+def test_delta_of_first_run(monkeypatch, tmp_path, source_files):
+    output_file_path = str(tmp_path / "out.csv")
+    delta_output_path = str(tmp_path / "delta.csv")
+    args = ["--covid19_csv_path", source_files["covid19_csv_path"],
+            "--population_csv_path", source_files["population_csv_path"],
+            "--output_file_path", output_file_path,
+            "--delta_output_path", delta_output_path]
+    # -> Without previous output every record is inserted
+    run_main(monkeypatch, *args)
+    df_out = pd.read_csv(output_file_path, dtype={"fips": object})
+    df_delta = pd.read_csv(delta_output_path, dtype={"fips": object})
+    assert (df_delta["change"] == "insert").all()
+    pd.testing.assert_frame_equal(
+        df_delta.drop(columns="change")[df_out.columns], df_out)
+    # -> A second run on the same sources has an empty delta
+    run_main(monkeypatch, *args)
+    df_delta = pd.read_csv(delta_output_path)
+    assert len(df_delta) == 0
+    assert list(df_delta.columns) == ["fips", "date", "change"] \
+        + list(df_out.columns[2:])
+    assert set(DELTA_COMPARED_COLUMNS) <= set(df_out.columns)
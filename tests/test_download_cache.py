@@ -0,0 +1,111 @@
+import json
+import os
+import time
+
+import pytest
+
+from covid19_data_with_population.download_cache import DownloadCache
+from covid19_data_with_population.exceptions import InputError
+
+
+def set_fetched_at(download_cache: DownloadCache, url: str,
+                   fetched_at: float):
+    """
+    Function to change the fetch time of the cached file of an url
+    """
+    entry = download_cache.read_entry(url)
+    entry["fetched_at"] = fetched_at
+    entry["used_at"] = fetched_at
+    download_cache.write_entry(entry)
+
+
+def test_get_downloads_and_revalidates(tmp_path, http_server):
+    http_server.files["/us-counties.csv"] = b"date,fips\n2020-03-01,01001\n"
+    url = http_server.url("/us-counties.csv")
+    download_cache = DownloadCache(str(tmp_path))
+    file_path = download_cache.get(url)
+    with open(file_path, "rb") as f:
+        assert f.read() == http_server.files["/us-counties.csv"]
+    assert download_cache.get(url) == file_path
+    # -> The second request is conditional and the server replies 304
+    assert http_server.requests[0]["if_none_match"] is None
+    assert http_server.requests[1]["if_none_match"] is not None
+    http_server.files["/us-counties.csv"] = b"date,fips\n2020-03-02,01001\n"
+    new_file_path = download_cache.get(url)
+    assert new_file_path != file_path
+    with open(new_file_path, "rb") as f:
+        assert f.read() == http_server.files["/us-counties.csv"]
+
+
+def test_local_paths_are_not_cached(tmp_path):
+    download_cache = DownloadCache(str(tmp_path / "cache"))
+    assert download_cache.get("us-counties.csv") == "us-counties.csv"
+
+
+def test_offline_mode_uses_cache_only(tmp_path, http_server):
+    http_server.files["/co-est2019-alldata.csv"] = b"STATE,COUNTY\n01,001\n"
+    url = http_server.url("/co-est2019-alldata.csv")
+    file_path = DownloadCache(str(tmp_path)).get(url)
+    number_of_requests = len(http_server.requests)
+    download_cache = DownloadCache(str(tmp_path), offline=True)
+    assert download_cache.get(url) == file_path
+    assert len(http_server.requests) == number_of_requests
+    with pytest.raises(InputError):
+        download_cache.get(http_server.url("/us-counties.csv"))
+
+
+def test_offline_mode_does_not_evict_returned_file(tmp_path, http_server):
+    http_server.files["/co-est2019-alldata.csv"] = b"STATE,COUNTY\n01,001\n"
+    url = http_server.url("/co-est2019-alldata.csv")
+    DownloadCache(str(tmp_path)).get(url)
+    max_age_seconds = 30 * 24 * 3600
+    download_cache = DownloadCache(str(tmp_path), offline=True,
+                                   max_age_seconds=max_age_seconds)
+    set_fetched_at(download_cache, url, time.time() - 40 * 24 * 3600)
+    file_path = download_cache.get(url)
+    download_cache.evict()
+    with open(file_path, "rb") as f:
+        assert f.read() == http_server.files["/co-est2019-alldata.csv"]
+
+
+def test_evict_by_age_and_size(tmp_path, http_server):
+    for i in range(3):
+        http_server.files[f"/file{i}.csv"] = bytes([i]) * 100
+    download_cache = DownloadCache(str(tmp_path), max_size_bytes=250,
+                                   max_age_seconds=3600)
+    urls = [http_server.url(f"/file{i}.csv") for i in range(3)]
+    download_cache.get(urls[0])
+    set_fetched_at(download_cache, urls[0], time.time() - 7200)
+    download_cache.get(urls[1])
+    download_cache.evict()
+    # -> urls[0] is older than max_age_seconds
+    assert download_cache.read_entry(urls[0]) is None
+    download_cache.get(urls[2])
+    download_cache.get(urls[0])
+    download_cache.evict()
+    # -> The least recently used file exceeds max_size_bytes
+    assert download_cache.read_entry(urls[1]) is None
+    assert download_cache.read_entry(urls[2]) is not None
+    assert download_cache.read_entry(urls[0]) is not None
+    index_files = os.listdir(os.path.join(str(tmp_path), "index"))
+    assert len(index_files) == 2
+    for name in index_files:
+        with open(os.path.join(str(tmp_path), "index", name)) as f:
+            assert json.load(f)["url"] in [urls[0], urls[2]]
+
+
+def test_get_does_not_evict_files_of_other_users(tmp_path, http_server):
+    for i in range(2):
+        http_server.files[f"/file{i}.csv"] = bytes([i]) * 100
+    # -> Two users of the same cache directory, each of them over the
+    # maximum size with its own file
+    download_caches = [DownloadCache(str(tmp_path), max_size_bytes=150)
+                       for _ in range(2)]
+    file_paths = [download_cache.get(http_server.url(f"/file{i}.csv"))
+                  for i, download_cache in enumerate(download_caches)]
+    for i, file_path in enumerate(file_paths):
+        with open(file_path, "rb") as f:
+            assert f.read() == bytes([i]) * 100
+    download_caches[0].evict()
+    assert os.path.exists(file_paths[1])
+    assert not os.path.exists(file_paths[0])
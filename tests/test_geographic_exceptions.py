@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from covid19_data_with_population.newyork_times_covid19_data import \
+    NewYorkTimesCovid19Data
+from covid19_data_with_population.population_estimate_data_2019 import \
+    PopulationEstimateData2019
+
+# Population of the five New York City counties and of two other counties
+POPULATION = {"36061": 1628706, "36047": 2559903, "36081": 2253858,
+              "36005": 1418207, "36085": 476143, "29095": 703011,
+              "01001": 55869}
+
+
+def get_population_dataframe(fips: list) -> pd.DataFrame:
+    return pd.DataFrame({"STATE": [f[:2] for f in fips],
+                         "COUNTY": [f[2:] for f in fips],
+                         "POPESTIMATE2019": [POPULATION[f] for f in fips]})
+
+
+def get_population_lookup(fips: list, compact: bool) -> np.ndarray:
+    population_estimate_data_2019 = PopulationEstimateData2019.from_dataframe(
+        get_population_dataframe(fips), compact)
+    return population_estimate_data_2019.generate_population_lookup(
+        population_estimate_data_2019.preprocess(
+            population_estimate_data_2019.df))
+
+
+def get_covid19_dataframe() -> pd.DataFrame:
+    return pd.DataFrame({
+        "date": ["2020-05-05"] * 6,
+        "county": ["New York City", "Kansas City", "Joplin", "Jackson",
+                   "Unknown", "Adjuntas"],
+        "state": ["New York", "Missouri", "Missouri", "Missouri", "Missouri",
+                  "Puerto Rico"],
+        "fips": [None, None, None, "29095", None, "72001"],
+        "cases": [100.0, 20.0, 3.0, 10.0, 4.0, 2.0],
+        "deaths": [10.0, 2.0, 0.0, 1.0, 0.0, np.nan]})
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_synthetic_fips_population(compact: bool):
+    population_lookup = get_population_lookup(list(POPULATION), compact)
+    # -> The estimates of 2019 are used for every year of the lookup
+    assert (population_lookup[..., [36998, 29998, 29997]]
+            == [8336817, 495327, 50925]).all()
+    # -> The overlapping county keeps its own population estimate
+    assert (population_lookup[..., 29095] == POPULATION["29095"]).all()
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_partial_components_give_missing_population(compact: bool):
+    fips = [f for f in POPULATION if f != "36085"]
+    population_lookup = get_population_lookup(fips, compact)
+    newyork_times_covid19_data = NewYorkTimesCovid19Data.from_dataframe(
+        get_covid19_dataframe(), compact)
+    df = newyork_times_covid19_data.preprocess(newyork_times_covid19_data.df)
+    df = newyork_times_covid19_data.decode_compact_stats(
+        newyork_times_covid19_data.generate_stats(
+            newyork_times_covid19_data.combine_with_population_lookup(
+                df, population_lookup)))
+    population = df["population"].droplevel("date")
+    assert np.isnan(population["36998"])
+    assert population["29998"] == 495327 - 2
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_update_df_with_geographic_exceptions(compact: bool):
+    newyork_times_covid19_data = NewYorkTimesCovid19Data.from_dataframe(
+        get_covid19_dataframe(), compact)
+    df = newyork_times_covid19_data.preprocess(newyork_times_covid19_data.df)
+    fips = newyork_times_covid19_data.decode_fips(df["fips"]) if compact \
+        else pd.Index(df["fips"])
+    # -> "Unknown" county has no synthetic fips code and is dropped, the
+    # missing deaths of Puerto Rico are set to 0
+    assert sorted(fips) == ["29095", "29997", "29998", "36998", "72001"]
+    assert df["deaths"].values[list(fips).index("72001")] == 0
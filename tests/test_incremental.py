@@ -0,0 +1,85 @@
+import sys
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic_data import generate_covid19_csv, \
+    generate_fips_codes, generate_population_csv
+from covid19_data_with_population.__main__ import main
+from covid19_data_with_population.newyork_times_covid19_data import \
+    NewYorkTimesCovid19Data
+
+
+def run_main(monkeypatch, *args: str):
+    """
+    Function to run the command line pipeline with given arguments
+    """
+    monkeypatch.setattr(sys, "argv", ["covid19_data_with_population"]
+                        + list(args))
+    main()
+
+
+def read_bytes(file_path: str) -> bytes:
+    with open(file_path, "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_incremental_run_matches_full_run(monkeypatch, tmp_path,
+                                          compact: bool):
+    # -> All the fips codes have a population estimate, so the population
+    # of a full run is integer, and the first fips code has no record
+    # after the first run
+    fips = generate_fips_codes(60)
+    population_csv_path = str(tmp_path / "co-est2019-alldata.csv")
+    generate_population_csv(population_csv_path, fips)
+    generate_covid19_csv(str(tmp_path / "generated.csv"), fips, 40)
+    df = pd.read_csv(str(tmp_path / "generated.csv"), dtype={"fips": object})
+    df = df[df["fips"].isin(fips)]
+    df = df[(df["fips"] != fips[0]) | (df["date"] <= "2020-02-20")]
+    covid19_csv_paths = {"first": str(tmp_path / "us-counties-first.csv"),
+                         "all": str(tmp_path / "us-counties.csv")}
+    df[df["date"] <= "2020-02-20"].to_csv(covid19_csv_paths["first"],
+                                          index=False)
+    df.to_csv(covid19_csv_paths["all"], index=False)
+    reports = []
+    sanity_check_prepared_data = \
+        NewYorkTimesCovid19Data.sanity_check_prepared_data
+
+    def record_report(self, *args):
+        reports.append(sanity_check_prepared_data(self, *args))
+        return reports[-1]
+
+    monkeypatch.setattr(NewYorkTimesCovid19Data,
+                        "sanity_check_prepared_data", record_report)
+    output_file_paths = {"incremental": str(tmp_path / "out-incremental.csv"),
+                         "full": str(tmp_path / "out-full.csv")}
+    for name in ["first", "all"]:
+        args = ["--covid19_csv_path", covid19_csv_paths[name],
+                "--population_csv_path", population_csv_path,
+                "--output_file_path", output_file_paths["incremental"],
+                "--incremental",
+                "--apply_sanity_check_on_output_data", "True"]
+        if compact:
+            args.append("--compact")
+        run_main(monkeypatch, *args)
+    args = ["--covid19_csv_path", covid19_csv_paths["all"],
+            "--population_csv_path", population_csv_path,
+            "--output_file_path", output_file_paths["full"]]
+    if compact:
+        args.append("--compact")
+    run_main(monkeypatch, *args)
+    df_incremental = pd.read_csv(output_file_paths["incremental"],
+                                 dtype={"fips": object})
+    df_full = pd.read_csv(output_file_paths["full"], dtype={"fips": object})
+    assert df_full["population"].dtype == "int64"
+    # -> The appended records have the same format as a full run
+    pd.testing.assert_frame_equal(
+        df_incremental.sort_values(by=["fips", "date"])
+        .reset_index(drop=True), df_full)
+    assert sorted(read_bytes(output_file_paths["incremental"]).splitlines()) \
+        == sorted(read_bytes(output_file_paths["full"]).splitlines())
+    # -> The fips code without new records is not reported as missing
+    assert len(reports) == 2
+    assert reports[1].missing_fips == []
+    assert reports[1].is_valid()
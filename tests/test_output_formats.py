@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from covid19_data_with_population.dataset import DataSet, \
+    OUTPUT_FORMAT_EXTENSIONS
+from covid19_data_with_population.exceptions import InputError
+
+# Optional dependency of every output format
+OUTPUT_FORMAT_DEPENDENCIES = {"csv.zst": "zstandard", "parquet": "pyarrow",
+                              "feather": "pyarrow", "arrow": "pyarrow"}
+
+
+def get_stats() -> pd.DataFrame:
+    """
+    Function to get statistics indexed by ("fips", "date") with a fips code
+    without population estimate, records not sorted
+    """
+    index = pd.MultiIndex.from_arrays(
+        [["06001", "01001", "01001", "72999"],
+         pd.to_datetime(["2020-03-01", "2020-03-02", "2020-03-01",
+                         "2020-03-01"])],
+        names=["fips", "date"])
+    return pd.DataFrame({"population": [1671329.0, 55868.0, 55869.0,
+                                        np.nan],
+                         "daily_cases": [7, 2, 1, 3],
+                         "daily_deaths": [1, 1, 0, 0],
+                         "cumulative_cases_to_date": [7, 3, 1, 3],
+                         "cumulative_deaths_to_date": [1, 1, 0, 0]},
+                        index=index)
+
+
+@pytest.mark.parametrize("output_format", list(OUTPUT_FORMAT_EXTENSIONS))
+def test_save_and_read_round_trip(tmp_path, output_format: str):
+    if output_format in OUTPUT_FORMAT_DEPENDENCIES:
+        pytest.importorskip(OUTPUT_FORMAT_DEPENDENCIES[output_format])
+    dataset = DataSet()
+    df = get_stats()
+    extension = OUTPUT_FORMAT_EXTENSIONS[output_format]
+    file_path = str(tmp_path / f"stats{extension}")
+    assert dataset.infer_output_format(file_path) == output_format
+    dataset.save_dataframe(df, file_path)
+    df_read = dataset.read_saved_dataframe(file_path)
+    assert list(df_read.columns) == ["fips", "date"] + list(df.columns)
+    df_read = df_read.set_index(["fips", "date"])
+    if output_format.startswith("csv"):
+        # -> csv files keep the order of the records
+        pd.testing.assert_frame_equal(df_read, df)
+    else:
+        # -> Columnar files are sorted by ("fips", "date")
+        pd.testing.assert_frame_equal(df_read, df.sort_index())
+
+
+def test_unknown_output_format(tmp_path):
+    with pytest.raises(InputError):
+        DataSet().save_dataframe(get_stats(), str(tmp_path / "stats.csv"),
+                                 "xlsx")
+    assert DataSet().infer_output_format("stats.txt") == "csv"
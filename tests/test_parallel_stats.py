@@ -0,0 +1,64 @@
+import multiprocessing
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from covid19_data_with_population.__main__ import main
+from covid19_data_with_population.newyork_times_covid19_data import \
+    NewYorkTimesCovid19Data
+
+
+def run_main(monkeypatch, *args: str):
+    """
+    Function to run the command line pipeline with given arguments
+    """
+    monkeypatch.setattr(sys, "argv", ["covid19_data_with_population"]
+                        + list(args))
+    main()
+
+
+def read_bytes(file_path: str) -> bytes:
+    with open(file_path, "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_workers_match_serial_run(monkeypatch, tmp_path, source_files,
+                                  compact: bool):
+    outputs = {}
+    for workers in [1, 3]:
+        output_file_path = str(tmp_path / f"out-{workers}.csv")
+        args = ["--covid19_csv_path", source_files["covid19_csv_path"],
+                "--population_csv_path", source_files["population_csv_path"],
+                "--output_file_path", output_file_path,
+                "--workers", str(workers)]
+        if compact:
+            args.append("--compact")
+        run_main(monkeypatch, *args)
+        outputs[workers] = read_bytes(output_file_path)
+    assert outputs[3] == outputs[1]
+
+
+@pytest.mark.parametrize("start_methods", [["fork", "spawn"], ["spawn"]])
+def test_generate_stats_in_parallel_matches_generate_stats(monkeypatch,
+                                                           start_methods):
+    # -> Without fork start method the shards are sent to spawned workers
+    monkeypatch.setattr(multiprocessing, "get_all_start_methods",
+                        lambda: start_methods)
+    rng = np.random.default_rng(0)
+    fips = np.array([f"{i:05d}" for i in range(1001, 1031)])
+    dates = pd.date_range("2020-03-01", periods=20)
+    df = pd.DataFrame({"fips": np.repeat(fips, len(dates)),
+                       "date": np.tile(dates, len(fips)),
+                       "cases": rng.integers(0, 100, len(fips) * len(dates)),
+                       "deaths": rng.integers(0, 5, len(fips) * len(dates)),
+                       "POPESTIMATE": np.repeat(
+                           rng.integers(1000, 100000, len(fips)),
+                           len(dates)).astype(float)})
+    df = df.sample(frac=1, random_state=0)
+    newyork_times_covid19_data = NewYorkTimesCovid19Data(None)
+    pd.testing.assert_frame_equal(
+        newyork_times_covid19_data.generate_stats_in_parallel(df, workers=3),
+        newyork_times_covid19_data.generate_stats(df))
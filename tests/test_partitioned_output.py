@@ -0,0 +1,50 @@
+import os
+
+import pandas as pd
+import pytest
+
+from covid19_data_with_population.exceptions import InputError
+from covid19_data_with_population.partitioned_output import PartitionedOutput
+
+
+def get_stats_dataframe(dates: list) -> pd.DataFrame:
+    """
+    Function to get statistics of two fips codes of different states
+    """
+    index = pd.MultiIndex.from_product(
+        [["01001", "06001"], pd.to_datetime(dates)], names=["fips", "date"])
+    return pd.DataFrame({"population": 1000,
+                         "daily_cases": range(len(index))}, index=index)
+
+
+def test_update_uses_existing_format(tmp_path):
+    output_dir = str(tmp_path / "partitioned_output")
+    df = get_stats_dataframe(["2020-03-01", "2020-03-02"])
+    PartitionedOutput(output_dir, "csv.gz").write(df)
+    df_new = get_stats_dataframe(["2020-03-03"])
+    with pytest.raises(InputError):
+        PartitionedOutput(output_dir, "csv").update(df_new)
+    partitioned_output = PartitionedOutput(output_dir)
+    assert partitioned_output.output_format == "csv.gz"
+    assert partitioned_output.update(df_new) == ["state=01/month=2020-03",
+                                                 "state=06/month=2020-03"]
+    df_all = partitioned_output.read()
+    assert len(df_all) == 6
+    assert df_all.index.get_level_values("date").max() \
+        == pd.Timestamp("2020-03-03")
+    assert os.listdir(os.path.join(output_dir, "state=01",
+                                   "month=2020-03")) == ["part.csv.gz"]
+
+
+def test_write_removes_partitions_of_other_format(tmp_path):
+    output_dir = str(tmp_path / "partitioned_output")
+    df = get_stats_dataframe(["2020-03-01", "2020-04-01"])
+    PartitionedOutput(output_dir, "csv").write(df)
+    PartitionedOutput(output_dir, "csv.gz").write(df)
+    for state in ["01", "06"]:
+        for month in ["2020-03", "2020-04"]:
+            assert os.listdir(os.path.join(
+                output_dir, f"state={state}", f"month={month}")) \
+                == ["part.csv.gz"]
+    df_read = PartitionedOutput(output_dir).read()
+    assert len(df_read) == len(df)
@@ -0,0 +1,26 @@
+import pandas as pd
+import pytest
+
+from covid19_data_with_population.__main__ import get_population_lookup
+from covid19_data_with_population.exceptions import InputError
+from covid19_data_with_population.pipeline import run_pipeline
+from covid19_data_with_population.pipeline_profiler import PipelineProfiler
+
+
+def test_run_pipeline_with_population_sources(source_files):
+    df = run_pipeline(source_files["covid19_csv_path"],
+                      source_files["population_csv_path"])
+    df_list = run_pipeline(source_files["covid19_csv_path"],
+                           [source_files["population_csv_path"]])
+    pd.testing.assert_frame_equal(df, df_list)
+    population_lookup = get_population_lookup(
+        source_files["population_csv_path"], None, False, None,
+        PipelineProfiler())
+    pd.testing.assert_frame_equal(
+        run_pipeline(source_files["covid19_csv_path"], population_lookup),
+        df)
+
+
+def test_run_pipeline_without_population_sources(source_files):
+    with pytest.raises(InputError):
+        run_pipeline(source_files["covid19_csv_path"], [])
@@ -0,0 +1,81 @@
+import os
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from covid19_data_with_population.batch_runner import BatchRunner
+from covid19_data_with_population.pipeline_profiler import PipelineProfiler
+from covid19_data_with_population.population_estimate_data_2019 import \
+    PopulationEstimateData2019
+
+# Size of the arrays allocated in the stages
+OUTER_BYTES = 8 * 2 ** 20
+INNER_BYTES = 2 * 2 ** 20
+
+
+def test_nested_stages_trace_memory():
+    profiler = PipelineProfiler(trace_memory=True)
+    with profiler.stage("outer"):
+        outer = np.ones(OUTER_BYTES, dtype="uint8")
+        with PipelineProfiler(trace_memory=True).stage("inner") as inner:
+            np.ones(INNER_BYTES, dtype="uint8")
+        del outer
+        with profiler.stage("inner") as inner:
+            np.ones(INNER_BYTES, dtype="uint8")
+        assert tracemalloc.is_tracing()
+    assert not tracemalloc.is_tracing()
+    outer_peak = profiler.stages[-1]["tracemalloc_peak_bytes"]
+    inner_peak = inner["tracemalloc_peak_bytes"]
+    assert outer_peak >= OUTER_BYTES + INNER_BYTES
+    assert inner_peak >= INNER_BYTES
+    if hasattr(tracemalloc, "reset_peak"):
+        assert inner_peak < OUTER_BYTES
+
+
+def test_stage_does_not_stop_tracing_started_before():
+    tracemalloc.start()
+    try:
+        with PipelineProfiler(trace_memory=True).stage("stage") as stage:
+            np.ones(INNER_BYTES, dtype="uint8")
+        assert tracemalloc.is_tracing()
+        assert stage["tracemalloc_peak_bytes"] >= INNER_BYTES
+    finally:
+        tracemalloc.stop()
+
+
+def test_cprofile_captures(tmp_path):
+    profiler = PipelineProfiler(cprofile_dir=str(tmp_path))
+    for _ in range(2):
+        with profiler.stage("ingest_population"):
+            with profiler.stage("nested"):
+                sum(range(1000))
+    cprofile_paths = [s.get("cprofile_path") for s in profiler.stages]
+    # -> Nested stages are part of the capture of their outer stage
+    assert cprofile_paths[0] is None and cprofile_paths[2] is None
+    assert cprofile_paths[1] != cprofile_paths[3]
+    assert all(os.path.exists(p) for p in cprofile_paths[1::2])
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_batch_stages_trace_memory(tmp_path, source_files, workers: int):
+    population_estimate_data_2019 = PopulationEstimateData2019(
+        source_files["population_csv_path"])
+    population_lookup = \
+        population_estimate_data_2019.generate_population_lookup(
+            population_estimate_data_2019.preprocess(
+                population_estimate_data_2019.df))
+    entries = [{"covid19_csv_path": source_files["covid19_csv_path"],
+                "output_file_path": str(tmp_path / f"out-{i}.csv")}
+               for i in range(2)]
+    profiler = PipelineProfiler(trace_memory=True)
+    with profiler.stage("run_batch"):
+        BatchRunner(population_lookup, workers,
+                    trace_memory=True).run(entries, profiler)
+    stages = {s["stage"]: s for s in profiler.stages}
+    assert stages["run_batch"]["tracemalloc_peak_bytes"] > 0
+    assert all(s["tracemalloc_peak_bytes"] > 0 for s in profiler.stages)
+    if workers == 1:
+        # -> The entries run in this process, within the run_batch stage
+        assert stages["run_batch"]["tracemalloc_peak_bytes"] >= max(
+            s["tracemalloc_peak_bytes"] for s in profiler.stages)
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from covid19_data_with_population.dataset import DataSet, \
+    FIPS_LOOKUP_FIRST_YEAR
+
+
+def get_dates() -> pd.Series:
+    """
+    Function to get unsorted dates before, within and after the years of a
+    lookup of 2010 to 2023, including the first and last day of years
+    """
+    dates = pd.to_datetime(["2009-06-01", "2010-01-01", "2019-12-31",
+                            "2020-01-01", "2021-07-04", "2023-12-31",
+                            "2024-01-01", "2026-03-15", "2020-02-29"])
+    return pd.Series(dates[np.random.default_rng(0).permutation(len(dates))])
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_get_lookup_rows(compact: bool):
+    dataset = DataSet()
+    dates = get_dates()
+    number_of_rows = 14
+    expected_rows = np.clip(dates.dt.year.values - FIPS_LOOKUP_FIRST_YEAR, 0,
+                            number_of_rows - 1)
+    if compact:
+        dates = dataset.encode_dates(dates)
+    rows = dataset.get_lookup_rows(dates, number_of_rows)
+    assert np.array_equal(rows, expected_rows)
+
+
+def test_get_lookup_rows_of_a_single_row():
+    dataset = DataSet()
+    dates = pd.Series(pd.to_datetime(["2024-05-01", "2030-01-01"]))
+    assert dataset.get_lookup_rows(dates, 14) == 13
+    assert dataset.get_lookup_rows(dates[:0], 14) == 0
+    assert dataset.get_lookup_rows(get_dates(), 1) == 0
+
+
+def test_gather_from_fips_lookup_by_year():
+    dataset = DataSet()
+    lookup = np.full((3, 100000), -1, dtype="int64")
+    lookup[:, 1001] = [100, 110, 120]
+    dates = pd.Series(pd.to_datetime(["2009-01-01", "2011-06-01",
+                                      "2012-01-01", "2020-01-01",
+                                      "2011-06-01"]))
+    fips = pd.Series(["01001", "01001", "01001", "01001", "02013"])
+    values = dataset.gather_from_fips_lookup(fips, lookup, dates)
+    assert values.tolist()[:4] == [100, 110, 120, 120]
+    assert np.isnan(values.iloc[4])
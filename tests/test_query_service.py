@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from covid19_data_with_population.binary_store import StatsBinaryStore
+from covid19_data_with_population.dataset import DataSet
+from covid19_data_with_population.query_service import StatsIndex, \
+    StatsQueryService
+
+
+def get_prepared_data(number_of_days: int = 3) -> pd.DataFrame:
+    """
+    Function to get prepared statistics of two fips codes, unsorted
+    """
+    fips = ["06001"] * number_of_days + ["01001"] * number_of_days
+    dates = list(pd.date_range("2020-03-01", periods=number_of_days)) * 2
+    index = pd.MultiIndex.from_arrays([fips, dates], names=["fips", "date"])
+    daily_cases = np.arange(2 * number_of_days, dtype="int64")
+    df = pd.DataFrame({"population": [1671329.0] * number_of_days
+                       + [np.nan] * number_of_days,
+                       "daily_cases": daily_cases,
+                       "daily_deaths": daily_cases // 2,
+                       "cumulative_cases_to_date": daily_cases * 10,
+                       "cumulative_deaths_to_date": daily_cases * 5},
+                      index=index)
+    return df.iloc[::-1]
+
+
+@pytest.mark.parametrize("extension", [".csv", ".bin"])
+def test_stats_index_point_and_range_queries(tmp_path, extension: str):
+    file_path = str(tmp_path / f"stats{extension}")
+    if extension == ".bin":
+        StatsBinaryStore.write(get_prepared_data().sort_index(), file_path)
+    else:
+        DataSet().save_dataframe(get_prepared_data(), file_path)
+    index = StatsIndex(file_path)
+    assert index.number_of_records == 6
+    assert index.query("01001", "2020-03-02", "2020-03-02") == [
+        {"fips": "01001", "date": "2020-03-02", "population": None,
+         "daily_cases": 4, "daily_deaths": 2,
+         "cumulative_cases_to_date": 40, "cumulative_deaths_to_date": 20}]
+    records = index.query("06001", start_date="2020-03-02")
+    assert [r["date"] for r in records] == ["2020-03-02", "2020-03-03"]
+    assert [r["daily_cases"] for r in records] == [1, 2]
+    assert records[0]["population"] == 1671329.0
+    assert [r["date"] for r in index.query("06001", end_date="2020-03-01")] \
+        == ["2020-03-01"]
+    assert index.query("01001", "2020-04-01") == []
+    assert index.query("99999") == []
+
+
+def test_query_service_reloads_changed_file(tmp_path):
+    file_path = str(tmp_path / "stats.csv")
+    DataSet().save_dataframe(get_prepared_data(), file_path)
+    service = StatsQueryService(file_path)
+    assert not service.reload_if_changed()
+    response = service.query(["01001", "06001"], "2020-03-01", "2020-03-01")
+    assert [r["fips"] for r in response["records"]] == ["01001", "06001"]
+    DataSet().save_dataframe(get_prepared_data(5), file_path)
+    assert service.reload_if_changed()
+    assert service.index.number_of_records == 10
+    assert len(service.query(["01001"])["records"]) == 5
+
+
+def test_query_service_keeps_index_of_partial_file(tmp_path, monkeypatch):
+    file_path = str(tmp_path / "stats.csv")
+    DataSet().save_dataframe(get_prepared_data(), file_path)
+    service = StatsQueryService(file_path)
+    index = service.index
+    # -> A file which fails to load is checked again at the next call
+    with open(file_path, "w") as f:
+        f.write("fips,date,population\n01001,2020-03-01")
+    assert not service.reload_if_changed()
+    assert service.index is index
+    # -> A file changed while it is loaded is checked again at the next call
+    DataSet().save_dataframe(get_prepared_data(5), file_path)
+    file_signatures = iter([(1, 1), (2, 2)])
+    monkeypatch.setattr(service, "get_file_signature",
+                        lambda: next(file_signatures))
+    assert not service.reload_if_changed()
+    assert service.index is index
+    monkeypatch.undo()
+    assert service.reload_if_changed()
+    assert service.index.number_of_records == 10
+
+
+def test_save_dataframe_replaces_file_atomically(tmp_path, monkeypatch):
+    file_path = str(tmp_path / "stats.csv")
+    DataSet().save_dataframe(get_prepared_data(), file_path)
+    with open(file_path, "rb") as f:
+        content = f.read()
+
+    def fail_to_csv(df, path, *args, **kwargs):
+        with open(path, "w") as f:
+            f.write("fips,date\n")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(pd.DataFrame, "to_csv", fail_to_csv)
+    with pytest.raises(OSError):
+        DataSet().save_dataframe(get_prepared_data(5), file_path)
+    with open(file_path, "rb") as f:
+        assert f.read() == content
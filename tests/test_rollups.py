@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from covid19_data_with_population.newyork_times_covid19_data import \
+    NewYorkTimesCovid19Data
+from covid19_data_with_population.population_estimate_data_2019 import \
+    PopulationEstimateData2019
+
+# Population of the five New York City counties and of two other counties
+POPULATION = {"36061": 1628706, "36047": 2559903, "36081": 2253858,
+              "36005": 1418207, "36085": 476143, "29095": 703011,
+              "01001": 55869}
+
+COLUMNS = ["population", "daily_cases", "daily_deaths",
+           "cumulative_cases_to_date", "cumulative_deaths_to_date"]
+
+
+def generate_rollups(compact: bool) -> dict:
+    """
+    Function to generate the rollups of records of Jackson county, Kansas
+    City and Joplin (Missouri), New York City and one of its counties, and
+    one county of Alabama
+    """
+    df_population = pd.DataFrame({
+        "STATE": [f[:2] for f in POPULATION],
+        "COUNTY": [f[2:] for f in POPULATION],
+        "POPESTIMATE2019": list(POPULATION.values())})
+    population_estimate_data_2019 = PopulationEstimateData2019.from_dataframe(
+        df_population, compact)
+    population_lookup = \
+        population_estimate_data_2019.generate_population_lookup(
+            population_estimate_data_2019.preprocess(
+                population_estimate_data_2019.df))
+    records = [
+        ("2020-05-05", "Jackson", "Missouri", "29095", 10, 1),
+        ("2020-05-06", "Jackson", "Missouri", "29095", 5, 0),
+        ("2020-05-05", "Kansas City", "Missouri", None, 20, 2),
+        ("2020-05-06", "Kansas City", "Missouri", None, 4, 1),
+        ("2020-05-06", "Joplin", "Missouri", None, 3, 0),
+        ("2020-05-05", "New York City", "New York", None, 100, 10),
+        ("2020-05-06", "New York City", "New York", None, 50, 5),
+        ("2020-05-05", "New York", "New York", "36061", 7, 0),
+        ("2020-05-05", "Autauga", "Alabama", "01001", 2, 0)]
+    df_covid19 = pd.DataFrame(records, columns=["date", "county", "state",
+                                                "fips", "cases", "deaths"])
+    newyork_times_covid19_data = NewYorkTimesCovid19Data.from_dataframe(
+        df_covid19, compact)
+    df = newyork_times_covid19_data.preprocess(newyork_times_covid19_data.df)
+    df = newyork_times_covid19_data.combine_with_population_lookup(
+        df, population_lookup)
+    return newyork_times_covid19_data.generate_rollups(
+        newyork_times_covid19_data.generate_stats(df))
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_state_rollup(compact: bool):
+    df_state = generate_rollups(compact)["state"]
+    dates = pd.to_datetime(["2020-05-05", "2020-05-06"])
+    # -> Kansas City and Joplin population is in the population of the
+    # overlapping counties, their cases and deaths are not. The records of
+    # New York county are in the records of New York City
+    df_expected = pd.DataFrame(
+        [[55869, 2, 0, 2, 0],
+         [703011 - 1, 10 + 20, 1 + 2, 30, 3],
+         [703011 - 1, 5 + 4 + 3, 0 + 1 + 0, 30 + 12, 3 + 1],
+         [8336817 - 10, 100, 10, 100, 10],
+         [8336817 - 15, 50, 5, 150, 15]],
+        columns=COLUMNS,
+        index=pd.MultiIndex.from_arrays(
+            [pd.Index(["01", "29", "29", "36", "36"], dtype=object),
+             dates[[0, 0, 1, 0, 1]]], names=["state", "date"]))
+    pd.testing.assert_frame_equal(df_state, df_expected, check_dtype=False)
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_national_rollup(compact: bool):
+    rollups = generate_rollups(compact)
+    df_national = rollups["national"]
+    df_state_sums = rollups["state"].groupby(level="date").sum()
+    pd.testing.assert_frame_equal(df_national, df_state_sums,
+                                  check_dtype=False, check_names=False)
+    assert df_national["population"].tolist() == [
+        703010 + 8336807 + 55869, 703010 + 8336802]
+    assert np.array_equal(df_national["cumulative_cases_to_date"], [132, 192])
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from covid19_data_with_population.newyork_times_covid19_data import \
+    NewYorkTimesCovid19Data
+
+
+def get_prepared_data(records: list) -> pd.DataFrame:
+    """
+    Function to get prepared statistics indexed by ("fips", "date") from a
+    list of (fips, date, population, daily_cases, cumulative_cases_to_date)
+    records
+    """
+    fips, dates, population, daily_cases, cumulative_cases = zip(*records)
+    index = pd.MultiIndex.from_arrays([list(fips), pd.to_datetime(dates)],
+                                      names=["fips", "date"])
+    return pd.DataFrame({"population": population,
+                         "daily_cases": daily_cases,
+                         "daily_deaths": [0.0] * len(records),
+                         "cumulative_cases_to_date": cumulative_cases,
+                         "cumulative_deaths_to_date": [0] * len(records)},
+                        index=index)
+
+
+def test_sanity_check_report_of_valid_data():
+    df = get_prepared_data([("01001", "2020-03-01", 55869.0, 1.0, 1),
+                            ("01001", "2020-03-02", 55869.0, 0.0, 1),
+                            ("72999", "2020-03-01", np.nan, 2.0, 2)])
+    report = NewYorkTimesCovid19Data(None).sanity_check_prepared_data(
+        df, np.array(["01001", "72999"], dtype=object))
+    # -> Null population of fips codes without estimate is not a failure
+    assert report.is_valid()
+    assert report.to_dict() == {
+        "number_of_records": 3,
+        "null_counts": {"fips": 0, "date": 0, "population": 1,
+                        "daily_cases": 0, "daily_deaths": 0,
+                        "cumulative_cases_to_date": 0,
+                        "cumulative_deaths_to_date": 0},
+        "missing_fips": [],
+        "fips_with_null_values": {"population": ["72999"],
+                                  "daily_cases": [], "daily_deaths": []},
+        "non_monotonic_fips": [],
+        "is_valid": True}
+
+
+def test_sanity_check_report_of_bad_data():
+    df = get_prepared_data([
+        # -> Decreasing cumulative cases
+        ("01001", "2020-03-01", 55869.0, 3.0, 3),
+        ("01001", "2020-03-02", 55869.0, -1.0, 2),
+        # -> Decreasing dates, records of 01003 are not contiguous
+        ("01003", "2020-03-02", 223234.0, 1.0, 1),
+        ("06001", "2020-03-01", 1671329.0, np.nan, 0),
+        ("01003", "2020-03-01", 223234.0, 1.0, 1),
+        ("06001", "2020-03-02", 1671329.0, 4.0, 4)])
+    report = NewYorkTimesCovid19Data(None).sanity_check_prepared_data(
+        df, np.array(["01001", "01003", "06001", "53033"], dtype=object))
+    assert not report.is_valid()
+    assert report.missing_fips == ["53033"]
+    assert report.fips_with_null_values == {"population": [],
+                                            "daily_cases": ["06001"],
+                                            "daily_deaths": []}
+    assert report.non_monotonic_fips == ["01001", "01003"]
+    assert report.null_counts["daily_cases"] == 1
+    assert "53033" in str(report)
+
+
+def test_sanity_check_of_missing_column():
+    df = get_prepared_data([("01001", "2020-03-01", 55869.0, 1.0, 1)])
+    with pytest.raises(Exception):
+        NewYorkTimesCovid19Data(None).sanity_check_prepared_data(
+            df.drop(columns="daily_deaths"))
@@ -0,0 +1,44 @@
+import os
+import sys
+
+import pytest
+
+from covid19_data_with_population.__main__ import main
+
+
+def run_main(monkeypatch, *args: str):
+    """
+    Function to run the command line pipeline with given arguments
+    """
+    monkeypatch.setattr(sys, "argv", ["covid19_data_with_population"]
+                        + list(args))
+    main()
+
+
+def read_bytes(file_path: str) -> bytes:
+    with open(file_path, "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("compact", [False, True])
+@pytest.mark.parametrize("chunksize", [None, 700])
+def test_sqlite_engine_matches_pandas_engine(monkeypatch, tmp_path,
+                                             source_files, compact: bool,
+                                             chunksize: int):
+    outputs = {}
+    for engine in ["pandas", "sqlite"]:
+        output_file_path = str(tmp_path / f"out-{engine}.csv")
+        args = ["--covid19_csv_path", source_files["covid19_csv_path"],
+                "--population_csv_path", source_files["population_csv_path"],
+                "--output_file_path", output_file_path]
+        if compact:
+            args.append("--compact")
+        if engine == "sqlite":
+            args += ["--engine", "sqlite"]
+            if chunksize is not None:
+                args += ["--chunksize", str(chunksize)]
+        run_main(monkeypatch, *args)
+        outputs[engine] = read_bytes(output_file_path)
+    assert outputs["sqlite"] == outputs["pandas"]
+    # -> The database is removed without --sqlite_path
+    assert not os.path.exists(str(tmp_path / "out-sqlite.csv.sqlite"))
@@ -0,0 +1,69 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from covid19_data_with_population.__main__ import main
+from covid19_data_with_population.population_estimate_data_2019 import \
+    PopulationEstimateData2019
+from covid19_data_with_population.stage_checkpoints import \
+    StageCheckpointCache
+
+
+def run_main(monkeypatch, *args: str):
+    """
+    Function to run the command line pipeline with given arguments
+    """
+    monkeypatch.setattr(sys, "argv", ["covid19_data_with_population"]
+                        + list(args))
+    main()
+
+
+def test_stage_keys_fingerprint_population_lookup(tmp_path, source_files):
+    checkpoint_cache = StageCheckpointCache(str(tmp_path / "checkpoints"))
+    population_lookup_path = str(tmp_path / "population_lookup.npy")
+
+    def get_stage_keys():
+        return checkpoint_cache.get_stage_keys(
+            source_files["covid19_csv_path"],
+            source_files["population_csv_path"], False, None,
+            population_lookup_path)
+
+    keys = get_stage_keys()
+    assert None not in keys.values()
+    np.save(population_lookup_path, np.zeros((1, 3)))
+    keys_with_lookup = get_stage_keys()
+    np.save(population_lookup_path, np.zeros((1, 4)))
+    keys_with_other_lookup = get_stage_keys()
+    for stage in ["preprocess_population", "combine_with_population"]:
+        assert len({keys[stage], keys_with_lookup[stage],
+                    keys_with_other_lookup[stage]}) == 3
+    assert (keys["preprocess_covid19"] == keys_with_lookup[
+        "preprocess_covid19"] == keys_with_other_lookup["preprocess_covid19"])
+
+
+def test_checkpoint_is_not_reused_with_other_population_lookup(
+        monkeypatch, tmp_path, source_files):
+    population_lookup_path = str(tmp_path / "population_lookup.npy")
+    output_file_path = str(tmp_path / "out.csv")
+    args = ["--covid19_csv_path", source_files["covid19_csv_path"],
+            "--population_csv_path", source_files["population_csv_path"],
+            "--output_file_path", output_file_path,
+            "--population_lookup_path", population_lookup_path,
+            "--checkpoint_dir", str(tmp_path / "checkpoints")]
+    run_main(monkeypatch, *args)
+    run_main(monkeypatch, *args)
+    df = pd.read_csv(output_file_path, dtype={"fips": object})
+    # -> A population lookup with other population estimates replaces the
+    # .npy file used by the checkpoints of the previous run
+    population_lookup = PopulationEstimateData2019.read_population_lookup(
+        population_lookup_path)
+    PopulationEstimateData2019(None).save_population_lookup(
+        np.where(population_lookup > 0, population_lookup + 1000,
+                 population_lookup), population_lookup_path)
+    run_main(monkeypatch, *args)
+    df_other = pd.read_csv(output_file_path, dtype={"fips": object})
+    is_estimated = df["population"].notna()
+    assert is_estimated.any()
+    assert ((df_other["population"] - df["population"])[is_estimated]
+            == 1000).all()
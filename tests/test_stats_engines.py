@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from covid19_data_with_population.newyork_times_covid19_data import \
+    NewYorkTimesCovid19Data
+
+
+def get_combined_dataframe() -> pd.DataFrame:
+    """
+    Function to get combined data with several fips codes, dates not sorted
+    and fips codes without population estimate
+    """
+    return pd.DataFrame({
+        "fips": ["36061", "01001", "36061", "01001", "06001", "01001",
+                 "06001", "36061"],
+        "date": pd.to_datetime(["2020-03-03", "2020-03-02", "2020-03-01",
+                                "2020-03-01", "2020-03-02", "2020-03-03",
+                                "2020-03-01", "2020-03-02"]),
+        "cases": [5, 2, 1, 3, 4, 0, 7, 2],
+        "deaths": [1, 0, 0, 1, 0, 2, 1, 0],
+        "POPESTIMATE": [1000.0, 500.0, 1000.0, 500.0, np.nan, 500.0, np.nan,
+                        1000.0]})
+
+
+def test_vectorized_engine_matches_groupby_engine():
+    newyork_times_covid19_data = NewYorkTimesCovid19Data(None)
+    df = get_combined_dataframe()
+    df_vectorized = newyork_times_covid19_data.generate_stats(df,
+                                                              "vectorized")
+    df_groupby = newyork_times_covid19_data.generate_stats(df, "groupby")
+    pd.testing.assert_frame_equal(df_vectorized, df_groupby)
+
+
+def test_vectorized_engine_statistics():
+    newyork_times_covid19_data = NewYorkTimesCovid19Data(None)
+    df_combined = get_combined_dataframe()
+    df = newyork_times_covid19_data.generate_stats(df_combined, "vectorized")
+    assert df.index.names == ["fips", "date"]
+    assert df.index.is_monotonic_increasing
+    df_fips = df.loc["01001"]
+    assert df_fips["cumulative_cases_to_date"].tolist() == [3, 5, 5]
+    assert df_fips["cumulative_deaths_to_date"].tolist() == [1, 1, 3]
+    assert df_fips["population"].tolist() == [499.0, 499.0, 497.0]
+    assert df.loc["06001", "population"].isna().all()
+    # -> The input records are not reordered
+    pd.testing.assert_frame_equal(df_combined, get_combined_dataframe())
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_engines_match_on_preprocessed_records(compact: bool):
+    df_covid19 = pd.DataFrame({
+        "date": ["2020-03-02", "2020-03-01", "2020-03-02", "2020-03-01",
+                 "2020-03-03", "2020-03-03"],
+        "county": ["Autauga", "Autauga", "Alameda", "Alameda", "Autauga",
+                   "Alameda"],
+        "state": ["Alabama", "Alabama", "California", "California",
+                  "Alabama", "California"],
+        "fips": ["01001", "01001", "06001", "06001", "01001", "06001"],
+        "cases": [2.0, 1.0, 3.0, 4.0, 5.0, 1.0],
+        "deaths": [0.0, 1.0, 1.0, 0.0, 2.0, 0.0]})
+    newyork_times_covid19_data = NewYorkTimesCovid19Data.from_dataframe(
+        df_covid19, compact)
+    df = newyork_times_covid19_data.preprocess(newyork_times_covid19_data.df)
+    population_lookup = newyork_times_covid19_data.generate_fips_lookup(
+        pd.Series(["01001"]), pd.Series([55869]))
+    df = newyork_times_covid19_data.combine_with_population_lookup(
+        df, population_lookup)
+    df_vectorized = newyork_times_covid19_data.decode_compact_stats(
+        newyork_times_covid19_data.generate_stats(df, "vectorized"))
+    df_groupby = newyork_times_covid19_data.decode_compact_stats(
+        newyork_times_covid19_data.generate_stats(df, "groupby"))
+    pd.testing.assert_frame_equal(df_vectorized, df_groupby,
+                                  check_index_type=False)
+    assert len(df_vectorized) == 6
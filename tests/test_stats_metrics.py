@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from covid19_data_with_population.exceptions import InputError
+from covid19_data_with_population.stats_metrics import StatsMetrics
+
+
+def get_stats(seed: int = 0) -> pd.DataFrame:
+    """
+    Function to get statistics indexed by ("fips", "date") of several fips
+    codes with gaps in the reported dates, records not sorted
+    """
+    rng = np.random.default_rng(seed)
+    records = []
+    for i, fips in enumerate(["01001", "01003", "06001", "72999"]):
+        dates = pd.date_range("2020-03-01", periods=60)
+        dates = dates[rng.random(len(dates)) < 0.8][i:]
+        cumulative_cases = np.cumsum(rng.integers(0, 50, len(dates)))
+        cumulative_deaths = np.cumsum(rng.integers(0, 3, len(dates)))
+        population = np.nan if fips == "72999" else 1000.0 * (i + 1)
+        records.append(pd.DataFrame({
+            "fips": fips, "date": dates, "population": population,
+            "cumulative_cases_to_date": cumulative_cases,
+            "cumulative_deaths_to_date": cumulative_deaths}))
+    df = pd.concat(records).sample(frac=1, random_state=seed)
+    return df.set_index(["fips", "date"])
+
+
+def get_naive_average(df: pd.DataFrame, column: str,
+                      days: int) -> pd.Series:
+    """
+    Function to compute the daily average over the last calendar days with
+    a groupby rolling sum of the daily values, null when the window starts
+    before the first record of the fips code
+    """
+    df = df.sort_index().reset_index()
+    df["daily"] = df.groupby("fips")[column].diff()\
+        .fillna(df[column]).astype(float)
+    sums = df.set_index("date").groupby("fips")["daily"]\
+        .rolling(f"{days}D").sum().values
+    first_date = df.groupby("fips")["date"].transform("min")
+    is_defined = df["date"] - pd.Timedelta(days=days) >= first_date
+    return pd.Series(np.where(is_defined, sums / days, np.nan))
+
+
+def get_naive_lagged(df: pd.DataFrame, column: str,
+                     days: int) -> pd.Series:
+    """
+    Function to get the value of the last record at least days older of the
+    same fips code, by reindexing every fips code to calendar days
+    """
+    values = []
+    for _, df_fips in df.sort_index().groupby(level="fips"):
+        series = df_fips[column].droplevel("fips").astype(float)
+        calendar = series.asfreq("D").ffill()
+        values.append(calendar.shift(days).reindex(series.index).values)
+    return pd.Series(np.concatenate(values))
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_metrics_match_naive_groupby_rolling(seed: int):
+    df = get_stats(seed)
+    stats_metrics = StatsMetrics([3, 7], per_capita_base=1000,
+                                 growth_period=5)
+    df_metrics = stats_metrics.generate_metrics(df)
+    assert df_metrics.index.is_monotonic_increasing
+    assert list(df_metrics.columns) == list(df.columns) \
+        + stats_metrics.get_metric_columns()
+    population = df.sort_index()["population"].values
+    for name in ["cases", "deaths"]:
+        column = f"cumulative_{name}_to_date"
+        for days in [3, 7]:
+            average = get_naive_average(df, column, days)
+            np.testing.assert_allclose(
+                df_metrics[f"daily_{name}_avg_{days}d"].values, average)
+            np.testing.assert_allclose(
+                df_metrics[f"daily_{name}_avg_{days}d_per_1k"].values,
+                average / population * 1000)
+        np.testing.assert_allclose(
+            df_metrics[f"cumulative_{name}_per_1k"].values,
+            df.sort_index()[column].values / population * 1000)
+        values = df.sort_index()[column].values.astype(float)
+        current = values - get_naive_lagged(df, column, 5).values
+        previous = (get_naive_lagged(df, column, 5).values
+                    - get_naive_lagged(df, column, 10).values)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            growth = np.where(previous == 0, np.nan, current / previous)
+        np.testing.assert_allclose(
+            df_metrics[f"{name}_growth_5d"].values, growth)
+
+
+def test_metrics_of_empty_stats():
+    df = get_stats().iloc[:0]
+    stats_metrics = StatsMetrics()
+    df_metrics = stats_metrics.generate_metrics(df)
+    assert len(df_metrics) == 0
+    assert list(df_metrics.columns) == list(df.columns) \
+        + stats_metrics.get_metric_columns()
+
+
+def test_invalid_metric_parameters():
+    with pytest.raises(InputError):
+        StatsMetrics([0, 7])
+    with pytest.raises(InputError):
+        StatsMetrics(growth_period=-1)